@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import argparse
+import gc
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.models import Stock, AssetStore
+
+"""
+benchmarks/bench_asset_memory.py
+--------------------------------
+资产模型内存基准。
+分别构建 N 个 (默认 100 万) 资产并填满价格窗口，用 tracemalloc 统计每个资产占用的字节数：
+1. 旧版: 带 __dict__ 的对象 + deque 窗口 + 每个实例一份 asset_type
+2. __slots__ 对象 + RollingWindow (默认)
+3. __slots__ 对象 + CompactWindow (array 环形缓冲区)
+4. 列式存储 AssetStore (参考上限)
+
+用法:
+    python benchmarks/bench_asset_memory.py --count 1000000 --window 5
+"""
+
+
+class LegacyStock:
+    """复刻改造前的 Stock：实例 __dict__ + deque + 逐实例的类型字符串"""
+
+    def __init__(self, symbol, price, exchange="NASDAQ", window_size=5):
+        self.symbol = symbol
+        self.__price = price
+        self.price_history_window = deque(maxlen=window_size)
+        if price > 0:
+            self.price_history_window.append(price)
+        self.exchange = exchange
+        self.asset_type = "股票"
+
+    def update_price(self, new_price):
+        self.__price = new_price
+        self.price_history_window.append(new_price)
+
+    def get_sma(self):
+        return statistics.mean(self.price_history_window)
+
+
+def build_objects(factory, count, window):
+    assets = [factory(f"S{i:07d}", 100.0 + i % 100) for i in range(count)]
+    for step in range(window):
+        for asset in assets:
+            asset.update_price(101.0 + step)
+    return assets
+
+
+def build_store(count, window):
+    store = AssetStore(capacity=count, window_size=window)
+    for i in range(count):
+        store.add(f"S{i:07d}", 100.0 + i % 100, "Stock", "NASDAQ")
+    rows = range(count)
+    for step in range(window):
+        store.update_prices(list(rows), [101.0 + step] * count)
+    return store
+
+
+def measure(label, build, count):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    print(f"  {label:<28} {used / count:>8.1f} B/资产  合计 {used / 1e6:>9.1f} MB  构建 {elapsed:6.1f}s")
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="资产模型内存基准")
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--window", type=int, default=5)
+    args = parser.parse_args()
+    n, w = args.count, args.window
+
+    print(f"[内存] {n:,} 个资产，窗口大小 {w} (已填满)")
+    legacy = measure("旧版 (__dict__ + deque)", lambda: build_objects(
+        lambda s, p: LegacyStock(s, p, window_size=w), n, w), n)
+    slotted = measure("__slots__ + RollingWindow", lambda: build_objects(
+        lambda s, p: Stock(s, p, window_size=w), n, w), n)
+    compact = measure("__slots__ + CompactWindow", lambda: build_objects(
+        lambda s, p: Stock(s, p, window_size=w, compact_window=True), n, w), n)
+    store = measure("AssetStore (列式)", lambda: build_store(n, w), n)
+
+    print(f"\n  相对旧版: RollingWindow {slotted / legacy:.0%}，CompactWindow {compact / legacy:.0%}，"
+          f"AssetStore {store / legacy:.0%}")
+
+
+if __name__ == "__main__":
+    main()
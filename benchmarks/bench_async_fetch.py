@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import queue
+import time
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import network
+from core.async_worker import FetchWorkerPool, PRIORITY_HELD, PRIORITY_WATCHLIST, start_concurrent_update
+from core.fake_server import start_fake_server, stop_fake_server
+from core.http_client import get_session_pool
+from core.price_cache import price_cache
+from core.rate_limiter import set_rate_limit
+from core.models import Crypto, Stock
+
+"""
+benchmarks/bench_async_fetch.py
+-------------------------------
+抓取引擎吞吐量压测。
+在本地启动模拟价格服务器，对比旧版 "3 线程 + 队列" 与 asyncio 引擎的吞吐量，
+并统计每种方式向服务器发出的请求次数 (批量请求可以把 500 次往返压缩到个位数)，
+以及共享会话池的连接复用情况、重叠扫描时价格缓存的合并效果。
+然后通过数据源注册表把股票路由到本地替身数据源，压测"加密货币 + 股票"的混合组合。
+最后在限流条件下演示优先级调度：持仓资产的排队时间应远小于关注列表。
+
+用法:
+    python benchmarks/bench_async_fetch.py --symbols 500 --latency 0.05 --jitter 0.5
+"""
+
+
+def build_portfolio(n):
+    """生成 n 个虚拟币种，并注册到 COIN_MAPPING 中"""
+    assets = []
+    for i in range(n):
+        symbol = f"C{i:05d}"
+        network.COIN_MAPPING[symbol] = f"coin-{i:05d}"
+        assets.append(Crypto(symbol, 100.0))
+    return assets
+
+
+def build_stocks(n):
+    """生成 n 只虚拟股票 (由替身数据源报价)"""
+    return [Stock(f"S{i:05d}", 100.0) for i in range(n)]
+
+
+def legacy_fetch(symbol):
+    """复刻旧版请求方式：每次 requests.get 都新建 TCP 连接"""
+    url = f"{network.API_BASE_URL}/simple/price?ids={network.COIN_MAPPING[symbol]}&vs_currencies=usd"
+    try:
+        response = requests.get(url, timeout=network.REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return float(response.json()[network.COIN_MAPPING[symbol]]["usd"])
+    except (requests.RequestException, KeyError, ValueError):
+        return None
+
+
+def legacy_update(assets_list, num_threads=3):
+    """复刻旧版实现：固定 3 个线程，每个线程一次只发一个阻塞请求"""
+    q = queue.Queue()
+    for asset in assets_list:
+        q.put(asset)
+
+    def worker():
+        while True:
+            try:
+                asset = q.get_nowait()
+            except queue.Empty:
+                return
+            price = legacy_fetch(asset.symbol)
+            if price is not None:
+                asset.update_price(price)
+
+    threads = [threading.Thread(target=worker) for _ in range(num_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def overlapping_scans(pool, assets, scans=3):
+    """模拟 GUI 扫描、定时任务等多个调用方同时扫描同一个组合"""
+    threads = [threading.Thread(target=start_concurrent_update, args=(assets,), kwargs={"pool": pool})
+               for _ in range(scans)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def throttled_priority_demo(assets, rate, held_count=10):
+    """
+    限流条件下同时提交关注列表与持仓，打印两类任务的排队时间与请求时间。
+    """
+    set_rate_limit(network.PROVIDER_NAME, rate=rate, burst=1)
+    price_cache.clear()
+    watchlist, held = assets[held_count:], assets[:held_count]
+    with FetchWorkerPool(max_workers=4, batch_size=1) as pool:
+        with contextlib.redirect_stdout(io.StringIO()):
+            handles = [pool.submit(watchlist, PRIORITY_WATCHLIST), pool.submit(held, PRIORITY_HELD)]
+            for handle in handles:
+                handle.result()
+        metrics = pool.metrics()
+
+    print(f"限流 {rate:g} 次/秒，关注 {len(watchlist)} 个 + 持仓 {len(held)} 个 (batch=1):")
+    names = {PRIORITY_HELD: "持仓", PRIORITY_WATCHLIST: "关注"}
+    for priority, stat in metrics["queue_wait"].items():
+        print(f"  {names.get(priority, priority)} 排队: 平均 {stat['avg'] * 1000:8.1f}ms  最长 {stat['max'] * 1000:8.1f}ms")
+    stat = metrics["rate_limit_wait"][network.PROVIDER_NAME]
+    print(f"  等待令牌: 平均 {stat['avg'] * 1000:8.1f}ms  最长 {stat['max'] * 1000:8.1f}ms")
+    stat = metrics["request_time"]
+    print(f"  HTTP 请求: 平均 {stat['avg'] * 1000:8.1f}ms  最长 {stat['max'] * 1000:8.1f}ms")
+
+
+def timed(label, func, n, server):
+    # 每一轮都从冷缓存开始，保证对比公平
+    price_cache.clear()
+    requests_before = server.request_count
+    # 屏蔽每个请求的打印，避免终端 IO 影响测量
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+    round_trips = server.request_count - requests_before
+    print(f"{label:<32} {duration:8.2f}s  {n / duration:10.1f} 资产/秒  {round_trips:6d} 次请求")
+    return duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抓取引擎吞吐量压测")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟服务器响应延迟的中位数 (秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟抖动 (对数正态分布的 sigma)")
+    parser.add_argument("--stocks", type=int, default=500, help="混合组合中的股票数量")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[5, 20, 50])
+    parser.add_argument("--batch-size", type=int, nargs="*", default=[1, 100])
+    parser.add_argument("--throttle", type=float, default=20, help="优先级演示中的限流速率 (次/秒)")
+    args = parser.parse_args()
+
+    # 吞吐量测试不限流 (本地服务器没有配额)
+    set_rate_limit(network.PROVIDER_NAME, rate=1e6, burst=1e6)
+    server, base_url = start_fake_server(latency=args.latency, jitter=args.jitter)
+    network.API_BASE_URL = base_url
+    assets = build_portfolio(args.symbols)
+
+    print("-" * 60)
+    print(f"资产数: {args.symbols} | 模拟延迟: {args.latency * 1000:.0f}ms (抖动 sigma={args.jitter:g})")
+    print("-" * 60)
+    try:
+        timed("legacy (3 threads)", lambda: legacy_update(assets), args.symbols, server)
+        for batch_size in args.batch_size:
+            for limit in args.concurrency:
+                with FetchWorkerPool(max_workers=limit, batch_size=batch_size) as pool:
+                    timed(f"asyncio (limit={limit}, batch={batch_size})",
+                          lambda: start_concurrent_update(assets, pool=pool), args.symbols, server)
+        with FetchWorkerPool() as pool:
+            timed("3 overlapping scans (cached)", lambda: overlapping_scans(pool, assets),
+                  args.symbols * 3, server)
+
+        # 股票交给替身数据源，和加密货币走同一条链路 (注册表 -> 缓存 -> 限流 -> 会话池)
+        network.enable_standin_provider(base_url, batch_size=50, rate=1e6, burst=1e6)
+        mixed = assets + build_stocks(args.stocks)
+        with FetchWorkerPool() as pool:
+            timed(f"mixed (+{args.stocks} stocks via standin)", lambda: start_concurrent_update(mixed, pool=pool),
+                  len(mixed), server)
+        network.unregister_provider(network.CLASS_STOCK)
+        stats = get_session_pool().stats()
+        print("-" * 60)
+        print(f"会话池: 新建连接 {stats['connections']} | 复用连接 {stats['reused']} | "
+              f"重试 {stats['retries']} | 失败 {stats['failures']}")
+        stats = price_cache.stats()
+        print(f"价格缓存: 命中 {stats['hits']} | 未命中 {stats['misses']} | 合并 {stats['coalesced']} | "
+              f"大小 {stats['size']}")
+        print("-" * 60)
+        throttled_priority_demo(assets[:60], args.throttle)
+    finally:
+        stop_fake_server(server)
+
+
+if __name__ == "__main__":
+    main()
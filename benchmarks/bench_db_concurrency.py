@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.db_manager import DatabaseManager, SQLITE_PRAGMAS
+from core.models import Stock
+
+"""
+benchmarks/bench_db_concurrency.py
+----------------------------------
+DatabaseManager 并发读写压测 (临时 SQLite 文件)。
+多个线程同时执行时间范围查询 (get_history)，同时另有线程持续 log_price 写入；
+对比连接池 (每线程一个连接) 与旧版"一个连接 + 一把锁"的查询吞吐量和延迟。
+
+用法:
+    python benchmarks/bench_db_concurrency.py --threads 1 2 4 8 --seconds 2
+"""
+
+QUERY = ("SELECT recorded_at, price, source FROM price_history "
+         "WHERE symbol = ? AND recorded_at >= ? AND recorded_at <= ? ORDER BY recorded_at, id")
+
+
+class SharedConnection:
+    """旧版做法：所有线程共用一个连接，用锁串行化"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        for name, value in SQLITE_PRAGMAS.items():
+            self.conn.execute(f"PRAGMA {name} = {value}")
+        self.lock = threading.Lock()
+
+    def get_history(self, symbol, start, end):
+        with self.lock:
+            return self.conn.execute(QUERY, (symbol, start, end)).fetchall()
+
+
+def populate(db, symbols, seconds):
+    start = datetime(2024, 1, 1)
+    db.log_rows((f"S{i % symbols:03d}", 100.0 + i % 97, "Simulated", start + timedelta(seconds=i // symbols))
+                for i in range(symbols * seconds))
+    db.flush()
+    return start
+
+
+def run(reader, writer_db, threads, seconds, symbols, start, span):
+    latencies = [[] for _ in range(threads)]
+    stop = threading.Event()
+    rng = np.random.default_rng(0)
+    offsets = rng.integers(0, span - 600, 100_000).tolist()
+
+    def read_loop(n):
+        i = n
+        while not stop.is_set():
+            begin = start + timedelta(seconds=offsets[i % len(offsets)])
+            t0 = time.perf_counter()
+            reader.get_history(f"S{i % symbols:03d}", begin, begin + timedelta(minutes=10))
+            latencies[n].append(time.perf_counter() - t0)
+            i += threads
+
+    def write_loop():
+        asset = Stock("LIVE", 100.0)
+        while not stop.is_set():
+            writer_db.log_price(asset)
+            time.sleep(0.0001)
+
+    workers = [threading.Thread(target=read_loop, args=(n,)) for n in range(threads)]
+    workers.append(threading.Thread(target=write_loop))
+    for t in workers:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers:
+        t.join()
+    all_ms = np.concatenate([np.asarray(x) for x in latencies]) * 1000
+    return len(all_ms) / seconds, np.percentile(all_ms, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DatabaseManager 并发读写压测")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--span", type=int, default=20_000, help="每个符号的记录数 (逐秒)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        db = DatabaseManager(os.path.join(tmp, "concurrency.db"))
+        start = populate(db, args.symbols, args.span)
+        print(f"[数据] {db.get_total_records():,} 行，SQLite 参数 {SQLITE_PRAGMAS}")
+        shared = SharedConnection(db.db_file)
+        for threads in args.threads:
+            for label, reader in (("连接池", db), ("共享连接+锁", shared)):
+                qps, (p50, p99) = run(reader, db, threads, args.seconds, args.symbols, start, args.span)
+                print(f"[{threads} 线程] {label:<8} {qps:8,.0f} 查询/s | p50 {p50:6.2f} ms | p99 {p99:6.2f} ms")
+        print(f"[写入] 后台批量写入 {db.writer.stats['rows']:,} 行，{db.writer.stats['batches']:,} 个事务")
+        shared.conn.close()
+        db.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
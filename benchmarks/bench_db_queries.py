@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.db_manager import DatabaseManager, DATA_DIR
+from core import partitions
+
+"""
+benchmarks/bench_db_queries.py
+------------------------------
+price_history 查询延迟压测 (默认 1000 万行，写入 data/bench_history.db，可用 --keep 复用)。
+测量复合索引 (symbol, recorded_at) 下的时间范围查询、最新价查询和分块全量读取，
+并用 NOT INDEXED 对比没有索引时的全表扫描；
+对比统计表 (get_total_records / get_stats) 与 COUNT(*) 全表计数，
+以及 K 线查询 (get_ohlc) 走汇总表与直接聚合原始记录的耗时。
+
+用法:
+    python benchmarks/bench_db_queries.py --rows 10000000 --symbols 100 --keep
+    python benchmarks/bench_db_queries.py --rows 2000000 --symbols 10 --interval 30   # 每个符号约 2 个月
+"""
+
+
+def populate(db, rows, symbols, interval=1, chunk=200_000):
+    """按时间顺序轮流为每个符号生成一条记录 (每个符号每 interval 秒一条)，绕过写缓冲区直接批量写入"""
+    names = [f"S{i:04d}" for i in range(symbols)]
+    start = datetime(2020, 1, 1)
+    for offset in range(0, rows, chunk):
+        batch = [(names[i % symbols], 100.0 + (i % 1000) * 0.01, "Simulated",
+                  start + timedelta(seconds=i // symbols * interval))
+                 for i in range(offset, min(rows, offset + chunk))]
+        db.write_rows(batch)
+        print(f"\r[导入] {offset + len(batch):,} / {rows:,}", end="", flush=True)
+    print()
+    return names, start
+
+
+def timed(label, func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    print(f"  {label:<36} {best * 1000:10.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="price_history 查询延迟压测")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--interval", type=int, default=1, help="每个符号相邻两条记录的间隔秒数")
+    parser.add_argument("--keep", action="store_true", help="保留 / 复用压测数据库")
+    args = parser.parse_args()
+
+    path = os.path.join(DATA_DIR, "bench_history.db")
+    fresh = not (args.keep and os.path.exists(path))
+    if fresh:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    db = DatabaseManager(path)
+    started = time.perf_counter()
+    if fresh:
+        names, start = populate(db, args.rows, args.symbols, args.interval)
+        print(f"[导入] 耗时 {time.perf_counter() - started:.1f}s (含分区和汇总表)")
+    else:
+        names = db.get_symbols()
+        start = datetime.fromisoformat(db.get_history(names[0], limit=1)[0][0])
+    total = db.get_total_records()
+    last = datetime.fromisoformat(db.get_latest(names[:1])[names[0]][0])
+    span = last - start
+    middle = start + span / 2
+    print(f"[数据] {total:,} 行，{len(names)} 个符号，每个符号 {span} 的数据，{len(db._tables())} 个月分区")
+
+    symbol = names[len(names) // 2]
+    print("[查询延迟] (5 次取最快)")
+    rows = timed("1 小时范围 get_history", lambda: db.get_history(symbol, middle, middle + timedelta(hours=1)))
+    timed("1 天范围 get_history", lambda: db.get_history(symbol, middle, middle + timedelta(days=1)))
+    timed(f"get_latest ({len(names)} 个符号)", lambda: db.get_latest(names))
+    timed("get_symbols (松散索引扫描)", db.get_symbols)
+    count = timed("iter_history 分块读取整个符号",
+                  lambda: sum(len(chunk) for chunk in db.iter_history(symbol)), repeat=1)
+    print(f"  (1 小时 {len(rows):,} 行，整个符号 {count:,} 行)")
+
+    # 对比：不走索引的全表扫描
+    table = partitions.table_name(partitions.month_start(middle))
+    sql = (f"SELECT recorded_at, price, source FROM {table} NOT INDEXED "
+           "WHERE symbol = ? AND recorded_at BETWEEN ? AND ? ORDER BY recorded_at, id")
+    params = (symbol, middle.isoformat(" "), (middle + timedelta(hours=1)).isoformat(" "))
+    with db.connection() as conn:
+        timed("1 小时范围 (NOT INDEXED 全表扫描)", lambda: conn.execute(sql, params).fetchall(), repeat=1)
+
+    print("[统计]")
+    timed("get_total_records (统计表)", db.get_total_records)
+    timed(f"get_stats ({len(names)} 个符号)", db.get_stats)
+    with db.connection() as conn:
+        timed("SELECT COUNT(*) 所有分区",
+              lambda: sum(conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in db._all_tables()),
+              repeat=1)
+
+    print("[K 线] 整个符号的数据")
+    for resolution in ("1d", "1h", "5m", "1m"):
+        bars = timed(f"get_ohlc {resolution} (汇总表)", lambda: db.get_ohlc(symbol, resolution=resolution))
+        print(f"    -> {len(bars):,} 根")
+    timed("get_ohlc 30s (聚合原始记录)", lambda: db.get_ohlc(symbol, resolution="30s"), repeat=1)
+
+    print("[维护]")
+    report = timed("apply_retention (只保留当月原始数据)",
+                   lambda: db.apply_retention({"raw_months": 0, "archive": False}, now=last), repeat=1)
+    print(f"    -> 删除 {len(report['dropped'])} 个分区，剩余 {db.get_total_records():,} 行")
+    timed("compact (VACUUM)", db.compact, repeat=1)
+    bars = db.get_ohlc(symbol, resolution="1d")
+    print(f"    -> 删除原始数据后日 K 线仍有 {len(bars)} 根")
+
+    db.close()
+    if not args.keep:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
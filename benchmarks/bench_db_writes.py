@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.db_manager import DatabaseManager
+from core.models import Stock
+
+"""
+benchmarks/bench_db_writes.py
+-----------------------------
+price_history 写入压测 (临时 SQLite 文件，不影响 data/history_data.db)。
+对比逐条 commit (旧版 log_price 的行为) 与批量写缓冲区 (executemany + 一次事务) 的吞吐量。
+
+用法:
+    python benchmarks/bench_db_writes.py --rows 100000 --batch 1000
+"""
+
+
+def run(path, assets, rows, batch_size, per_row_commit):
+    db = DatabaseManager(path, batch_size=batch_size)
+    started = time.perf_counter()
+    for i in range(rows):
+        db.log_price(assets[i % len(assets)])
+        if per_row_commit:
+            db.flush()  # 每条都单独提交一次
+    db.flush()
+    elapsed = time.perf_counter() - started
+    stats = dict(db.writer.stats)
+    total = db.get_total_records()
+    db.close()
+    return elapsed, stats, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="price_history 写入压测")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--commit-rows", type=int, default=2_000, help="逐条 commit 模式写入的条数")
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--symbols", type=int, default=100)
+    args = parser.parse_args()
+
+    assets = [Stock(f"S{i:04d}", 100.0 + i) for i in range(args.symbols)]
+    tmp = tempfile.mkdtemp()
+    try:
+        for label, rows, per_row in (("逐条 commit", args.commit_rows, True),
+                                     (f"批量写入 (batch={args.batch})", args.rows, False)):
+            path = os.path.join(tmp, f"bench_{int(per_row)}.db")
+            elapsed, stats, total = run(path, assets, rows, args.batch, per_row)
+            print(f"[{label}] {rows:,} 行 / {elapsed:.2f}s = {rows / elapsed:,.0f} rows/s | "
+                  f"{stats['batches']:,} 个事务 | 表内 {total:,} 行")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
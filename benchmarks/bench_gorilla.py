@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from core.gorilla import GorillaReader, write_series, BLOCK_RECORDS
+from core.hft_sim import GBMTickGenerator
+from core.tick_archive import TICK_DTYPE
+
+"""
+benchmarks/bench_gorilla.py
+---------------------------
+Gorilla 压缩 (core/gorilla.py) 的压缩率与编解码速度。
+数据: GBM 模拟价格 (按小数位数取整)，时间间隔随机，部分记录价格不变。
+对比原始 16 字节记录与 zlib 压缩原始记录，测量流式解码吞吐 (按解码后的 16 字节 / 条计算)
+和块级随机访问 / 小范围读取的延迟。
+
+用法:
+    python benchmarks/bench_gorilla.py --rows 10000000
+    python benchmarks/bench_gorilla.py --rows 2000000 --decimals -1 --block 4096   # 原始浮点价格 (XOR 编码)
+"""
+
+
+def make_series(rows, decimals=2, seed=0):
+    rng = np.random.default_rng(seed)
+    prices, _ = GBMTickGenerator(["SYN"], 150.0, sigma=0.3, dt=1.0 / (252 * 23400 * 5), seed=seed).next_block(rows)
+    prices = prices[:, 0] if decimals < 0 else np.round(prices[:, 0], decimals)  # 与行情源解析出的十进制报价一致
+    gaps = rng.choice([100_000, 200_000, 200_000, 500_000, 1_000_000], rows)
+    ts = np.cumsum(gaps).astype(np.int64) + 1_700_000_000_000_000
+    return ts, prices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gorilla 压缩的压缩率与编解码速度")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--decimals", type=int, default=2, help="价格小数位数 (-1 表示不取整，走 XOR 编码)")
+    parser.add_argument("--block", type=int, default=BLOCK_RECORDS, help="每块记录数")
+    args = parser.parse_args()
+
+    ts, prices = make_series(args.rows, args.decimals)
+    raw = np.empty(args.rows, dtype=TICK_DTYPE)
+    raw["ts"], raw["price"] = ts, prices
+    raw_mb = raw.nbytes / 1e6
+    unchanged = float(np.mean(prices[1:] == prices[:-1]))
+    print(f"[数据] {args.rows:,} 条，原始 {raw_mb:.1f} MB，价格不变的比例 {unchanged:.0%}")
+
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, "series.grl")
+        started = time.perf_counter()
+        size = write_series(path, ts, prices, block_records=args.block)
+        encode = time.perf_counter() - started
+
+        reader = GorillaReader(path)
+        started = time.perf_counter()
+        decoded = 0
+        for block_ts, block_prices in reader.iter_blocks():
+            decoded += len(block_ts)
+        decode = time.perf_counter() - started
+        assert decoded == args.rows
+        check_ts, check_prices = reader.read()
+        assert np.array_equal(check_ts, ts) and np.array_equal(check_prices, prices)
+
+        started = time.perf_counter()
+        packed = zlib.compress(raw.tobytes(), 6)
+        zlib_encode = time.perf_counter() - started
+        started = time.perf_counter()
+        zlib.decompress(packed)
+        zlib_decode = time.perf_counter() - started
+
+        print(f"\n  {'格式':<16}{'大小 MB':>10}{'字节/条':>10}{'压缩比':>8}{'编码 MB/s':>12}{'解码 MB/s':>12}")
+        print(f"  {'原始 16 字节':<16}{raw_mb:10.1f}{16:10.2f}{1:8.2f}{'-':>12}{'-':>12}")
+        print(f"  {'zlib -6':<16}{len(packed) / 1e6:10.1f}{len(packed) / args.rows:10.2f}"
+              f"{raw.nbytes / len(packed):8.2f}{raw_mb / zlib_encode:12.0f}{raw_mb / zlib_decode:12.0f}")
+        print(f"  {'Gorilla':<16}{size / 1e6:10.1f}{size / args.rows:10.2f}"
+              f"{raw.nbytes / size:8.2f}{raw_mb / encode:12.0f}{raw_mb / decode:12.0f}")
+
+        rng = np.random.default_rng(1)
+        picks = rng.integers(0, len(reader.index), 200)
+        started = time.perf_counter()
+        for i in picks:
+            reader.block(int(i))
+        block_ms = (time.perf_counter() - started) / len(picks) * 1000
+        lo = rng.integers(0, args.rows - 1000, 200)
+        started = time.perf_counter()
+        for i in lo:
+            reader.read(int(ts[i]), int(ts[i + 999]))
+        range_ms = (time.perf_counter() - started) / len(lo) * 1000
+        print(f"\n  随机访问一块 ({args.block} 条)          {block_ms:8.3f} ms")
+        print(f"  读取任意 1000 条的时间范围              {range_ms:8.3f} ms")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
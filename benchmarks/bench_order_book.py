@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.models import Stock
+from core.order_book import OrderBook, OrderFlowGenerator
+
+"""
+benchmarks/bench_order_book.py
+------------------------------
+限价订单簿撮合压测。
+用合成订单流 (限价单 / 市价单 / 撤单) 驱动 OrderBook，测量每秒处理的订单数，
+并对比开启中间价推送 (Asset.update_price) 时的开销。
+
+用法:
+    python benchmarks/bench_order_book.py --orders 200000 --seed 1
+"""
+
+
+def run(orders, seed, publish):
+    book = OrderBook("SIM")
+    generator = OrderFlowGenerator(book, seed=seed)
+    asset = Stock("SIM", 100.0)
+    if publish:
+        book.publish_mid_to(asset)
+
+    started = time.perf_counter()
+    trades = generator.run(orders)
+    elapsed = time.perf_counter() - started
+    return book, asset, trades, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="限价订单簿撮合压测")
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for publish in (False, True):
+        book, asset, trades, elapsed = run(args.orders, args.seed, publish)
+        label = "推送中间价" if publish else "仅撮合"
+        print(f"[{label}] {args.orders:,} 个订单耗时 {elapsed:.2f}s -> {args.orders / elapsed:,.0f} orders/s "
+              f"(平均 {elapsed / args.orders * 1e6:.2f} µs/单)")
+
+    counters = book.counters
+    print(f"[订单] 限价 {counters['limit']:,} | 市价 {counters['market']:,} | 撤单 {counters['cancel']:,}")
+    print(f"[成交] {counters['trades']:,} 笔，成交量 {counters['volume']:,}，簿内挂单 {len(book):,} 个，"
+          f"买盘 {len(book.bids)} 档 / 卖盘 {len(book.asks)} 档")
+    print(f"[行情] 买一 {book.best_bid()} | 卖一 {book.best_ask()} | 价差 {book.spread()} | "
+          f"Asset 最新价 {asset.get_price():.2f} | SMA {asset.get_sma():.2f}")
+    bids, asks = book.depth(levels=5)
+    print(f"  {'买量':>8} {'买价':>8} | {'卖价':<8} {'卖量':<8}")
+    for (bp, bq), (ap, aq) in zip(bids, asks):
+        print(f"  {bq:>10,} {bp:>10.2f} | {ap:<10.2f} {aq:<10,}")
+
+
+if __name__ == "__main__":
+    main()
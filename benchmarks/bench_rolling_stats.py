@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.models import Asset
+from core.rolling import RollingWindow
+
+"""
+benchmarks/bench_rolling_stats.py
+---------------------------------
+滑动窗口统计微基准。
+对比旧版 "deque + statistics.mean / stdev / min / max" 与增量统计 RollingWindow
+在每个 tick 都读取 SMA、波动率和区间时的耗时 (HFT 循环、__str__、to_dict 都是这样用的)。
+
+用法:
+    python benchmarks/bench_rolling_stats.py --ticks 50000 --windows 5 50 500
+"""
+
+
+def legacy_tick(window, price):
+    """旧实现：每次读取都遍历整个窗口"""
+    window.append(price)
+    sma = statistics.mean(window)
+    vol = statistics.stdev(window) if len(window) > 1 else 0.0
+    return sma, vol, min(window), max(window)
+
+
+def rolling_tick(window, price):
+    window.append(price)
+    return window.mean, window.stdev, window.min, window.max
+
+
+def run(label, tick, window, prices):
+    started = time.perf_counter()
+    for price in prices:
+        result = tick(window, price)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<12} {elapsed:8.3f}s  {len(prices) / elapsed:>12,.0f} ticks/s")
+    return elapsed, result
+
+
+def run_sma_only(window_size, prices):
+    """只比较 get_sma()：旧版 statistics.mean vs 新版 Asset"""
+    legacy = deque(maxlen=window_size)
+    started = time.perf_counter()
+    for price in prices:
+        legacy.append(price)
+        statistics.mean(legacy)
+    legacy_time = time.perf_counter() - started
+
+    asset = Asset("BENCH", prices[0], window_size=window_size)
+    started = time.perf_counter()
+    for price in prices:
+        asset.update_price(price)
+        asset.get_sma()
+    asset_time = time.perf_counter() - started
+    print(f"  get_sma():   旧版 {legacy_time:.3f}s  新版 {asset_time:.3f}s  加速 {legacy_time / asset_time:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="滑动窗口统计微基准")
+    parser.add_argument("--ticks", type=int, default=50000)
+    parser.add_argument("--windows", type=int, nargs="+", default=[5, 50])
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    prices = [100.0]
+    for _ in range(args.ticks - 1):
+        prices.append(max(0.01, prices[-1] + rng.gauss(0, 0.5)))
+
+    for size in args.windows:
+        print(f"\n[窗口大小 {size}] {args.ticks} ticks，每个 tick 读取 SMA + 波动率 + 区间")
+        legacy_time, legacy_result = run("deque", legacy_tick, deque(maxlen=size), prices)
+        rolling_time, rolling_result = run("Rolling", rolling_tick, RollingWindow(size), prices)
+        print(f"  加速 {legacy_time / rolling_time:.1f}x | 最终结果差异: "
+              f"SMA {abs(legacy_result[0] - rolling_result[0]):.2e}, σ {abs(legacy_result[1] - rolling_result[1]):.2e}")
+        run_sma_only(size, prices)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from core.models import AssetStore
+from core.security import save_file_signature, AtomicSignedWriter
+from core.storage import AssetJournal, dump_json_array
+
+"""
+benchmarks/bench_storage.py
+---------------------------
+保存开销压测: 整个文件重写 vs 追加日志。
+构建 N 个资产 (默认 10 万，AssetStore)，每轮随机修改 k 个价格后保存：
+1. 旧版 save_data: json.dump(indent=4) 重写整个 market_data.json，再读回来计算签名
+2. 单遍重写 (压缩时的写法): dump_json_array 分批序列化，AtomicSignedWriter 边写边哈希，
+   fsync 后原子替换数据和签名
+3. AssetJournal.save: 与上次内容比较，只追加变化的资产 (压缩在后台线程中进行)
+最后测量 基础文件 + 日志 的重放 (load_records) 耗时。
+
+用法:
+    python benchmarks/bench_storage.py --count 100000 --changes 10 --rounds 20
+"""
+
+
+def build_store(count):
+    store = AssetStore(capacity=count)
+    for i in range(count):
+        if i % 2:
+            store.add(f"C{i:07d}", 100.0 + i % 100, "Crypto", "Ethereum")
+        else:
+            store.add(f"S{i:07d}", 100.0 + i % 100, "Stock", "NASDAQ")
+    return store
+
+
+def legacy_save(path, sig, items):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(items, f, indent=4, ensure_ascii=False)
+    save_file_signature(path, sig)
+
+
+def signed_save(path, sig, items):
+    with AtomicSignedWriter(path, sig) as f:
+        dump_json_array(items, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="整个文件重写 vs 追加日志的保存开销")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--changes", type=int, default=10, help="每轮修改的资产数")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    store = build_store(args.count)
+    rng = np.random.default_rng(0)
+    folder = tempfile.mkdtemp()
+    try:
+        legacy_path = os.path.join(folder, "legacy.json")
+        journal = AssetJournal(os.path.join(folder, "market_data.json"))
+        journal.save(store.to_dicts())
+
+        signed_path = os.path.join(folder, "signed.json")
+        legacy, signed, journaled, serialize = [], [], [], []
+        for _ in range(args.rounds):
+            rows = rng.integers(0, args.count, args.changes)
+            store.update_prices(rows, store.prices[rows] * rng.uniform(0.99, 1.01, args.changes))
+            started = time.perf_counter()
+            items = store.to_dicts()
+            serialize.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            legacy_save(legacy_path, legacy_path + ".sig", items)
+            legacy.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            signed_save(signed_path, signed_path + ".sig", items)
+            signed.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            journal.save(items)
+            journaled.append(time.perf_counter() - started)
+        journal.wait()
+
+        print(f"\n[保存] {args.count:,} 个资产，每轮修改 {args.changes} 个，{args.rounds} 轮 (中位数)")
+        print(f"  to_dicts() 序列化 (两者共同的开销)       {np.median(serialize) * 1000:10.2f} ms")
+        print(f"  旧版: 重写 JSON + 读回计算签名            {np.median(legacy) * 1000:10.2f} ms")
+        print(f"  单遍重写: 边写边哈希 + fsync + 原子替换  {np.median(signed) * 1000:10.2f} ms")
+        print(f"  追加日志                                  {np.median(journaled) * 1000:10.2f} ms")
+        print(f"  日志大小                                  {os.path.getsize(journal.journal_file) / 1024:10.1f} KB")
+
+        started = time.perf_counter()
+        records = AssetJournal(journal.data_file).load_records()
+        print(f"\n[读取] 基础文件 + 重放日志: {len(records):,} 条，{(time.perf_counter() - started) * 1000:.1f} ms")
+        assert records == store.to_dicts()
+    finally:
+        journal.close()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.models import AssetStore
+from core.storage import AssetJournal, make_asset
+
+"""
+benchmarks/bench_storage_load.py
+--------------------------------
+读取 market_data.json 的峰值内存与延迟: 整体 json.load vs 流式生成器。
+先生成 N 个资产 (默认 100 万) 的基础文件 (indent=4，与 save_data 相同) 和少量日志，
+然后每种读取方式在独立的子进程中运行 (ru_maxrss 只增不减，必须分开测)：
+1. json.load      旧版: 整个文件读成一个列表，再逐个构造 Stock / Crypto
+2. stream         iter_records + make_asset，结果同样保存在列表里
+3. stream-scan    流式遍历但不保留对象 (例如只算总市值)
+4. stream-filter  流式读取，只保留少量指定代码的资产
+报告 首个资产的延迟、总耗时、峰值 RSS 以及相对子进程导入模块后的增量。
+
+用法:
+    python benchmarks/bench_storage_load.py --count 1000000
+"""
+
+MODES = ["json.load", "stream", "stream-scan", "stream-filter"]
+
+
+def build_files(folder, count):
+    store = AssetStore(capacity=count)
+    for i in range(count):
+        if i % 2:
+            store.add(f"C{i:07d}", 100.0 + i % 100, "Crypto", "Ethereum")
+        else:
+            store.add(f"S{i:07d}", 100.0 + i % 100, "Stock", "NASDAQ")
+    journal = AssetJournal(os.path.join(folder, "market_data.json"))
+    journal.save(store.to_dicts())
+    rows = list(range(0, count, count // 100))
+    store.update_prices(rows, [1.0] * len(rows))  # 日志里有 100 条变更
+    journal.save(store.to_dicts())
+    journal.close()
+    return journal.data_file
+
+
+def rss_mb():
+    """
+    本进程的峰值 RSS (MB)。优先读 /proc 的 VmHWM: exec 之后重新计数；
+    ru_maxrss 会继承 fork 时父进程的峰值 (父进程生成数据时已经占用了大量内存)。
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux 下单位是 KB
+
+
+def worker(mode, path, count):
+    """在子进程中运行一种读取方式，输出一行 JSON"""
+    base = rss_mb()
+    started = time.perf_counter()
+    first = None
+    if mode == "json.load":
+        with open(path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        assets = []
+        for item in items:
+            if first is None:
+                first = time.perf_counter() - started
+            assets.append(make_asset(item))
+        kept = len(assets)
+    else:
+        journal = AssetJournal(path)
+        symbols = {f"S{i:07d}" for i in range(0, count, count // 10)} if mode == "stream-filter" else None
+        assets, total = [], 0.0
+        for item in journal.iter_records(symbols=symbols):
+            if first is None:
+                first = time.perf_counter() - started
+            if mode == "stream-scan":
+                total += item["price"]
+            else:
+                assets.append(make_asset(item))
+        kept = len(assets)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"first": first, "total": elapsed, "base": base, "peak": rss_mb(), "kept": kept}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="整体 json.load vs 流式读取的峰值内存与延迟")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.worker, args.path, args.count)
+
+    folder = tempfile.mkdtemp()
+    try:
+        started = time.perf_counter()
+        path = build_files(folder, args.count)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"[数据] {args.count:,} 个资产，基础文件 {size_mb:.1f} MB，生成耗时 {time.perf_counter() - started:.1f} s")
+
+        print(f"\n  {'方式':<16}{'首个资产 ms':>12}{'总耗时 s':>10}{'峰值 RSS MB':>14}{'增量 MB':>10}{'保留对象':>10}")
+        for mode in MODES:
+            out = subprocess.run([sys.executable, __file__, "--worker", mode, "--path", path,
+                                  "--count", str(args.count)], capture_output=True, text=True, check=True)
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"  {mode:<16}{result['first'] * 1000:12.1f}{result['total']:10.2f}"
+                  f"{result['peak']:14.1f}{result['peak'] - result['base']:10.1f}{result['kept']:10,}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
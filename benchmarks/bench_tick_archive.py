@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from core.db_manager import DatabaseManager, DATA_DIR
+from core.tick_archive import TickArchive, to_micros
+
+"""
+benchmarks/bench_tick_archive.py
+--------------------------------
+冷数据层 (memmap 二进制归档) 与 SQLite 范围查询的对比压测。
+同一份数据分别写入 SQLite (按月分区 + (symbol, recorded_at) 索引) 和 TickArchive，
+对比小范围 (1 小时)、大范围 (1 天 / 1 周)、单符号全量读取成 numpy 数组的耗时，以及磁盘占用。
+
+用法:
+    python benchmarks/bench_tick_archive.py --rows 2000000 --symbols 10
+    python benchmarks/bench_tick_archive.py --rows 10000000 --symbols 10 --interval 1
+"""
+
+
+def populate(db, archive, rows, symbols, interval=1, chunk=200_000):
+    """按时间顺序轮流为每个符号生成记录，同时写入 SQLite 和归档"""
+    names = [f"S{i:04d}" for i in range(symbols)]
+    start = datetime(2020, 1, 1)
+    for offset in range(0, rows, chunk):
+        index = np.arange(offset, min(rows, offset + chunk))
+        prices = 100.0 + (index % 1000) * 0.01
+        moments = [start + timedelta(seconds=int(i) // symbols * interval) for i in index]
+        db.write_rows([(names[i % symbols], float(p), "Simulated", m)
+                       for i, p, m in zip(index.tolist(), prices, moments)])
+        ts = np.fromiter((to_micros(m) for m in moments), dtype=np.int64, count=len(moments))
+        for k, name in enumerate(names):
+            mask = index % symbols == k
+            archive.append(name, ts[mask], prices[mask])
+        print(f"\r[导入] {offset + len(index):,} / {rows:,}", end="", flush=True)
+    print()
+    return names, start
+
+
+def timed(label, func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    print(f"  {label:<36} {best * 1000:10.2f} ms")
+    return result
+
+
+def sqlite_arrays(db, symbol, start, end):
+    """SQLite 热数据路径: 键集分页逐行读取后转换成数组"""
+    prices = [row[1] for table in db._tables(start, end) for chunk in db._iter_table(table, symbol, start, end)
+              for row in chunk]
+    return np.asarray(prices, dtype=np.float64)
+
+
+def archive_arrays(archive, symbol, start, end):
+    """归档路径: 二分查找 + memmap 切片 (np.array 强制把页读进来，与 SQLite 的结果可比)"""
+    _, prices = archive.read(symbol, start, end)
+    return np.array(prices)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷数据层与 SQLite 范围查询对比")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--interval", type=int, default=1, help="每个符号相邻两条记录的间隔秒数")
+    args = parser.parse_args()
+
+    folder = os.path.join(DATA_DIR, "bench_ticks")
+    shutil.rmtree(folder, ignore_errors=True)
+    os.makedirs(folder)
+    db = DatabaseManager(os.path.join(folder, "bench.db"), flush_interval=60)
+    archive = TickArchive(os.path.join(folder, "cold"))
+    try:
+        started = time.perf_counter()
+        names, start = populate(db, archive, args.rows, args.symbols, args.interval)
+        print(f"[导入] 耗时 {time.perf_counter() - started:.1f}s")
+
+        symbol = names[len(names) // 2]
+        per_symbol = args.rows // args.symbols
+        middle = start + timedelta(seconds=per_symbol // 2 * args.interval)
+        ranges = [("1 小时", timedelta(hours=1)), ("1 天", timedelta(days=1)), ("1 周", timedelta(weeks=1))]
+        print(f"\n[查询] 符号 {symbol}，每个符号约 {per_symbol:,} 条")
+        for label, span in ranges:
+            lo, hi = middle, middle + span
+            a = timed(f"SQLite 范围查询 {label}", lambda: sqlite_arrays(db, symbol, lo, hi))
+            b = timed(f"归档 memmap 范围查询 {label}", lambda: archive_arrays(archive, symbol, lo, hi))
+            assert np.array_equal(a, b), "两种存储读出的数据不一致"
+            print(f"  ({len(a):,} 条)")
+        a = timed("SQLite 单符号全量读取", lambda: sqlite_arrays(db, symbol, None, None), repeat=1)
+        b = timed("归档单符号全量读取", lambda: archive_arrays(archive, symbol, None, None), repeat=1)
+        assert np.array_equal(a, b)
+
+        db.compact()
+        print("\n[磁盘]")
+        print(f"  SQLite (含索引 / 汇总表 / 统计表)      {os.path.getsize(db.db_file) / 1e6:10.1f} MB")
+        print(f"  归档 (16 字节 / 条)                    {archive.disk_bytes() / 1e6:10.1f} MB")
+    finally:
+        db.close()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
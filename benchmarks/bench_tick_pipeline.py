@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.hft_sim import GBMTickGenerator, run_pipeline, apply_to_assets, apply_to_store, db_sink, web_sink
+from core.models import Stock, AssetStore
+
+"""
+benchmarks/bench_tick_pipeline.py
+---------------------------------
+端到端 tick 流水线压测。
+GBM 生成器 -> 更新资产 (对象模型 / 列式存储) -> [可选] 数据库写入 -> [可选] Web JSON 序列化，
+报告整体 ticks/s、各阶段耗时以及每个 tick 的延迟分位数。
+
+注意: --db 会写入项目自带的数据库 (core.db_manager 的默认配置)。
+
+用法:
+    python benchmarks/bench_tick_pipeline.py --symbols 500 --steps 2000 --block 100
+    python benchmarks/bench_tick_pipeline.py --symbols 50 --steps 400 --rate 20000 --web
+"""
+
+
+def report(label, result):
+    lat = result["latency"]
+    print(f"\n[{label}] {result['ticks']:,} ticks / {result['elapsed']:.2f}s = {result['ticks_per_sec']:,.0f} ticks/s")
+    print(f"  延迟 (ms): p50 {lat['p50']:.2f} | p95 {lat['p95']:.2f} | p99 {lat['p99']:.2f} | max {lat['max']:.2f}")
+    for name, stat in result["stages"].items():
+        print(f"  阶段 {name:<9} 合计 {stat['total']:.3f}s | 平均每块 {stat['avg'] * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端 tick 流水线压测")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--steps", type=int, default=2000, help="每个符号生成的 tick 数")
+    parser.add_argument("--block", type=int, default=100, help="每块包含的步数")
+    parser.add_argument("--rate", type=float, default=None, help="目标速率 (ticks/s)，默认全速")
+    parser.add_argument("--db", action="store_true", help="每块写一次数据库快照")
+    parser.add_argument("--web", action="store_true", help="每块生成一次 /api/data JSON")
+    args = parser.parse_args()
+
+    symbols = [f"S{i:05d}" for i in range(args.symbols)]
+
+    # 0. 只跑生成器，测上限
+    generator = GBMTickGenerator(symbols, seed=42)
+    started = time.perf_counter()
+    total = sum(block.tick_count for block in generator.stream(args.steps, args.block))
+    elapsed = time.perf_counter() - started
+    print(f"[生成器] {total:,} ticks / {elapsed:.3f}s = {total / elapsed:,.0f} ticks/s")
+
+    db = None
+    if args.db:
+        from core.db_manager import db_engine
+        db = db_engine
+
+    assets = [Stock(s, 100.0) for s in symbols]
+    store = AssetStore.from_assets(assets)
+    for label, target, apply in (("对象模型", assets, apply_to_assets), ("列式存储", store, apply_to_store)):
+        sinks = [("apply", apply(target))]
+        if db is not None:
+            sinks.append(("db", db_sink(db, target)))
+        if args.web:
+            sinks.append(("web", web_sink(target)))
+        result = run_pipeline(GBMTickGenerator(symbols, seed=42), args.steps, sinks, args.block, args.rate)
+        report(label, result)
+
+
+if __name__ == "__main__":
+    main()
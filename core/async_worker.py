@@ -1,85 +1,329 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import atexit
+import itertools
 import threading
-import queue
 import time
-from core.network import fetch_real_price
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from core.http_client import get_session_pool
+from core.network import (
+    fetch_price_batch_async, split_batches, route_symbols, is_supported, registered_providers, REQUEST_TIMEOUT
+)
+from core.sys_config import GlobalConfig
+from utils.tools import TimingStat
 
 """
 core/async_worker.py
 --------------------
-并发任务管理器。
-使用多线程 + 队列实现高效的网络请求。
+并发任务管理器 (asyncio 版)。
+一个长期存活的工作池：后台线程运行事件循环，固定数量的工人协程从池子自己的队列中取任务。
 
 【知识点】
-1. queue.Queue: 线程安全的队列，用于在线程间传递数据。
-2. threading.Thread: 创建并启动线程。
-3. daemon线程: 守护线程，主程序结束时它会自动结束。
+1. asyncio.PriorityQueue: 协程之间传递任务的优先队列，每个工作池拥有自己的一条。
+   持仓资产 (PRIORITY_HELD) 排在关注列表 (PRIORITY_WATCHLIST) 前面刷新。
+2. 固定数量的工人协程: 并发上限 = 工人数量，反复点击"扫描"不会再多出线程。
+   每个请求携带同一数据源的一批符号 (见 network.route_symbols)，500 个币种只需几次往返。
+3. concurrent.futures.Future: 每次扫描返回一个 Future，调用方线程可以阻塞等待结果，
+   不同扫描的结果互不干扰。
+4. call_soon_threadsafe: 从其他线程安全地把任务交给事件循环。
+5. metrics(): 分别统计排队等待、等待令牌和真正发请求的耗时，便于判断瓶颈在哪一层。
 """
 
-# 创建一个全局的“任务传送带”
-task_queue = queue.Queue()
+# 全局配置单例 (并发上限来自 max_threads)
+config = GlobalConfig()
 
+# 单次请求的默认超时 (秒)
+DEFAULT_TIMEOUT = REQUEST_TIMEOUT
 
-def worker_logic(thread_id):
+# 任务优先级 (数字越小越先处理)
+PRIORITY_HELD = 0         # 持仓资产
+PRIORITY_WATCHLIST = 10   # 关注列表
+_PRIORITY_SHUTDOWN = 1 << 30  # 下班信号排在所有任务之后
+
+# 单个资产的扫描结果 (error 为 None 表示更新成功)
+ScanResult = namedtuple("ScanResult", ["symbol", "old_price", "new_price", "change_pct", "error"])
+
+
+def get_concurrency_limit():
+    """
+    读取配置中的最大并发数，非法值回退为 1。
+    """
+    try:
+        limit = int(config['max_threads'] or 1)
+    except (TypeError, ValueError):
+        limit = 1
+    return max(1, limit)
+
+
+class ScanHandle:
+    """
+    一次扫描的句柄，包装了 concurrent.futures.Future。
+    """
+
+    def __init__(self, scan_id, total):
+        self.scan_id = scan_id
+        self.total = total
+        self.future = Future()
+
+    def result(self, timeout=None):
+        """阻塞等待扫描完成，返回 ScanResult 列表 (顺序与提交时一致)"""
+        return self.future.result(timeout)
+
+    def done(self):
+        return self.future.done()
+
+
+class _Scan:
+    """工作池内部的扫描状态 (只在事件循环线程中访问，不需要加锁)"""
+
+    def __init__(self, handle, assets):
+        self.handle = handle
+        self.results = [None] * len(assets)
+        self.pending = 0
+
+    def finish_batch(self):
+        self.pending -= 1
+        # future 是公开的，调用方可能已经 cancel()；此时再 set_result 会抛 InvalidStateError，
+        # 在工人协程的 finally 里抛出会让这个工人悄悄退出，工作池永久少一个工人
+        if self.pending == 0 and not self.handle.future.done():
+            self.handle.future.set_result(self.results)
+
+
+class FetchWorkerPool:
     """
-    这是每个工人的工作手册（线程函数）。
+    长期存活、大小固定的价格抓取工作池
     """
-    while True:
-        # 1. 从队列获取任务 (如果队列空了，会在这里等待)
-        asset = task_queue.get()
 
-        # 2. 处理任务
+    def __init__(self, max_workers=None, timeout=DEFAULT_TIMEOUT, batch_size=None):
+        """batch_size 为 None 时使用各数据源声明的批量大小，否则取两者中较小的一个"""
+        self.max_workers = max_workers or get_concurrency_limit()
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()  # 同优先级内保持先进先出
+        self.queue_wait = {}           # priority -> TimingStat
+        self.batch_time = TimingStat()
+        self._closed = False
+        self._lock = threading.Lock()
+
+        # 阻塞的 HTTP 请求交给一个与工人数量同样大小的线程池
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="omni-fetch")
+
+        # 后台线程运行事件循环，队列和工人协程在循环内创建
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="omni-fetch-loop", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    # -------------------------------
+    #  事件循环线程
+    # -------------------------------
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [self._loop.create_task(self._worker()) for _ in range(self.max_workers)]
+        self._ready.set()
+        self._loop.run_forever()
+
+        # run_forever 返回说明已经 stop()，收尾后关闭循环
+        self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        self._loop.close()
+
+    async def _worker(self):
+        """工人协程：不停地从队列取一个批次来处理，收到 None 时下班"""
+        while True:
+            priority, _, job = await self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            scan, batch, enqueued_at = job
+            started = time.perf_counter()
+            self.queue_wait[priority].add(started - enqueued_at)
+            try:
+                await self._process_batch(scan, batch)
+            finally:
+                self.batch_time.add(time.perf_counter() - started)
+                scan.finish_batch()
+                self._queue.task_done()
+
+    async def _process_batch(self, scan, batch):
+        """batch 是 [(下标, 资产), ...]，一次请求拿到整批价格，再逐个写回"""
+        symbols = list(dict.fromkeys(asset.symbol for _, asset in batch))
         try:
-            print(f" [线程-{thread_id}] 正在处理: {asset.symbol} ...")
+            prices = await fetch_price_batch_async(symbols, self.timeout, self._executor)
+            error = "获取失败"
+        except Exception as e:
+            prices = {}
+            error = f"发生意外: {e}"
+
+        for index, asset in batch:
+            try:
+                scan.results[index] = apply_price(asset, prices.get(asset.symbol), error)
+            except Exception as e:
+                scan.results[index] = ScanResult(asset.symbol, None, None, None, f"发生意外: {e}")
 
-            # 调用上一阶段写的网络函数
-            real_price = fetch_real_price(asset.symbol)
+    def _enqueue(self, scan, batches, priority):
+        # metrics() 在调用方线程遍历 queue_wait，增加新的优先级时必须持有同一把锁
+        with self._lock:
+            self.queue_wait.setdefault(priority, TimingStat())
+        now = time.perf_counter()
+        for batch in batches:
+            self._queue.put_nowait((priority, next(self._seq), (scan, batch, now)))
 
-            if real_price is not None:
-                old_price = asset.get_price()
-                asset.update_price(real_price)
+    # -------------------------------
+    #  对外接口 (任意线程可调用)
+    # -------------------------------
+    def submit(self, assets_list, priority=PRIORITY_HELD):
+        """
+        提交一次扫描，立即返回 ScanHandle。
+        priority 越小越先处理；不支持的符号直接记为失败，不占用队列。
+        """
+        assets_list = list(assets_list)
+        handle = ScanHandle(next(self._ids), len(assets_list))
+        scan = _Scan(handle, assets_list)
 
-                # 计算涨跌幅
-                change = ((real_price - old_price) / old_price) * 100
-                print(f" ✅ [线程-{thread_id}] {asset.symbol} 更新完毕: ${real_price:,.2f} ({change:+.2f}%)")
+        # 同一个符号只放进一个批次，批次内再对应回多个资产
+        by_symbol = {}
+        for index, asset in enumerate(assets_list):
+            if is_supported(asset.symbol):
+                by_symbol.setdefault(asset.symbol, []).append((index, asset))
             else:
-                print(f" ⚠️ [线程-{thread_id}] {asset.symbol} 获取失败，保持原价。")
+                scan.results[index] = ScanResult(asset.symbol, asset.get_price(), None, None, "不支持的符号")
 
-        except Exception as e:
-            print(f" !! [线程-{thread_id}] 发生意外: {e}")
+        # 按数据源分组，每个数据源按自己的批量大小切分
+        batches = []
+        for provider, symbols in route_symbols(list(by_symbol)).items():
+            size = min(provider.batch_size, self.batch_size or provider.batch_size)
+            for symbol_batch in split_batches(symbols, size):
+                batches.append([item for s in symbol_batch for item in by_symbol[s]])
+
+        if not batches:
+            handle.future.set_result(scan.results)
+            return handle
+
+        scan.pending = len(batches)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("工作池已关闭，不能再提交扫描")
+            self._loop.call_soon_threadsafe(self._enqueue, scan, batches, priority)
+        return handle
+
+    def shutdown(self, wait=True):
+        """
+        关闭工作池：已经排队的批次会先处理完，然后工人协程下班、事件循环停止。
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
 
-        finally:
-            # 3. 标记该任务已完成 (通知队列)
-            # 这一步至关重要，配合 q.join() 使用
-            task_queue.task_done()
+        async def drain():
+            for _ in self._workers:
+                self._queue.put_nowait((_PRIORITY_SHUTDOWN, next(self._seq), None))
+            await asyncio.gather(*self._workers)
 
+        future = asyncio.run_coroutine_threadsafe(drain(), self._loop)
+        if wait:
+            future.result()
+        future.add_done_callback(lambda _: self._loop.call_soon_threadsafe(self._loop.stop))
+        if wait:
+            self._thread.join()
+        self._executor.shutdown(wait=wait)
 
-def start_concurrent_update(assets_list):
+    def metrics(self):
+        """
+        耗时分解 (单位: 秒)：
+        - queue_wait: 批次在队列里排队的时间 (按优先级分组)
+        - batch_time: 批次从出队到处理完的时间
+        - rate_limit_wait: 其中等待令牌的时间 (按数据源分组)
+        - request_time: 其中真正花在 HTTP 请求上的时间
+        """
+        rate_limit_wait = {}
+        for provider in registered_providers():
+            if provider.limiter is not None:
+                rate_limit_wait[provider.name] = provider.limiter.wait_time.snapshot()
+        with self._lock:
+            queue_wait = sorted(self.queue_wait.items())
+        return {
+            "queue_wait": {p: stat.snapshot() for p, stat in queue_wait},
+            "batch_time": self.batch_time.snapshot(),
+            "rate_limit_wait": rate_limit_wait,
+            "request_time": get_session_pool().request_time.snapshot(),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+
+def apply_price(asset, real_price, error="获取失败"):
     """
-    启动多线程更新的主入口
+    把获取到的价格写回资产对象，返回 ScanResult。
     """
-    start_time = time.time()
-    print(f"\n [并发] 启动多线程引擎... (目标: {len(assets_list)} 个资产)")
+    old_price = asset.get_price()
+    if real_price is None:
+        return ScanResult(asset.symbol, old_price, None, None, error)
+
+    asset.update_price(real_price)
 
-    # --- 1. 填充队列 (生产者) ---
-    for asset in assets_list:
-        task_queue.put(asset)
+    # 计算涨跌幅 (原价为 0 时无法计算)
+    change = ((real_price - old_price) / old_price) * 100 if old_price else 0.0
+    return ScanResult(asset.symbol, old_price, real_price, change, None)
 
-    # --- 2. 创建并启动工人 (消费者) ---
-    # 假设我们要 3 个工人同时干活
-    num_threads = 3
-    threads = []
 
-    for i in range(num_threads):
-        t = threading.Thread(target=worker_logic, args=(i + 1,))
-        t.daemon = True  # 设置为守护线程：主程序退出了，工人也下班，不要死赖着不走
-        t.start()
-        threads.append(t)
+# 全局默认工作池 (首次使用时创建，程序退出时自动关闭)
+_default_pool = None
+_default_pool_lock = threading.Lock()
 
-    # --- 3. 等待所有任务完成 ---
-    # 阻塞主程序，直到队列里所有的任务都被 task_done()
-    task_queue.join()
+
+def get_worker_pool():
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = FetchWorkerPool()
+                atexit.register(_default_pool.shutdown)
+    return _default_pool
+
+
+def start_concurrent_update(assets_list, max_concurrency=None, timeout=DEFAULT_TIMEOUT, pool=None, watchlist=None):
+    """
+    启动并发更新的主入口 (同步包装，供 main.py / gui_app.py 直接调用)
+    assets_list 为持仓资产，watchlist 为可选的关注列表 (优先级更低，排在持仓之后刷新)。
+    默认使用全局工作池；指定 max_concurrency / timeout (且没有传入 pool) 时，
+    为这一次调用单独建一个工作池，用完即关闭。传入 pool 时以该工作池自己的设置为准。
+    返回成功更新的资产数量。
+    """
+    if pool is None and (max_concurrency is not None or timeout != DEFAULT_TIMEOUT):
+        with FetchWorkerPool(max_workers=max_concurrency, timeout=timeout) as own_pool:
+            return _run_update(own_pool, assets_list, watchlist)
+    return _run_update(pool or get_worker_pool(), assets_list, watchlist)
+
+
+def _run_update(pool, assets_list, watchlist):
+    watchlist = list(watchlist or [])
+    total = len(assets_list) + len(watchlist)
+    start_time = time.time()
+    print(f"\n [并发] 提交扫描任务... (目标: {total} 个资产, 工人数: {pool.max_workers})")
+
+    handles = [pool.submit(assets_list, PRIORITY_HELD)]
+    if watchlist:
+        handles.append(pool.submit(watchlist, PRIORITY_WATCHLIST))
+
+    updated = 0
+    for handle in handles:
+        for r in handle.result():
+            if r.error:
+                print(f" ⚠️ [并发] {r.symbol} {r.error}，保持原价。")
+            else:
+                updated += 1
+                print(f" ✅ [并发] {r.symbol} 更新完毕: ${r.new_price:,.2f} ({r.change_pct:+.2f}%)")
 
     end_time = time.time()
     duration = end_time - start_time
-    print(f" [并发] 所有更新完成！总耗时: {duration:.2f} 秒")
\ No newline at end of file
+    print(f" [并发] 所有更新完成！成功 {updated}/{total}，总耗时: {duration:.2f} 秒")
+    return updated
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from core.config import INITIAL_CAPITAL, TAX_RATE
+
+"""
+core/backtest.py
+----------------
+向量化回测引擎。
+在一整段价格数组上一次性算出信号、持仓、手续费和收益，不再逐个价格循环；
+参数扫描 (几千组买卖阈值) 按块分给进程池并行计算。
+
+【知识点】
+1. 阈值策略: 价格低于 buy_below 发出 BUY，高于 sell_above 发出 SELL，其余 HOLD。
+   simulator.stream_market_data 与回测共用同一个 ThresholdStrategy。
+2. 对数收益: 持仓期间的收益 = log(离场价 / 进场价)，每笔交易的手续费 = log(1 - TAX_RATE)，
+   最终资金 = 本金 × exp(总对数收益)。
+3. 事件驱动 + 向量化: 阈值策略只在价格"进入区域"时交易。预先用 np.searchsorted 建好每个阈值的
+   区域入口索引，所有参数组合同时跳到下一次进场 / 离场，循环次数 = 最多的交易笔数，与 tick 数无关。
+4. 逐 tick 资金曲线 (计算回撤时需要): "最近一次 BUY 的位置" 与 "最近一次 SELL 的位置"
+   用 np.maximum.accumulate 求出，前者更晚就表示持仓；多组参数用广播得到 (K, T) 矩阵。
+5. ProcessPoolExecutor: 参数组合分块后交给多个进程，价格数组通过 initializer 只传给每个进程一次。
+"""
+
+# 每块参数组合 × 价格长度的元素上限 (控制单块内存，约 16 MB / 每个 (K, T) 矩阵)
+CHUNK_ELEMENTS = 2_000_000
+
+# 信号编码
+BUY, HOLD, SELL = 1, 0, -1
+SIGNAL_NAMES = {BUY: "BUY", HOLD: "HOLD", SELL: "SELL"}
+
+
+class ThresholdStrategy:
+    """
+    阈值策略 (默认参数与原来 simulator 中写死的 120 / 180 一致)
+    """
+
+    def __init__(self, buy_below=120.0, sell_above=180.0):
+        if buy_below >= sell_above:
+            raise ValueError("buy_below 必须小于 sell_above")
+        self.buy_below = buy_below
+        self.sell_above = sell_above
+
+    def action(self, price):
+        """单个价格 -> "BUY" / "SELL" / "HOLD" """
+        return SIGNAL_NAMES[self.signal(price)]
+
+    def signal(self, price):
+        if price < self.buy_below:
+            return BUY
+        if price > self.sell_above:
+            return SELL
+        return HOLD
+
+    def signals(self, prices):
+        """价格数组 -> 信号数组 (int8)"""
+        prices = np.asarray(prices, dtype=np.float64)
+        return (prices < self.buy_below).astype(np.int8) - (prices > self.sell_above).astype(np.int8)
+
+
+DEFAULT_STRATEGY = ThresholdStrategy()
+
+
+# -------------------------------
+#  核心计算
+# -------------------------------
+class _CrossingIndex:
+    """
+    多个阈值的"区域入口"索引：对每个阈值记录价格进入区域 (低于 / 高于阈值) 的起始位置，
+    全部编码进一个有序数组 (键 = 阈值编号 × (T+1) + 位置)，一次 np.searchsorted 即可为所有参数组合
+    找到"t 之后第一次进入区域"的位置。
+    """
+
+    def __init__(self, prices, levels, below):
+        self.prices = prices
+        self.length = len(prices)
+        self.levels, self.level_ids = np.unique(levels, return_inverse=True)
+        self.below = below
+        stride = self.length + 1
+        keys = []
+        for lid, level in enumerate(self.levels):
+            inside = prices < level if below else prices > level
+            starts = np.flatnonzero(inside & ~np.concatenate(([False], inside[:-1])))
+            keys.append(starts + lid * stride)
+        self.keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+
+    def next(self, lids, t):
+        """对每个组合，返回位置 >= t 且处于区域内的第一个下标，没有则为 -1"""
+        t = np.asarray(t)
+        safe_t = np.minimum(t, self.length - 1)
+        level = self.levels[lids]
+        inside = self.prices[safe_t] < level if self.below else self.prices[safe_t] > level
+        stride = self.length + 1
+        pos = np.searchsorted(self.keys, lids * stride + t)
+        found = pos < len(self.keys)
+        candidate = self.keys[np.minimum(pos, len(self.keys) - 1)] if len(self.keys) else np.zeros_like(t)
+        found &= candidate // stride == lids
+        result = np.where(found, candidate % stride, -1)
+        result = np.where(inside & (t < self.length), t, result)
+        return np.where(t >= self.length, -1, result)
+
+
+def _evaluate_events(prices, buy_below, sell_above, fee, capital):
+    """
+    事件驱动的向量化回测：所有参数组合同时"跳"到下一次进场 / 离场的位置，
+    循环次数只取决于最多的交易笔数，与价格长度无关。
+    """
+    k = len(buy_below)
+    log_prices = np.log(prices)
+    fee_cost = np.log1p(-fee)
+    buys = _CrossingIndex(prices, buy_below, below=True)
+    sells = _CrossingIndex(prices, sell_above, below=False)
+    buy_ids = buys.level_ids
+    sell_ids = sells.level_ids
+
+    log_equity = np.zeros(k)
+    fees = np.zeros(k)
+    trades = np.zeros(k, dtype=np.int64)
+    held_ticks = np.zeros(k, dtype=np.int64)
+    t = np.zeros(k, dtype=np.int64)
+    active = np.arange(k)
+
+    while len(active):
+        # 1. 空仓 -> 找下一次进场
+        entry = buys.next(buy_ids[active], t[active])
+        keep = entry >= 0
+        active, entry = active[keep], entry[keep]
+        fees[active] += capital * fee * np.exp(log_equity[active])
+        log_equity[active] += fee_cost
+        trades[active] += 1
+
+        # 2. 持仓 -> 找下一次离场 (找不到就持有到最后)
+        exit_ = sells.next(sell_ids[active], entry)
+        open_end = exit_ < 0
+        exit_at = np.where(open_end, len(prices) - 1, exit_)
+        log_equity[active] += log_prices[exit_at] - log_prices[entry]
+        held_ticks[active] += np.where(open_end, len(prices), exit_) - entry
+
+        closed = ~open_end
+        active, exit_ = active[closed], exit_[closed]
+        fees[active] += capital * fee * np.exp(log_equity[active])
+        log_equity[active] += fee_cost
+        trades[active] += 1
+        t[active] = exit_
+
+    total_return = np.expm1(log_equity)
+    return {
+        "buy_below": buy_below,
+        "sell_above": sell_above,
+        "total_return": total_return,
+        "pnl": capital * total_return,
+        "trades": trades,
+        "fees": fees,
+        "exposure": held_ticks / len(prices),
+    }
+
+
+def _positions(buy, sell):
+    """
+    buy / sell: 布尔矩阵 (K, T)。返回持仓矩阵 (K, T)，True 表示在 t 时刻收盘后持有。
+    """
+    index = np.arange(buy.shape[-1], dtype=np.int32)
+    last_buy = np.maximum.accumulate(np.where(buy, index, -1), axis=-1)
+    last_sell = np.maximum.accumulate(np.where(sell, index, -1), axis=-1)
+    return last_buy > last_sell
+
+
+def _equity_curves(prices, buy_below, sell_above, fee):
+    """逐 tick 的对数资金曲线 (K, T)，用于计算回撤和详细回测"""
+    buy = prices[None, :] < np.asarray(buy_below)[:, None]
+    sell = prices[None, :] > np.asarray(sell_above)[:, None]
+    held = _positions(buy, sell)
+    changed = np.empty_like(held)
+    changed[:, 0] = held[:, 0]
+    changed[:, 1:] = held[:, 1:] != held[:, :-1]
+    curve = np.cumsum(changed * np.log1p(-fee), axis=-1)
+    curve[:, 1:] += np.cumsum(np.where(held[:, :-1], np.diff(np.log(prices))[None, :], 0.0), axis=-1)
+    return held, curve
+
+
+def max_drawdown(prices, buy_below, sell_above, fee=TAX_RATE):
+    """每组参数资金曲线的最大回撤 (比例)，按块计算控制内存"""
+    prices = np.asarray(prices, dtype=np.float64)
+    buy_below = np.asarray(buy_below, dtype=np.float64)
+    sell_above = np.asarray(sell_above, dtype=np.float64)
+    parts = []
+    for b, s in _grid_chunks(buy_below, sell_above, len(prices)):
+        _, curve = _equity_curves(prices, b, s, fee)
+        drawdown = np.maximum.accumulate(np.maximum(curve, 0.0), axis=-1) - curve
+        parts.append(1.0 - np.exp(-drawdown.max(axis=-1)))
+    return np.concatenate(parts) if parts else np.zeros(0)
+
+
+def _grid_chunks(buy_below, sell_above, length):
+    per_chunk = max(1, CHUNK_ELEMENTS // max(1, length))
+    for start in range(0, len(buy_below), per_chunk):
+        yield buy_below[start:start + per_chunk], sell_above[start:start + per_chunk]
+
+
+def _merge(parts):
+    if not parts:
+        return {}
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+
+def evaluate_grid(prices, buy_below, sell_above, fee=TAX_RATE, capital=INITIAL_CAPITAL, drawdown=False):
+    """
+    在单个进程内评估多组 (buy_below[i], sell_above[i]) 参数，返回 {指标名: 长度 K 的数组}。
+    drawdown=True 时额外计算最大回撤 (需要逐 tick 的资金曲线，开销与 K × T 成正比)。
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    buy_below = np.asarray(buy_below, dtype=np.float64)
+    sell_above = np.asarray(sell_above, dtype=np.float64)
+    if len(buy_below) == 0 or len(prices) == 0:
+        return {}
+    result = _evaluate_events(prices, buy_below, sell_above, fee, capital)
+    if drawdown:
+        result["max_drawdown"] = max_drawdown(prices, buy_below, sell_above, fee)
+    return result
+
+
+def run_backtest(prices, strategy=DEFAULT_STRATEGY, fee=TAX_RATE, capital=INITIAL_CAPITAL):
+    """
+    单个策略的详细回测：返回信号、持仓、资金曲线和汇总指标。
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    held, curve = _equity_curves(prices, [strategy.buy_below], [strategy.sell_above], fee)
+    summary = evaluate_grid(prices, [strategy.buy_below], [strategy.sell_above], fee, capital, drawdown=True)
+    return {
+        "signals": strategy.signals(prices),
+        "positions": held[0],
+        "equity": capital * np.exp(curve[0]),
+        "summary": {key: values[0].item() for key, values in summary.items()},
+    }
+
+
+# -------------------------------
+#  参数扫描 (进程池)
+# -------------------------------
+_worker_prices = None
+
+
+def _init_worker(prices):
+    global _worker_prices
+    _worker_prices = prices
+
+
+def _evaluate_in_worker(args):
+    buy_below, sell_above, fee, capital = args
+    return evaluate_grid(_worker_prices, buy_below, sell_above, fee, capital)
+
+
+def parameter_grid(buy_levels, sell_levels):
+    """所有 buy_below < sell_above 的组合，返回 (buy_below 数组, sell_above 数组)"""
+    buy, sell = np.meshgrid(np.asarray(buy_levels, dtype=np.float64),
+                            np.asarray(sell_levels, dtype=np.float64), indexing="ij")
+    valid = buy < sell
+    return buy[valid], sell[valid]
+
+
+def sweep(prices, buy_levels, sell_levels, fee=TAX_RATE, capital=INITIAL_CAPITAL, processes=None, top_n=20):
+    """
+    参数扫描：评估 buy_levels × sell_levels 的所有有效组合，结果按 pnl 从高到低排序。
+    processes 为进程数 (默认 CPU 核数)，设为 1 时在当前进程内计算。
+    最大回撤只为排名前 top_n 的组合计算，其余为 NaN。
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    buy_below, sell_above = parameter_grid(buy_levels, sell_levels)
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1 or len(buy_below) < 2:
+        result = evaluate_grid(prices, buy_below, sell_above, fee, capital)
+    else:
+        # 参数组合平均分给每个进程
+        per_task = -(-len(buy_below) // processes)
+        tasks = [(buy_below[i:i + per_task], sell_above[i:i + per_task], fee, capital)
+                 for i in range(0, len(buy_below), per_task)]
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(prices,)) as pool:
+            result = _merge(list(pool.map(_evaluate_in_worker, tasks)))
+
+    if result:
+        order = np.argsort(-result["pnl"], kind="stable")
+        result = {key: values[order] for key, values in result.items()}
+        top = min(top_n, len(order))
+        result["max_drawdown"] = np.full(len(order), np.nan)
+        result["max_drawdown"][:top] = max_drawdown(prices, result["buy_below"][:top],
+                                                    result["sell_above"][:top], fee)
+    return result
+
+
+# -------------------------------
+#  数据来源
+# -------------------------------
+def load_price_history(symbol, db=None):
+    """
+    从数据库读取某个符号的价格序列 (按时间排序，包含冷数据层中的归档记录)。
+    db 默认使用全局的 db_manager.db_engine。
+    """
+    from core import db_manager
+    db = db or db_manager.db_engine
+    _, prices = db.get_history_arrays(symbol)
+    return prices
+
+
+def synthetic_prices(n, start=150.0, sigma=0.5, dt=1.0 / (252 * 390), seed=None):
+    """
+    用 GBM 生成一段合成价格。默认每个点代表 1 分钟 (一年约 98280 个点)，
+    年化波动率 50%，价格会在原策略的 120 / 180 阈值附近来回穿越。
+    """
+    from core.hft_sim import GBMTickGenerator
+    generator = GBMTickGenerator(["SYN"], start, sigma=sigma, dt=dt, seed=seed)
+    prices, _ = generator.next_block(n)
+    return prices[:, 0]
@@ -69,5 +69,12 @@ SYSTEM_SETTINGS = {
     }
 }
 
+# 外部 API 限流配置 (令牌桶)
+# rate: 每秒补充的令牌数 (= 长期平均请求速率), burst: 桶容量 (= 允许的瞬时突发请求数)
+# CoinGecko 免费档大约每分钟 30 次请求
+RATE_LIMITS = {
+    "coingecko": {"rate": 0.5, "burst": 5},
+}
+
 # 打印一条消息，当此模块被导入时，这行代码会执行（体现模块作用域）
 print(f" >> [System] 配置文件加载完毕: {APP_NAME} v{VERSION}")
\ No newline at end of file
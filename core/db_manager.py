@@ -1,18 +1,51 @@
 # -*- coding: utf-8 -*-
+import argparse
+import atexit
+import bisect
+import heapq
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
 import pymysql
-import os
-from datetime import datetime
 from dotenv import load_dotenv
 
+from core import rollups, partitions
+from core.db_pool import SQLiteConnectionPool, MySQLConnectionPool
+from core.tick_archive import TickArchive, from_micros, to_micros_array
+
 """
 完全修复版 DatabaseManager (最终优化版)：
 ✓ 数据库位置优化：移至 data/ 目录
 ✓ 绝对路径，不乱跑
 ✓ SQLite/MySQL 自动兼容
-✓ 单例模式，避免多重连接
+✓ 单例模式 + 连接池 (SQLite 每线程一个连接，MySQL 有上限的连接池，见 core/db_pool.py)
 ✓ 插入失败自动 rollback
 ✓ 环境变量读取，保护密码安全
+✓ 按月分区 (price_history_YYYYMM)，过期分区汇总后归档 / 删除，支持 VACUUM 压缩
+✓ 冷数据层: 过期分区转存到 memmap 二进制归档 (core/tick_archive.py)，历史查询自动覆盖，
+  转存后用 Gorilla 编码压缩 (core/gorilla.py)
+✓ OHLC 汇总表 (1m/1h/1d) 与原始记录在同一个事务里增量更新，见 core/rollups.py
+✓ 统计表 price_stats (总数 / 每个符号的条数、首末时间、最新价) 与写入同一事务维护，get_total_records 为 O(1)
+✓ 批量写入 (write-behind)：log_price 只入队，后台按数量 / 时间阈值用 executemany 一次事务提交
+
+【知识点】
+1. 每条 INSERT 都 commit 一次，SQLite 每次都要 fsync，几百条/秒就到顶了；
+   攒一批用 executemany 在一个事务里写完，只 commit 一次，吞吐量能提高两个数量级。
+2. 后台刷写线程 + threading.Condition: 生产者 append 后立刻返回，攒够 batch_size 条或
+   等待超过 flush_interval 秒时由后台线程刷写。
+3. 背压 (Backpressure): 缓冲区满 (max_pending) 时生产者阻塞等待刷写，或直接抛出 BufferFullError，
+   数据库跟不上时不会无限占用内存。
+4. 读自己的写: 查询前先 flush()，保证刚 log_price 的记录能查到。
+5. 复合索引 (symbol, recorded_at): 按符号 + 时间范围查询只需一次索引定位再顺序扫描，
+   不再全表扫描；索引里隐含 rowid (id)，ORDER BY recorded_at, id 也直接走索引。
+6. 键集分页 (Keyset Pagination): 大范围查询按 (recorded_at, id) 分块，下一块从上一块最后一行之后开始，
+   每块都是一次索引定位，不需要 OFFSET，也不需要一直占着游标。
+7. WAL 日志模式: 读写互不阻塞；synchronous=NORMAL 在 WAL 下只在检查点 fsync，写入更快。
 """
 
 # 加载 .env 文件中的环境变量
@@ -48,6 +81,172 @@ MYSQL_CONFIG = {
     "charset": "utf8mb4"
 }
 
+# SQLite 启动参数 (每次连接后执行)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,        # 负数表示 KB，即 64 MB 页缓存
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,      # 256 MB 内存映射读取
+}
+
+# 数据保留策略 (apply_retention 使用)
+RETENTION_POLICY = {
+    "raw_months": 12,                                 # 原始逐笔记录保留最近几个月 (不含当月)
+    # 过期分区删除前的去向: "ticks" 转存到冷数据层 (仍可查询)；"sqlite" 导出为 ARCHIVE_DIR 下的独立文件；None 直接删除
+    "archive": "ticks",
+    "compress": True,                                 # 转存到冷数据层后压缩成 Gorilla 格式 (core/gorilla.py)
+    "rollup_days": {"1m": 365, "1h": None, "1d": None},  # 汇总表保留天数，None 表示永久保留
+}
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+# 冷数据层目录名 (与数据库文件放在同一目录下: data/ticks/)
+TICK_ARCHIVE_NAME = "ticks"
+
+# 统计表中代表"全部符号"的汇总行
+STATS_TOTAL_KEY = "*"
+
+# MySQL 连接池上限 / 空闲多久后借出前先 ping
+MYSQL_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+MYSQL_PING_INTERVAL = 30.0
+
+# 分块查询默认每块行数
+QUERY_CHUNK_SIZE = 10000
+
+# 批量写入参数
+WRITE_BATCH_SIZE = 1000      # 攒够多少条刷写一次
+WRITE_FLUSH_INTERVAL = 0.5   # 最多等待多少秒刷写一次
+WRITE_MAX_PENDING = 50000    # 缓冲区上限，超过后触发背压
+
+
+class BufferFullError(Exception):
+    """写缓冲区已满 (非阻塞模式下抛出)"""
+
+
+class WriteBuffer:
+    """
+    写缓冲区 (write-behind)
+    rows 先进入内存列表，由后台线程按数量 / 时间阈值调用 flush_fn(rows) 批量写入。
+    flush_fn 失败时这批数据放回队首，下次重试。
+    """
+
+    def __init__(self, flush_fn, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL,
+                 max_pending=WRITE_MAX_PENDING, block=True):
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max(max_pending, batch_size)
+        self.block = block
+        self._pending = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # 同一时间只有一个线程在写数据库
+        self._thread = None
+        self._closed = False
+        self.stats = {"rows": 0, "batches": 0, "errors": 0, "waits": 0}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, row, timeout=None):
+        self.add_many([row], timeout)
+
+    def add_many(self, rows, timeout=None):
+        """
+        入队。缓冲区满时:
+        - block=True: 等待后台刷写腾出空间 (超过 timeout 秒抛 BufferFullError)；
+        - block=False: 立即抛 BufferFullError。
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("写缓冲区已关闭")
+            if len(self._pending) + len(rows) > self.max_pending and self._pending:
+                if not self.block:
+                    raise BufferFullError(f"写缓冲区已满 ({len(self._pending)} 条待写入)")
+                self.stats["waits"] += 1
+                self._cond.notify_all()
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while len(self._pending) + len(rows) > self.max_pending and self._pending:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise BufferFullError(f"等待写缓冲区超时 ({len(self._pending)} 条待写入)")
+                    self._cond.wait(remaining)
+            self._pending.extend(rows)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _take(self):
+        """取出全部待写入数据 (调用方持有 _cond)"""
+        rows, self._pending = self._pending, []
+        return rows
+
+    def _write(self, rows):
+        """写入一批；失败时放回队首并返回 False (调用方持有 _flush_lock)"""
+        try:
+            self.flush_fn(rows)
+        except Exception as e:
+            print(f" !! [DB] 批量写入失败 ({len(rows)} 条，稍后重试): {e}")
+            with self._cond:
+                self._pending[:0] = rows
+                self.stats["errors"] += 1
+            return False
+        with self._cond:
+            self.stats["rows"] += len(rows)
+            self.stats["batches"] += 1
+            self._cond.notify_all()  # 唤醒等待空间的生产者
+        return True
+
+    def flush(self):
+        """同步刷写当前所有待写入数据，返回是否成功"""
+        with self._flush_lock:
+            with self._cond:
+                rows = self._take()
+            return self._write(rows) if rows else True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            if not self.flush():
+                self._backoff()
+
+    def _backoff(self):
+        """写入失败后等待 flush_interval 秒再重试 (不要忙等)，close() 时立即结束"""
+        with self._cond:
+            deadline = time.monotonic() + self.flush_interval
+            while not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    @contextmanager
+    def paused(self):
+        """先刷写一次，然后在 with 块内暂停刷写 (新数据继续入队，满了触发背压)"""
+        with self._flush_lock:
+            with self._cond:
+                rows = self._take()
+            if rows and not self._write(rows):
+                raise RuntimeError("暂停前刷写失败")
+            yield
+
+    def close(self):
+        """停止后台线程并刷写剩余数据"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        return self.flush()
+
 
 class DatabaseManager:
     """
@@ -55,20 +254,27 @@ class DatabaseManager:
     """
     _instance = None
 
-    def __new__(cls, *args, **kwargs):
+    def __new__(cls, db_file=None, **kwargs):
+        if db_file is not None:
+            # 指定了数据库文件 (测试 / 压测用)：创建独立实例，不影响全局单例
+            return super(DatabaseManager, cls).__new__(cls)
         if cls._instance is None:
             cls._instance = super(DatabaseManager, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self):
+    def __init__(self, db_file=None, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL,
+                 max_pending=WRITE_MAX_PENDING, block=True):
         if hasattr(self, "initialized"):
             return  # 防止重复初始化
 
         self.initialized = True
-        self.conn = None
-        self.cursor = None
+        self.db_file = db_file or DB_FILE
+        self.pool = None
+        self.cold = TickArchive(os.path.join(os.path.dirname(os.path.abspath(self.db_file)), TICK_ARCHIVE_NAME))
         self.connect()
         self.init_tables()
+        self.writer = WriteBuffer(self.write_rows, batch_size, flush_interval, max_pending, block)
+        atexit.register(self.flush)
 
     # -------------------------------
     #  连接数据库
@@ -77,12 +283,13 @@ class DatabaseManager:
         try:
             if USE_MYSQL:
                 print(" [DB] 正在连接 MySQL ...")
-                self.conn = pymysql.connect(**MYSQL_CONFIG)
+                self.pool = MySQLConnectionPool(MYSQL_CONFIG, MYSQL_POOL_SIZE, ping_interval=MYSQL_PING_INTERVAL)
             else:
-                print(f" [DB] 连接 SQLite: {DB_FILE}")
-                self.conn = sqlite3.connect(DB_FILE, check_same_thread=False, timeout=10)
+                print(f" [DB] 连接 SQLite: {self.db_file}")
+                self.pool = SQLiteConnectionPool(self.db_file, SQLITE_PRAGMAS, timeout=10)
 
-            self.cursor = self.conn.cursor()
+            with self.pool.connection():
+                pass  # 立即建立第一个连接，尽早发现配置错误
         except Exception as e:
             print(f" !! [DB] 连接失败: {e}")
             # 可以在这里添加重试逻辑或回退到 SQLite
@@ -91,62 +298,710 @@ class DatabaseManager:
     #  初始化表
     # -------------------------------
     def init_tables(self):
-        sql = """
-        CREATE TABLE IF NOT EXISTS price_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            symbol VARCHAR(20),
-            price REAL,
-            source VARCHAR(20),
-            recorded_at DATETIME
-        )
-        """
+        # 原始记录按月分表 (写入时按需创建)；旧版的单表 price_history 如果存在，作为只读的"遗留分区"继续参与查询
+        self._partition_lock = threading.Lock()
+        self._partitions = []
+        self._has_legacy = False
+        try:
+            self._load_partitions()
+        except Exception as e:
+            print(f" !! [DB] 读取分区失败: {e}")
 
-        if USE_MYSQL:
-            sql = """
-            CREATE TABLE IF NOT EXISTS price_history (
-                id INT PRIMARY KEY AUTO_INCREMENT,
-                symbol VARCHAR(20),
-                price DOUBLE,
-                source VARCHAR(20),
-                recorded_at DATETIME
+        for name, _ in rollups.ROLLUPS:
+            try:
+                self._execute(rollups.create_table_sql(name, USE_MYSQL))
+            except Exception as e:
+                print(f" !! [DB] 建汇总表 {rollups.table_name(name)} 失败: {e}")
+
+        try:
+            self._execute(f"""
+            CREATE TABLE IF NOT EXISTS price_stats (
+                symbol VARCHAR(20) PRIMARY KEY,
+                count {"BIGINT" if USE_MYSQL else "INTEGER"} NOT NULL,
+                first_at DATETIME(6),
+                last_at DATETIME(6),
+                last_price {"DOUBLE" if USE_MYSQL else "REAL"}
             )
-            """
+            """)
+            # 升级前已有数据但统计表为空：扫描一次建立统计
+            if not self._query("SELECT 1 FROM price_stats LIMIT 1") and self._all_tables():
+                print(" [DB] 初始化统计表 price_stats ...")
+                self._rebuild_stats()
+        except Exception as e:
+            print(f" !! [DB] 建统计表失败: {e}")
+
+    def _list_tables(self):
+        if USE_MYSQL:
+            return [row[0] for row in self._query("SHOW TABLES")]
+        return [row[0] for row in self._query("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+    def _load_partitions(self):
+        tables = self._list_tables()
+        months = sorted(m for m in map(partitions.parse_table, tables) if m is not None)
+        with self._partition_lock:
+            self._partitions = months
+        if partitions.PREFIX in tables:
+            self._has_legacy = bool(self._query(f"SELECT 1 FROM {partitions.PREFIX} LIMIT 1"))
+        if self._has_legacy:
+            # 遗留表同样走键集分页、最新价和符号跳跃扫描，从旧版本升级的数据库也要有这个索引
+            self._create_index(f"idx_{partitions.PREFIX}_symbol_time", partitions.PREFIX, "symbol, recorded_at")
 
+    def _ensure_partition(self, month):
+        """按需创建某个月的分区表 (建表语句在 MySQL 中会隐式提交，所以在写入事务之外执行)"""
+        if month in self._partitions:
+            return
+        with self._partition_lock:
+            if month in self._partitions:
+                return
+            table = partitions.table_name(month)
+            self._execute(partitions.create_table_sql(table, USE_MYSQL))
+            if not USE_MYSQL:
+                self._create_index(f"idx_{table}_symbol_time", table, "symbol, recorded_at")
+            bisect.insort(self._partitions, month)
+            print(f" [DB] 新建分区 {table}")
+
+    def _tables(self, start=None, end=None):
+        """与 [start, end] 有交集的分区表名，按时间顺序"""
+        start = rollups.as_datetime(start) if start is not None else None
+        end = rollups.as_datetime(end) if end is not None else None
+        return [partitions.table_name(m) for m in partitions.overlapping(list(self._partitions), start, end)]
+
+    def _all_tables(self):
+        """全部原始记录表 (含遗留的 price_history)"""
+        return ([partitions.PREFIX] if self._has_legacy else []) + self._tables()
+
+    def _create_index(self, name, table, columns):
+        if USE_MYSQL:
+            sql = f"CREATE INDEX {name} ON {table} ({columns})"
+        else:
+            sql = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
         try:
-            self.cursor.execute(sql)
-            self.conn.commit()
+            self._execute(sql)
+        except pymysql.err.OperationalError as e:
+            if e.args[0] != 1061:  # MySQL: 索引已存在
+                print(f" !! [DB] 创建索引失败: {e}")
         except Exception as e:
-            print(f" !! [DB] 建表失败: {e}")
+            print(f" !! [DB] 创建索引失败: {e}")
+
+    # -------------------------------
+    #  插入历史记录 (批量写入)
+    # -------------------------------
+    @staticmethod
+    def _price_row(asset, recorded_at):
+        source = "Real" if hasattr(asset, "chain") or hasattr(asset, "exchange") else "Simulated"
+        return asset.symbol, asset.get_price(), source, recorded_at
+
+    def log_price(self, asset, timeout=None):
+        """
+        记录一条价格。只放入写缓冲区，由后台线程批量写入；
+        缓冲区满时阻塞 (背压)，超过 timeout 秒抛 BufferFullError。
+        """
+        self.writer.add(self._price_row(asset, datetime.now()), timeout)
+
+    def log_prices(self, assets, timeout=None):
+        """一次记录多条价格 (同一时间戳)"""
+        now_time = datetime.now()
+        self.writer.add_many([self._price_row(asset, now_time) for asset in assets], timeout)
+
+    def log_rows(self, rows, timeout=None):
+        """直接写入 (symbol, price, source, recorded_at) 元组 (导入 / 回放用)"""
+        self.writer.add_many(list(rows), timeout)
+
+    def write_rows(self, rows):
+        """
+        同步写入一批 (symbol, price, source, recorded_at) (后台刷写 / 批量导入使用)。
+        按月份写入各分区，汇总表在同一个事务里更新：要么都写入，要么都回滚。
+        """
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(partitions.month_start(rollups.as_datetime(row[3])), []).append(row)
+        for month in by_month:
+            self._ensure_partition(month)
+
+        with self._transaction() as cursor:
+            for month, part in by_month.items():
+                sql = f"INSERT INTO {partitions.table_name(month)} (symbol, price, source, recorded_at) VALUES (?, ?, ?, ?)"
+                if USE_MYSQL:
+                    # pymysql 会把 INSERT ... VALUES 的 executemany 改写成一条多行 INSERT
+                    sql = sql.replace("?", "%s")
+                cursor.executemany(sql, part)
+            aggregated = self._upsert_rollups(cursor, rows)
+            self._upsert_stats(cursor, aggregated[rollups.ROLLUPS[-1][0]])
+
+    def _upsert_rollups(self, cursor, rows):
+        """更新汇总表，返回各粒度的汇总结果 (供统计表复用)"""
+        aggregated = rollups.aggregate_all(rows)
+        for name, buckets in aggregated.items():
+            cursor.executemany(rollups.upsert_sql(name, USE_MYSQL), rollups.upsert_params(buckets))
+        return aggregated
+
+    def _upsert_stats(self, cursor, buckets):
+        """把一批数据的汇总 (任意粒度) 合并进统计表：每个符号一行，外加 STATS_TOTAL_KEY 一行"""
+        totals = {}
+        for (symbol, _), record in buckets.items():
+            rollups.merge(totals, symbol, record)
+            rollups.merge(totals, STATS_TOTAL_KEY, record)
+        params = [(symbol, r[rollups.COUNT], r[rollups.OPEN_AT], r[rollups.CLOSE_AT], r[rollups.CLOSE])
+                  for symbol, r in totals.items()]
+        if USE_MYSQL:
+            # MySQL 的 SET 从左到右执行，last_price 必须在 last_at 之前
+            sql = ("INSERT INTO price_stats (symbol, count, first_at, last_at, last_price) "
+                   "VALUES (%s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE "
+                   "count = count + VALUES(count), "
+                   "last_price = IF(last_at IS NULL OR VALUES(last_at) >= last_at, VALUES(last_price), last_price), "
+                   "first_at = IF(first_at IS NULL, VALUES(first_at), LEAST(first_at, VALUES(first_at))), "
+                   "last_at = IF(last_at IS NULL, VALUES(last_at), GREATEST(last_at, VALUES(last_at)))")
+        else:
+            sql = ("INSERT INTO price_stats (symbol, count, first_at, last_at, last_price) "
+                   "VALUES (?, ?, ?, ?, ?) ON CONFLICT(symbol) DO UPDATE SET "
+                   "count = count + excluded.count, "
+                   "last_price = CASE WHEN last_at IS NULL OR excluded.last_at >= last_at "
+                   "THEN excluded.last_price ELSE last_price END, "
+                   "first_at = COALESCE(MIN(first_at, excluded.first_at), excluded.first_at), "
+                   "last_at = COALESCE(MAX(last_at, excluded.last_at), excluded.last_at)")
+        cursor.executemany(sql, params)
+
+    def flush(self):
+        """把缓冲区里的记录立即写入数据库"""
+        if self.pool is None:
+            return False
+        return self.writer.flush()
 
     # -------------------------------
-    #  插入历史记录
+    #  连接与执行
     # -------------------------------
-    def log_price(self, asset):
-        sql = "INSERT INTO price_history (symbol, price, source, recorded_at) VALUES (?, ?, ?, ?)"
+    def connection(self):
+        """从连接池借出当前线程的连接: with db.connection() as conn: ..."""
+        if self.pool is None:
+            raise RuntimeError("数据库未连接")
+        return self.pool.connection()
+
+    @contextmanager
+    def _transaction(self):
+        """借出连接并开启一个事务: 正常结束时提交，出错时回滚后重新抛出"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def _execute(self, sql, params=None, many=False):
+        """执行一条写语句并提交"""
         if USE_MYSQL:
             sql = sql.replace("?", "%s")
+        with self._transaction() as cursor:
+            if many:
+                cursor.executemany(sql, params)
+            elif params is None:
+                cursor.execute(sql)
+            else:
+                cursor.execute(sql, params)
 
-        now_time = datetime.now()
-        source = "Real" if hasattr(asset, "chain") or hasattr(asset, "exchange") else "Simulated"
+    # -------------------------------
+    #  查询 (走 symbol, recorded_at 索引)
+    # -------------------------------
+    def _query(self, sql, params=()):
+        if USE_MYSQL:
+            sql = sql.replace("?", "%s")
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    def iter_history(self, symbol, start=None, end=None, chunk_size=QUERY_CHUNK_SIZE):
+        """
+        按时间顺序分块读取某个符号在 [start, end] 内的记录，每次 yield 一个列表
+        [(recorded_at, price, source), ...]。start / end 可以是 datetime 或字符串，None 表示不限。
+        (SQLite 返回的 recorded_at 是 "YYYY-MM-DD HH:MM:SS.ffffff" 字符串，MySQL 返回 datetime)
+        块与块之间不占用游标 (键集分页)，可以边读边处理任意大的范围。
+        """
+        self.flush()
+        yield from self._iter_history(symbol, start, end, chunk_size)
+
+    def _iter_history(self, symbol, start=None, end=None, chunk_size=QUERY_CHUNK_SIZE):
+        # 冷数据层比所有分区都旧，先读；分区之间时间不重叠，按月份顺序依次读取；
+        # 遗留的 price_history 可能与分区重叠，按时间归并
+        streams = [self._iter_cold(symbol, start, end, chunk_size)]
+        streams += (self._iter_table(table, symbol, start, end, chunk_size) for table in self._tables(start, end))
+        chunks = (chunk for stream in streams for chunk in stream)
+        if not self._has_legacy:
+            yield from chunks
+            return
+
+        legacy = self._iter_table(partitions.PREFIX, symbol, start, end, chunk_size)
+        merged = heapq.merge((row for chunk in legacy for row in chunk),
+                             (row for chunk in chunks for row in chunk),
+                             key=lambda row: rollups.as_datetime(row[0]))
+        chunk = []
+        for row in merged:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _iter_cold(self, symbol, start=None, end=None, chunk_size=QUERY_CHUNK_SIZE):
+        """冷数据层转成与数据库相同格式的行 (SQLite 为字符串时间，MySQL 为 datetime)，source 固定为 Archive"""
+        for records in self.cold.iter_slices(symbol, start, end):
+            for i in range(0, len(records), chunk_size):
+                part = records[i:i + chunk_size]
+                moments = from_micros(part["ts"]).astype(object)
+                if not USE_MYSQL:
+                    moments = [m.isoformat(" ") for m in moments]
+                yield list(zip(moments, part["price"].tolist(), ["Archive"] * len(part)))
+
+    def _cold_last(self, symbol):
+        """冷数据层中某个符号的最后一条记录 (recorded_at, price, "Archive")，没有时返回 None"""
+        last_ts = self.cold.last_timestamp(symbol)
+        if last_ts is None:
+            return None
+        for rows in self._iter_cold(symbol, start=last_ts):
+            return rows[-1]
+        return None
+
+    def get_history_arrays(self, symbol, start=None, end=None):
+        """
+        读取 [start, end] 内的历史价格，返回 (datetime64[us] 数组, float64 价格数组)。
+        冷数据层直接用 memmap 切片，不经过逐行的 Python 对象，适合回测等大批量读取。
+        """
+        self.flush()
+        ts_parts, price_parts = [], []
+        if self._has_legacy:
+            # 遗留表需要按时间归并，走逐行路径
+            hot = self._iter_history(symbol, start, end)
+        else:
+            for records in self.cold.iter_slices(symbol, start, end):
+                ts_parts.append(records["ts"])
+                price_parts.append(records["price"])
+            hot = (chunk for table in self._tables(start, end) for chunk in self._iter_table(table, symbol, start, end))
+        for chunk in hot:
+            ts_parts.append(to_micros_array([row[0] for row in chunk]))
+            price_parts.append(np.fromiter((row[1] for row in chunk), dtype=np.float64, count=len(chunk)))
+        if not ts_parts:
+            return from_micros(np.empty(0, dtype=np.int64)), np.empty(0, dtype=np.float64)
+        return from_micros(np.concatenate(ts_parts)), np.concatenate(price_parts)
+
+    def _iter_table(self, table, symbol, start=None, end=None, chunk_size=QUERY_CHUNK_SIZE):
+        """单张表内的键集分页"""
+        base = f"SELECT recorded_at, price, source, id FROM {table} WHERE symbol = ?"
+        params = [symbol]
+        if end is not None:
+            base += " AND recorded_at <= ?"
+            params.append(end)
+
+        cursor_sql = base + (" AND recorded_at >= ?" if start is not None else "")
+        cursor_params = params + ([start] if start is not None else [])
+        while True:
+            rows = self._query(cursor_sql + " ORDER BY recorded_at, id LIMIT ?", (*cursor_params, chunk_size))
+            if not rows:
+                return
+            yield [row[:3] for row in rows]
+            if len(rows) < chunk_size:
+                return
+            last_at, last_id = rows[-1][0], rows[-1][3]
+            # 行值比较 (recorded_at, id) > (?, ?)，SQLite 与 MySQL 都能直接走复合索引
+            cursor_sql = base + " AND (recorded_at, id) > (?, ?)"
+            cursor_params = params + [last_at, last_id]
+
+    def get_history(self, symbol, start=None, end=None, limit=None):
+        """
+        读取某个符号在 [start, end] 内的记录 (按时间升序)，返回 [(recorded_at, price, source), ...]。
+        范围很大时请用 iter_history 分块读取。
+        """
+        rows = []
+        for chunk in self.iter_history(symbol, start, end, chunk_size=limit or QUERY_CHUNK_SIZE):
+            rows.extend(chunk)
+            if limit is not None and len(rows) >= limit:
+                return rows[:limit]
+        return rows
+
+    def get_symbols(self):
+        """所有出现过的符号 (每张表做松散索引扫描：每个符号一次索引定位，不扫描全部记录)"""
+        self.flush()
+        return self._symbols()
+
+    def _symbols(self):
+        symbols = set()
+        for table in self._all_tables():
+            row = self._query(f"SELECT MIN(symbol) FROM {table}")
+            while row and row[0][0] is not None:
+                symbols.add(row[0][0])
+                row = self._query(f"SELECT MIN(symbol) FROM {table} WHERE symbol > ?", (row[0][0],))
+        symbols.update(self.cold.symbols())
+        return sorted(symbols)
+
+    def get_latest(self, symbols=None):
+        """
+        每个符号的最新一条记录，返回 {symbol: (recorded_at, price, source)}。
+        symbols 为 None 时查询所有符号。从最新的分区往前找，找到即停。
+        """
+        self.flush()
+        return self._latest(self._symbols() if symbols is None else symbols)
+
+    def _latest(self, symbols):
+        sql = ("SELECT recorded_at, price, source FROM {} WHERE symbol = ? "
+               "ORDER BY recorded_at DESC, id DESC LIMIT 1")
+        tables = self._tables()[::-1]
+        latest = {}
+        for symbol in symbols:
+            for table in tables:
+                rows = self._query(sql.format(table), (symbol,))
+                if rows:
+                    latest[symbol] = tuple(rows[0])
+                    break
+            else:
+                # 分区里没有时再看冷数据层的最后一条 (冷数据都比分区旧)
+                cold = self._cold_last(symbol)
+                if cold is not None:
+                    latest[symbol] = cold
+            if self._has_legacy:
+                rows = self._query(sql.format(partitions.PREFIX), (symbol,))
+                if rows and (symbol not in latest or
+                             rollups.as_datetime(rows[0][0]) > rollups.as_datetime(latest[symbol][0])):
+                    latest[symbol] = tuple(rows[0])
+        return latest
+
+    # -------------------------------
+    #  OHLC 汇总
+    # -------------------------------
+    def get_ohlc(self, symbol, start=None, end=None, resolution="1m"):
+        """
+        读取 [start, end] 内的 K 线，返回 [(桶起点 datetime, open, high, low, close, count), ...]。
+        resolution 为 '5m' / '1h' / '1d' 或秒数。自动选用能满足粒度的最粗汇总表
+        (例如 4h 读 1h 表再合并)，粒度小于 1 分钟或不能整除时才读原始记录。
+        """
+        seconds = rollups.parse_resolution(resolution)
+        if start is not None:
+            start = rollups.bucket_start(rollups.as_datetime(start), seconds)
+        self.flush()
+
+        choice = rollups.pick_rollup(seconds)
+        buckets = {}
+        if choice is None:
+            for chunk in self._iter_history(symbol, start, end):
+                part = rollups.aggregate_rows(((symbol, price, source, at) for at, price, source in chunk), seconds)
+                for key, record in part.items():
+                    rollups.merge(buckets, key, record)
+        else:
+            name, size = choice
+            sql = (f"SELECT bucket, open, high, low, close, count, open_at, close_at "
+                   f"FROM {rollups.table_name(name)} WHERE symbol = ?")
+            params = [symbol]
+            if start is not None:
+                sql += " AND bucket >= ?"
+                params.append(start)
+            if end is not None:
+                sql += " AND bucket <= ?"
+                params.append(end)
+            rows = self._query(sql + " ORDER BY bucket", params)
+            fine = {(symbol, rollups.as_datetime(row[0])): list(row[1:]) for row in rows}
+            buckets = fine if size == seconds else rollups.coarsen(fine, seconds)
+
+        return [(bucket, *record[:rollups.OPEN_AT]) for (_, bucket), record in sorted(buckets.items())]
+
+    def backfill_rollups(self, symbols=None, chunk_size=50000):
+        """
+        根据 price_history 重建汇总表 (升级前已有的历史数据 / 汇总表损坏时使用)。
+        重建期间暂停批量写入，避免新数据被重复计入；返回处理的记录数。
+        """
+        if symbols is None:
+            symbols = self.get_symbols()
+        total = 0
+        with self.writer.paused():
+            for symbol in symbols:
+                for name, _ in rollups.ROLLUPS:
+                    self._execute(f"DELETE FROM {rollups.table_name(name)} WHERE symbol = ?", (symbol,))
+                for chunk in self._iter_history(symbol, chunk_size=chunk_size):
+                    rows = [(symbol, price, source, at) for at, price, source in chunk]
+                    with self._transaction() as cursor:
+                        self._upsert_rollups(cursor, rows)
+                    total += len(rows)
+                print(f" [DB] 汇总表回填: {symbol} 完成 (累计 {total} 条)")
+        return total
 
+    # -------------------------------
+    #  数据保留 / 归档 / 压缩
+    # -------------------------------
+    def apply_retention(self, policy=None, now=None):
+        """
+        按保留策略处理过期数据 (默认 RETENTION_POLICY，policy 中的键会覆盖默认值)：
+        1. 早于 raw_months 个月的分区：先确认汇总表完整 (不完整就用分区数据重建)，
+           再按 archive 转存 ("ticks": 冷数据层，之后仍可查询；"sqlite": ARCHIVE_DIR 下的独立文件)，
+           最后 DROP 整张表；
+        2. 汇总表按 rollup_days 删除过期的桶。
+        3. archive 为 "ticks" 且 compress=True 时，把冷数据层中新写入的段压缩成 Gorilla 格式。
+        返回 {"dropped": [...], "archived": [...], "rollup_rows_deleted": n, "compressed": (压缩前, 压缩后字节数)}。
+        """
+        policy = {**RETENTION_POLICY, **(policy or {})}
+        now = now or datetime.now()
+        cutoff = partitions.add_months(partitions.month_start(now), -policy["raw_months"])
+        report = {"dropped": [], "archived": [], "rollup_rows_deleted": 0, "compressed": (0, 0)}
+
+        with self.writer.paused():
+            for month in [m for m in self._partitions if m < cutoff]:
+                table = partitions.table_name(month)
+                counts = self._ensure_rollups(month)
+                archive = policy["archive"]
+                if archive is True:  # 兼容旧配置 (True 表示导出为 SQLite 文件)
+                    archive = "sqlite"
+                if archive == "ticks":
+                    report["archived"].append(self._archive_to_ticks(month, counts))
+                    counts = {}  # 记录转存到冷数据层后仍然存在，统计不变
+                elif archive == "sqlite":
+                    report["archived"].append(self._archive_partition(month))
+                elif archive:
+                    raise ValueError(f"未知的归档方式: {archive!r}")
+                with self._transaction() as cursor:
+                    # sqlite3 模块只在 DML 之前自动 BEGIN，DDL 会各自立即提交；
+                    # 显式 BEGIN 让 DROP 与统计表的更新在同一个事务里 (MySQL 的 DDL 总是隐式提交，无法做到)
+                    if not USE_MYSQL and not cursor.connection.in_transaction:
+                        cursor.execute("BEGIN")
+                    cursor.execute(f"DROP TABLE {table}")
+                    if counts:
+                        self._subtract_stats(cursor, counts, exclude=table)
+                # 提交之后才从分区列表中移除，DROP 失败时读取方仍能看到这张表
+                with self._partition_lock:
+                    self._partitions.remove(month)
+                report["dropped"].append(table)
+                print(f" [DB] 分区 {table} 已过期并删除")
+
+            if policy["archive"] == "ticks" and policy["compress"]:
+                report["compressed"] = self.cold.compress(include_active=True)
+                if report["compressed"][0]:
+                    print(" [DB] 冷数据层压缩: {:.1f} MB -> {:.1f} MB".format(*(n / 1e6 for n in report["compressed"])))
+
+            for name, days in policy["rollup_days"].items():
+                if days is None:
+                    continue
+                threshold = rollups.bucket_start(now, 86400) - timedelta(days=days)
+                with self._transaction() as cursor:
+                    cursor.execute(self._sql(f"DELETE FROM {rollups.table_name(name)} WHERE bucket < ?"),
+                                   (threshold,))
+                    report["rollup_rows_deleted"] += cursor.rowcount
+        return report
+
+    def _sql(self, sql):
+        return sql.replace("?", "%s") if USE_MYSQL else sql
+
+    def _ensure_rollups(self, month):
+        """检查某个月的日汇总条数是否与分区一致，不一致的符号用分区数据重建这个月的汇总"""
+        table = partitions.table_name(month)
+        end = partitions.add_months(month, 1)
+        raw = dict(self._query(f"SELECT symbol, COUNT(*) FROM {table} GROUP BY symbol"))
+        rolled = dict(self._query(f"SELECT symbol, SUM(count) FROM {rollups.table_name('1d')} "
+                                  "WHERE bucket >= ? AND bucket < ? GROUP BY symbol", (month, end)))
+        for symbol, count in raw.items():
+            if rolled.get(symbol) == count:
+                continue
+            print(f" [DB] {table} 中 {symbol} 的汇总不完整，重建中...")
+            for name, _ in rollups.ROLLUPS:
+                self._execute(f"DELETE FROM {rollups.table_name(name)} WHERE symbol = ? AND bucket >= ? AND bucket < ?",
+                              (symbol, month, end))
+            for chunk in self._iter_table(table, symbol, chunk_size=50000):
+                with self._transaction() as cursor:
+                    self._upsert_rollups(cursor, [(symbol, price, source, at) for at, price, source in chunk])
+        return raw
+
+    def _archive_to_ticks(self, month, counts):
+        """
+        把一个分区的记录按符号追加到冷数据层，返回冷数据层目录。
+        中途失败后重跑时从断点继续，不会重复写入: 早于冷数据层最后时间戳的行跳过；
+        等于最后时间戳的行 (同一微秒可以有多条) 按 (recorded_at, id) 顺序跳过已归档的条数。
+        """
+        table = partitions.table_name(month)
+        for symbol in sorted(counts):
+            last_ts = self.cold.last_timestamp(symbol)
+            skip = self.cold.count_at(symbol, last_ts) if last_ts is not None else 0
+            for chunk in self._iter_table(table, symbol, chunk_size=50000):
+                ts = to_micros_array([row[0] for row in chunk])
+                prices = np.fromiter((row[1] for row in chunk), dtype=np.float64, count=len(chunk))
+                if last_ts is not None:
+                    keep = ts > last_ts
+                    same = np.flatnonzero(ts == last_ts)
+                    keep[same[skip:]] = True
+                    skip -= min(skip, len(same))
+                    ts, prices = ts[keep], prices[keep]
+                self.cold.append(symbol, ts, prices)
+        print(f" [DB] 分区 {table} 已转存到冷数据层 {self.cold.root}")
+        return self.cold.root
+
+    def _archive_partition(self, month):
+        """把一个分区导出为独立的 SQLite 文件 (ARCHIVE_DIR/price_history_YYYYMM.db)，返回文件路径"""
+        table = partitions.table_name(month)
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        path = os.path.join(ARCHIVE_DIR, f"{table}.db")
+        if os.path.exists(path):
+            os.remove(path)
+
+        archive = sqlite3.connect(path)
         try:
-            self.cursor.execute(sql, (asset.symbol, asset.get_price(), source, now_time))
-            self.conn.commit()
-        except Exception as e:
-            print(f" !! [DB] 插入失败: {e}")
-            # 发生错误时回滚，防止事务卡死
-            if self.conn:
-                self.conn.rollback()
+            archive.execute(partitions.create_table_sql(table))
+            insert = f"INSERT INTO {table} (id, symbol, price, source, recorded_at) VALUES (?, ?, ?, ?, ?)"
+            last_id = 0
+            while True:
+                rows = self._query(f"SELECT id, symbol, price, source, recorded_at FROM {table} "
+                                   "WHERE id > ? ORDER BY id LIMIT ?", (last_id, 50000))
+                if not rows:
+                    break
+                archive.executemany(insert, [(*row[:4], str(row[4])) for row in rows])
+                last_id = rows[-1][0]
+            archive.execute(f"CREATE INDEX idx_{table}_symbol_time ON {table} (symbol, recorded_at)")
+            archive.commit()
+        finally:
+            archive.close()
+        print(f" [DB] 分区 {table} 已归档到 {path}")
+        return path
+
+    def compact(self):
+        """
+        压缩 / 整理数据库 (删除分区后空出来的页不会自动还给操作系统)。
+        SQLite: WAL 检查点 + VACUUM + PRAGMA optimize；MySQL: OPTIMIZE TABLE。
+        返回 (压缩前字节数, 压缩后字节数)，MySQL 返回 None。
+        """
+        with self.writer.paused():
+            if USE_MYSQL:
+                for table in self._all_tables() + [rollups.table_name(n) for n, _ in rollups.ROLLUPS]:
+                    self._query(f"OPTIMIZE TABLE {table}")
+                return None
+
+            def size():
+                return sum(os.path.getsize(self.db_file + suffix)
+                           for suffix in ("", "-wal") if os.path.exists(self.db_file + suffix))
+
+            before = size()
+            with self.connection() as conn:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA optimize")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            after = size()
+        print(f" [DB] 压缩完成: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+        return before, after
+
+    def migrate_legacy(self, chunk_size=50000):
+        """把旧版单表 price_history 的数据按月搬进分区表，搬完后删除旧表；返回搬运的记录数"""
+        if not self._has_legacy and partitions.PREFIX not in self._list_tables():
+            return 0
+        moved = 0
+        with self.writer.paused():
+            while True:
+                rows = self._query(f"SELECT id, symbol, price, source, recorded_at FROM {partitions.PREFIX} "
+                                   "ORDER BY id LIMIT ?", (chunk_size,))
+                if not rows:
+                    break
+                by_month = {}
+                for row in rows:
+                    by_month.setdefault(partitions.month_start(rollups.as_datetime(row[4])), []).append(row[1:])
+                for month in by_month:
+                    self._ensure_partition(month)
+                with self._transaction() as cursor:
+                    for month, part in by_month.items():
+                        cursor.executemany(self._sql(f"INSERT INTO {partitions.table_name(month)} "
+                                                     "(symbol, price, source, recorded_at) VALUES (?, ?, ?, ?)"), part)
+                    cursor.execute(self._sql(f"DELETE FROM {partitions.PREFIX} WHERE id <= ?"), (rows[-1][0],))
+                moved += len(rows)
+            self._execute(f"DROP TABLE {partitions.PREFIX}")
+            self._has_legacy = False
+        print(f" [DB] 旧表迁移完成: {moved} 条记录")
+        return moved
 
     # -------------------------------
-    #  统计记录总数
+    #  统计 (price_stats 表)
     # -------------------------------
+    def _first_at(self, symbol, exclude=None):
+        """
+        某个符号在现存原始记录中最早的时间 (冷数据层最旧，其次从最早的分区往后找)。
+        exclude: 跳过的表 (同一事务中刚删除、但还在分区列表里的表)
+        """
+        first_ts = self.cold.first_timestamp(symbol)
+        if first_ts is not None:
+            return from_micros([first_ts]).astype(object)[0]
+        found = []
+        for table in self._all_tables():
+            if table == exclude:
+                continue
+            row = self._query(f"SELECT MIN(recorded_at) FROM {table} WHERE symbol = ?", (symbol,))
+            if row and row[0][0] is not None:
+                found.append(rollups.as_datetime(row[0][0]))
+                if table != partitions.PREFIX:
+                    break
+        return min(found) if found else None
+
+    def _subtract_stats(self, cursor, counts, exclude=None):
+        """删除分区 (exclude) 后从统计表中减去对应条数，并重新确定最早时间"""
+        update = self._sql("UPDATE price_stats SET count = count - ?, first_at = ? WHERE symbol = ?")
+        for symbol, count in counts.items():
+            cursor.execute(update, (count, self._first_at(symbol, exclude), symbol))
+        cursor.execute(self._sql("SELECT MIN(first_at) FROM price_stats WHERE symbol <> ? AND count > 0"),
+                       (STATS_TOTAL_KEY,))
+        cursor.execute(update, (sum(counts.values()), cursor.fetchone()[0], STATS_TOTAL_KEY))
+
+    def _rebuild_stats(self):
+        """扫描所有原始记录表重建统计表"""
+        totals = {}
+        for table in self._all_tables():
+            for symbol, count, first_at, last_at in self._query(
+                    f"SELECT symbol, COUNT(*), MIN(recorded_at), MAX(recorded_at) FROM {table} GROUP BY symbol"):
+                first_at, last_at = rollups.as_datetime(first_at), rollups.as_datetime(last_at)
+                # 价格列在这里用不到 (最新价稍后单独查询)，先填 0
+                rollups.merge(totals, (symbol, None), (0.0, 0.0, 0.0, 0.0, count, first_at, last_at))
+        for symbol in self.cold.symbols():
+            count = self.cold.count(symbol)
+            if count:
+                first_at, last_at = from_micros([self.cold.first_timestamp(symbol),
+                                                 self.cold.last_timestamp(symbol)]).astype(object)
+                rollups.merge(totals, (symbol, None), (0.0, 0.0, 0.0, 0.0, count, first_at, last_at))
+        latest = self._latest([symbol for symbol, _ in totals])
+        for (symbol, _), record in totals.items():
+            record[rollups.CLOSE] = latest[symbol][1]
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM price_stats")
+            self._upsert_stats(cursor, totals)
+        return len(totals)
+
+    def rebuild_stats(self):
+        """重建统计表 (统计与原始记录不一致时使用)，返回符号数"""
+        with self.writer.paused():
+            return self._rebuild_stats()
+
+    def get_stats(self, symbols=None):
+        """
+        读取统计表 (O(符号数)，不扫描原始记录)，返回
+        {"total": {...}, "symbols": {symbol: {"count", "first_at", "last_at", "last_price"}}}。
+        symbols 为 None 时返回所有符号；传入空列表则只返回总计。
+        """
+        self.flush()
+        sql = "SELECT symbol, count, first_at, last_at, last_price FROM price_stats"
+        params = ()
+        if symbols is not None:
+            keys = [STATS_TOTAL_KEY, *symbols]
+            sql += f" WHERE symbol IN ({', '.join('?' * len(keys))})"
+            params = keys
+        empty = {"count": 0, "first_at": None, "last_at": None, "last_price": None}
+        stats = {"total": dict(empty), "symbols": {}}
+        for symbol, count, first_at, last_at, last_price in self._query(sql, params):
+            entry = {"count": count, "first_at": first_at, "last_at": last_at, "last_price": last_price}
+            if symbol == STATS_TOTAL_KEY:
+                stats["total"] = entry
+            else:
+                stats["symbols"][symbol] = entry
+        return stats
+
     def get_total_records(self):
+        """记录总数 (读统计表的汇总行，O(1))"""
+        self.flush()  # 先写入缓冲区中的记录
         try:
-            sql = "SELECT COUNT(*) FROM price_history"
-            self.cursor.execute(sql)
-            result = self.cursor.fetchone()
-            return result[0] if result else 0
+            result = self._query("SELECT count FROM price_stats WHERE symbol = ?", (STATS_TOTAL_KEY,))
+            return result[0][0] if result else 0
         except Exception as e:
             print(f"[DB] 查询失败: {e}")
             return 0
@@ -156,13 +1011,46 @@ class DatabaseManager:
     # -------------------------------
     def close(self):
         try:
-            if self.conn:
-                self.conn.commit()
-                self.conn.close()
+            if self.pool:
+                self.writer.close()  # 刷写剩余记录
+                self.pool.close()
+                self.pool = None
                 print(" [DB] 已关闭数据库连接")
         except Exception as e:
             print(f" [DB] 关闭连接报错: {e}")
 
 
 # 全局实例
-db_engine = DatabaseManager()
\ No newline at end of file
+db_engine = DatabaseManager()
+
+
+if __name__ == "__main__":
+    # 维护命令: python -m core.db_manager backfill [--symbol AAPL ...]
+    parser = argparse.ArgumentParser(description="价格历史数据库维护")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill = commands.add_parser("backfill", help="根据 price_history 重建 OHLC 汇总表")
+    backfill.add_argument("--symbol", action="append", dest="symbols", help="只回填指定符号 (可重复)")
+    retention = commands.add_parser("retention", help="按保留策略归档 / 删除过期分区")
+    retention.add_argument("--raw-months", type=int, default=RETENTION_POLICY["raw_months"])
+    retention.add_argument("--archive", choices=["ticks", "sqlite"], default=RETENTION_POLICY["archive"],
+                           help="过期分区的去向: ticks 冷数据层 (默认) / sqlite 独立文件")
+    retention.add_argument("--no-archive", action="store_true", help="过期分区直接删除，不导出")
+    commands.add_parser("compact", help="VACUUM / OPTIMIZE 压缩数据库")
+    commands.add_parser("migrate", help="把旧版单表 price_history 迁移到按月分区")
+    commands.add_parser("stats", help="重建统计表 price_stats")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "backfill":
+        count = db_engine.backfill_rollups(args.symbols)
+        print(f" [DB] 回填完成: {count} 条记录，耗时 {time.perf_counter() - started:.1f}s")
+    elif args.command == "retention":
+        result = db_engine.apply_retention({"raw_months": args.raw_months, "archive": None if args.no_archive else args.archive})
+        print(f" [DB] 保留策略执行完成: {result}")
+    elif args.command == "compact":
+        db_engine.compact()
+    elif args.command == "migrate":
+        db_engine.migrate_legacy()
+    elif args.command == "stats":
+        print(f" [DB] 统计表重建完成: {db_engine.rebuild_stats()} 个符号")
+    db_engine.close()
\ No newline at end of file
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+import pymysql
+
+"""
+core/db_pool.py
+---------------
+数据库连接池 (给 DatabaseManager 使用)。
+
+【知识点】
+1. 一个连接 + 一个游标被所有线程共用时，游标状态会互相覆盖 (竞态)，加锁又会让所有查询排队。
+2. SQLite: 每个线程一个连接 (threading.local)。WAL 模式下多个读连接可以和写连接同时工作；
+   写操作仍然是单写者，其他写连接会按 timeout 等待 (busy timeout)。
+3. MySQL: 有上限的连接池。空闲连接放在 LifoQueue 里 (最近用过的最先复用，更可能还活着)，
+   Semaphore 控制连接总数，池满时借用方等待，超时抛 PoolTimeoutError。
+4. 健康检查: 借出前如果连接空闲超过 ping_interval 秒，先 ping(reconnect=True)，失败就丢弃重建；
+   使用中抛出连接类异常的连接不再放回池中。
+5. 可重入: 同一线程嵌套借用时拿到的是同一个连接 (例如查询里又调用了 flush)，不会把池子借空导致死锁。
+"""
+
+
+class PoolTimeoutError(Exception):
+    """等待空闲连接超时"""
+
+
+class SQLiteConnectionPool:
+    """
+    每个线程一个 SQLite 连接
+    """
+
+    def __init__(self, db_file, pragmas=None, timeout=10):
+        self.db_file = db_file
+        self.pragmas = dict(pragmas or {})
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._closed = False
+
+    def _connect(self):
+        # check_same_thread=False 只是为了让 close() 能在别的线程关闭它；
+        # 使用上每个连接仍然只属于创建它的线程
+        conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=self.timeout)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """借出当前线程的连接 (首次调用时创建)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("连接池已关闭")
+                conn = self._connect()
+                self._connections.append(conn)
+            self._local.conn = conn
+        yield conn
+
+    def size(self):
+        with self._lock:
+            return len(self._connections)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                print(f" !! [DB] 关闭连接失败: {e}")
+
+
+class MySQLConnectionPool:
+    """
+    有上限的 MySQL 连接池 (带健康检查)
+    connect 为创建连接的函数，默认 pymysql.connect(**config)。
+    """
+
+    # 这些异常说明连接本身坏了，不能再放回池中
+    BROKEN_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+
+    def __init__(self, config=None, max_size=8, acquire_timeout=10.0, ping_interval=30.0, connect=None):
+        self.config = dict(config or {})
+        self.max_size = max(1, int(max_size))
+        self.acquire_timeout = acquire_timeout
+        self.ping_interval = ping_interval
+        self._connect = connect or (lambda: pymysql.connect(**self.config))
+        self._idle = queue.LifoQueue()          # (连接, 上次归还时间)
+        self._slots = threading.Semaphore(self.max_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        self.stats = {"created": 0, "reused": 0, "pings": 0, "discarded": 0, "waits": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _checkout(self):
+        if not self._slots.acquire(blocking=False):
+            self._count("waits")
+            if not self._slots.acquire(timeout=self.acquire_timeout):
+                raise PoolTimeoutError(f"{self.acquire_timeout}s 内没有空闲的数据库连接 (上限 {self.max_size})")
+        try:
+            while True:
+                try:
+                    conn, returned_at = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if time.monotonic() - returned_at < self.ping_interval:
+                    self._count("reused")
+                    return conn
+                try:
+                    self._count("pings")
+                    conn.ping(reconnect=True)
+                    self._count("reused")
+                    return conn
+                except Exception:
+                    self._discard(conn)
+            if self._closed:
+                raise RuntimeError("连接池已关闭")
+            conn = self._connect()
+            with self._lock:
+                self._created += 1
+            self._count("created")
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _checkin(self, conn, broken):
+        try:
+            if broken or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def _discard(self, conn):
+        self._count("discarded")
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接，用完自动归还；同一线程嵌套调用时复用同一个连接"""
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            held[1] += 1
+            try:
+                yield held[0]
+            finally:
+                held[1] -= 1
+            return
+
+        conn = self._checkout()
+        self._local.held = [conn, 1]
+        broken = False
+        try:
+            yield conn
+        except self.BROKEN_ERRORS:
+            broken = True
+            raise
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self._local.held = None
+            self._checkin(conn, broken)
+
+    def size(self):
+        with self._lock:
+            return self._created
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
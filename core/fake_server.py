@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+"""
+core/fake_server.py
+-------------------
+本地模拟价格服务器。
+模仿 CoinGecko 的 /simple/price 接口 (加密货币)，并提供 /quotes 接口 (股票等任意符号)，
+配合 network.StandinProvider 可以离线压测整条抓取链路。
+
+【知识点】
+1. http.server: 标准库自带的 HTTP 服务器，无需安装 Flask。
+2. ThreadingHTTPServer: 每个请求一个线程，可以同时处理并发连接。
+3. latency / jitter: 人为加入的响应延迟及其随机抖动 (对数正态分布，有长尾)，
+   用来模拟真实网络的往返时间。
+"""
+
+
+class FakePriceHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 才支持 keep-alive 长连接
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体分两次写出，关闭 Nagle 算法避免长连接上的 40ms 延迟确认
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+
+        if parsed.path.endswith("/simple/price"):
+            # CoinGecko 格式: {'bitcoin': {'usd': 65000.12}}
+            ids = [i for i in params.get("ids", [""])[0].split(",") if i]
+            make_quote = lambda api_id: {"usd": self.server.quote(api_id)}
+        elif parsed.path.endswith("/quotes"):
+            # 替身格式: {'AAPL': {'price': 150.2}}
+            ids = [i for i in params.get("symbols", [""])[0].split(",") if i]
+            make_quote = lambda api_id: {"price": self.server.quote(api_id)}
+        else:
+            self._send_json(404, {"error": "not found"})
+            return
+
+        # 模拟网络延迟
+        delay = self.server.sample_latency()
+        if delay > 0:
+            time.sleep(delay)
+
+        self.server.record_request()
+        payload = {api_id: make_quote(api_id) for api_id in ids}
+        self._send_json(200, payload)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 压测时每秒上千个请求，关闭默认的访问日志
+        pass
+
+
+class FakePriceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0):
+        super().__init__(address, FakePriceHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.request_count = 0
+        self._prices = {}
+        self._lock = threading.Lock()
+
+    def sample_latency(self):
+        """延迟的中位数为 latency，jitter 为对数正态分布的 sigma (0 表示固定延迟)"""
+        if self.latency <= 0:
+            return 0.0
+        if self.jitter <= 0:
+            return self.latency
+        return self.latency * random.lognormvariate(0, self.jitter)
+
+    def record_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def quote(self, coin_id):
+        """每次报价在上一次的基础上随机游走 ±1%"""
+        with self._lock:
+            price = self._prices.get(coin_id, random.uniform(1, 50000))
+            price *= random.uniform(0.99, 1.01)
+            self._prices[coin_id] = price
+            return round(price, 6)
+
+
+def start_fake_server(port=0, latency=0.0, jitter=0.0):
+    """
+    在后台线程中启动模拟服务器。
+    port=0 表示由系统分配空闲端口。
+    返回 (server, base_url)，base_url 可以直接赋值给 network.API_BASE_URL，
+    也可以传给 network.enable_standin_provider。
+    """
+    server = FakePriceServer(("127.0.0.1", port), latency=latency, jitter=jitter)
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    host, real_port = server.server_address
+    print(f" [模拟服务器] 已启动: http://{host}:{real_port} (延迟 {latency * 1000:.0f}ms)")
+    return server, f"http://{host}:{real_port}/api/v3"
+
+
+def stop_fake_server(server):
+    server.shutdown()
+    server.server_close()
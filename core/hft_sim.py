@@ -1,54 +1,226 @@
 # -*- coding: utf-8 -*-
+import json
 import time
-import random
-from collections import deque, Counter
+from collections import Counter
+import numpy as np
 from core.models import Asset
+from core import indicators
+from utils.tools import TimingStat
 
 """
 core/hft_sim.py
 ---------------
-高频数据流模拟。
-演示 Deque 和 Counter 的使用。
+高频数据流模拟 / 压测负载生成器。
+用几何布朗运动 (GBM) 为 N 个符号批量生成 tick，驱动 Asset.update_price、数据库写入和 Web 输出，
+测量整条流水线的吞吐量 (ticks/s) 与延迟分位数。
 
 【知识点】
-1. deque (Double-ended queue): 双端队列，适合滑动窗口。
-2. Counter: 计数器，快速统计列表中元素出现的次数。
+1. 几何布朗运动: log(S_t+1 / S_t) = (mu - sigma²/2)·dt + sigma·√dt·Z，Z ~ N(0, 1)。
+   一次生成 (步数, 符号数) 的随机矩阵，np.cumsum + np.exp 得到整块价格，不需要 Python 循环。
+2. 节流 (Pacing): 指定目标速率时，每块 tick 都有计划发送时间，生成器提前到了就 sleep 等待；
+   不指定速率时全速生成，用来测上限。
+3. 延迟分位数: 每个 tick 从"应该发出"到"流水线处理完"的耗时，用 np.percentile 统计 p50/p95/p99。
+4. Counter: 计数器，快速统计涨跌次数。
+5. 逐笔历史 (TickBuffer) + 向量化指标 (core.indicators): 每个 tick 都在整段历史上重新计算 RSI。
 """
 
+# 默认参数：年化波动率 50%，一个 tick 相当于 1 秒 (一年按 252 个交易日 × 6.5 小时)
+DEFAULT_SIGMA = 0.5
+DEFAULT_DT = 1.0 / (252 * 6.5 * 3600)
 
+
+class TickBlock:
+    """一块 tick：timestamps 形状 (步数,)，prices / volumes 形状 (步数, 符号数)"""
+    __slots__ = ("symbols", "timestamps", "prices", "volumes", "created")
+
+    def __init__(self, symbols, timestamps, prices, volumes, created):
+        self.symbols = symbols
+        self.timestamps = timestamps
+        self.prices = prices
+        self.volumes = volumes
+        self.created = created  # 每个 tick 的计划发出时间 (perf_counter)，用于计算延迟
+
+    @property
+    def tick_count(self):
+        return self.prices.size
+
+
+class GBMTickGenerator:
+    """
+    多符号 GBM tick 生成器 (按块生成)
+    """
+
+    def __init__(self, symbols, start_prices=100.0, mu=0.0, sigma=DEFAULT_SIGMA, dt=DEFAULT_DT, seed=None):
+        self.symbols = list(symbols)
+        self.last_prices = np.broadcast_to(np.asarray(start_prices, dtype=np.float64),
+                                           (len(self.symbols),)).copy()
+        self.drift = (mu - 0.5 * sigma ** 2) * dt
+        self.scale = sigma * np.sqrt(dt)
+        self._rng = np.random.default_rng(seed)
+
+    def next_block(self, steps):
+        """生成 steps 步 (每步每个符号一个 tick)，返回 (价格矩阵, 成交量矩阵)"""
+        shape = (steps, len(self.symbols))
+        log_returns = self.drift + self.scale * self._rng.standard_normal(shape)
+        prices = self.last_prices * np.exp(np.cumsum(log_returns, axis=0))
+        self.last_prices = prices[-1].copy()
+        volumes = self._rng.exponential(100.0, shape).round()
+        return prices, volumes
+
+    def stream(self, total_steps, block_steps=1000, rate=None):
+        """
+        生成 TickBlock，直到 total_steps 步。
+        rate 为目标速率 (ticks/s，按所有符号合计)，为 None 时全速生成。
+        """
+        n = max(1, len(self.symbols))
+        step_interval = n / rate if rate else 0.0
+        started = time.perf_counter()
+        wall_started = time.time()
+        emitted = 0
+        while emitted < total_steps:
+            steps = min(block_steps, total_steps - emitted)
+            offsets = (emitted + np.arange(steps)) * step_interval
+            if rate:
+                # 节流：等到这一块最后一个 tick 的计划时间再发出
+                delay = started + offsets[-1] - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                created = started + offsets
+            else:
+                created = np.full(steps, time.perf_counter())
+            prices, volumes = self.next_block(steps)
+            timestamps = wall_started + (created - started)
+            emitted += steps
+            yield TickBlock(self.symbols, timestamps, prices, volumes, created)
+
+
+# -------------------------------
+#  流水线的各个阶段 (sink)
+# -------------------------------
+def apply_to_assets(assets):
+    """逐个调用 Asset.update_price (对象模型，每个 tick 一次方法调用)"""
+    by_symbol = {asset.symbol: asset for asset in assets}
+
+    def sink(block):
+        targets = [by_symbol[s] for s in block.symbols]
+        for row in block.prices.tolist():
+            for asset, price in zip(targets, row):
+                asset.update_price(price)
+    return sink
+
+
+def apply_to_store(store):
+    """列式存储 AssetStore：每一步对所有符号做一次向量化更新"""
+    def sink(block):
+        rows = store.rows_of(block.symbols)
+        for step_prices in block.prices:
+            store.update_prices(rows, step_prices)
+    return sink
+
+
+def db_sink(db, assets):
+    """每块结束后把每个资产的最新价格放入数据库写缓冲区 (DatabaseManager.log_prices，后台批量写入)"""
+    def sink(block):
+        db.log_prices(assets)
+    return sink
+
+
+def web_sink(assets):
+    """生成 /api/data 接口返回的 JSON (Web 层每次请求要做的序列化工作)"""
+    def sink(block):
+        data = assets.to_dicts() if hasattr(assets, "to_dicts") else [a.to_dict() for a in assets]
+        return json.dumps(data, ensure_ascii=False)
+    return sink
+
+
+def run_pipeline(generator, total_steps, sinks, block_steps=1000, rate=None):
+    """
+    驱动整条流水线，返回统计结果：
+    - ticks / elapsed / ticks_per_sec: 吞吐量
+    - latency: 每个 tick 从计划发出到所有阶段处理完的耗时分位数 (毫秒)
+    - stages: 每个阶段 (generate + 各 sink) 的累计耗时 (节流时 generate 包含等待时间)
+    sinks 为 [(名称, 函数), ...]，函数接收一个 TickBlock。
+    """
+    stages = {"generate": TimingStat()}
+    stages.update((name, TimingStat()) for name, _ in sinks)
+    latencies = []
+    ticks = 0
+
+    started = time.perf_counter()
+    stream = generator.stream(total_steps, block_steps, rate)
+    while True:
+        t0 = time.perf_counter()
+        block = next(stream, None)
+        if block is None:
+            break
+        stages["generate"].add(time.perf_counter() - t0)
+
+        for name, sink in sinks:
+            t0 = time.perf_counter()
+            sink(block)
+            stages[name].add(time.perf_counter() - t0)
+
+        done = time.perf_counter()
+        latencies.append(done - block.created)
+        ticks += block.tick_count
+    elapsed = time.perf_counter() - started
+
+    latency_ms = np.concatenate(latencies) * 1000 if latencies else np.zeros(1)
+    p50, p95, p99 = np.percentile(latency_ms, [50, 95, 99]).tolist()
+    return {
+        "ticks": ticks,
+        "elapsed": elapsed,
+        "ticks_per_sec": ticks / elapsed if elapsed else 0.0,
+        "latency": {"p50": p50, "p95": p95, "p99": p99, "max": float(latency_ms.max())},
+        "stages": {name: stat.snapshot() for name, stat in stages.items()},
+    }
+
+
+# -------------------------------
+#  演示
+# -------------------------------
 def run_high_frequency_test():
     print(" [HFT] 启动高频数据流模拟 (Moving Average Calculation)...")
 
     # 创建一个资产，只保留最近 10 次价格
     btc = Asset("BTC-PERP", 50000.00, window_size=10)
+    ticks = btc.enable_tick_history(capacity=1024, seed_interval=0.1)
 
     # 用于统计价格趋势 (涨/跌)
     trend_counter = Counter()
 
-    # 模拟 20 次快速价格变动
-    for i in range(1, 21):
+    # 模拟 20 次快速价格变动 (GBM，节流到每秒 10 个 tick)
+    generator = GBMTickGenerator([btc.symbol], btc.get_price(), sigma=0.5, dt=1e-6)
+    i = 0
+    for block in generator.stream(20, block_steps=1, rate=10):
+        i += 1
         # 1. 生成波动
         old_price = btc.get_price()
-        change = random.uniform(-50, 50)
-        new_price = old_price + change
+        new_price = float(block.prices[0, 0])
+        change = new_price - old_price
 
-        # 2. 更新资产 (deque 会自动处理数据进出)
+        # 2. 更新资产 (滑动窗口会自动处理数据进出)
         btc.update_price(new_price)
 
         # 3. 统计趋势 (Counter 用法)
         trend = "UP" if change > 0 else "DOWN"
         trend_counter.update([trend])  # 记录一次涨跌
 
-        # 4. 获取移动平均线
+        # 4. 获取移动平均线和波动率 (增量统计，每个 tick 都是 O(1))
         sma = btc.get_sma()
+        ema = btc.get_ema()
+        vol = btc.get_volatility()
+        rsi = indicators.rsi(ticks.prices(), period=14)[-1]
 
         # 打印状态栏
-        # deque 里的数据
-        history_view = list(btc.price_history_window)
-        print(f"Tick {i:02d} | 现价: {new_price:.1f} | SMA(10): {sma:.1f} | 缓存: {history_view}")
-
-        time.sleep(0.1)  # 极速刷新
+        # 滑动窗口里的数据
+        history_view = [round(p, 1) for p in btc.price_history_window]
+        print(f"Tick {i:02d} | 现价: {new_price:.1f} | SMA(10): {sma:.1f} | EMA: {ema:.1f} | σ: {vol:.1f} | RSI: {rsi:.1f} | 缓存: {history_view}")
 
     print("-" * 40)
     print(f" [统计] 趋势分布: {trend_counter}")
-    # Counter 输出示例: Counter({'UP': 12, 'DOWN': 8})
\ No newline at end of file
+    # Counter 输出示例: Counter({'UP': 12, 'DOWN': 8})
+
+    # 整段逐笔历史上的指标快照
+    summary = indicators.summarize(ticks.prices())
+    print(" [指标] " + " | ".join(f"{name}: {values[0]:.2f}" for name, values in summary.items()))
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from core.config import MAX_RETRIES
+from core.sys_config import GlobalConfig
+from utils.tools import TimingStat
+
+"""
+core/http_client.py
+-------------------
+HTTP 会话池。
+所有出站请求共享同一个连接池，复用 TCP/TLS 连接，并统一处理重试。
+
+【知识点】
+1. requests.Session: 会话对象，底层的 urllib3 连接池会保持 keep-alive 长连接。
+2. HTTPAdapter(pool_maxsize=N): 每个主机最多缓存 N 条空闲连接，一般与并发线程数一致。
+3. threading.local: 线程本地存储。每个线程拥有自己的 Session (Cookie 等状态互不干扰)，
+   但它们挂载的是同一个 HTTPAdapter，所以连接池是共享的。
+4. 指数退避 + 抖动 (Exponential Backoff + Jitter):
+   第 n 次重试前随机等待 0 ~ base * 2^n 秒，避免所有线程在同一时刻一起重试。
+5. 限流: 传入 limiter (core.rate_limiter.TokenBucket) 时，每次尝试前都要先拿令牌。
+"""
+
+# 这些状态码代表"稍后再试可能会成功"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimitError(requests.RequestException):
+    """等待令牌的时间超过上限，本次请求被放弃"""
+
+
+class SessionPool:
+    """
+    线程安全的会话池 (一个进程共用一个)
+    """
+
+    def __init__(self, pool_size=None, max_retries=MAX_RETRIES, backoff_base=0.5, backoff_max=8.0):
+        if pool_size is None:
+            pool_size = GlobalConfig()['max_threads'] or 1
+
+        self.pool_size = max(1, int(pool_size))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # 重试由我们自己控制 (max_retries=0)，这样才能加入抖动和统计
+        self._adapter = HTTPAdapter(pool_connections=10, pool_maxsize=self.pool_size, max_retries=0)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions = []
+        self._counters = {"requests": 0, "retries": 0, "failures": 0, "throttled": 0}
+        self.request_time = TimingStat()  # 只统计真正花在 HTTP 上的时间
+
+    # -------------------------------
+    #  会话管理
+    # -------------------------------
+    def session(self):
+        """获取当前线程专属的 Session (首次调用时创建)"""
+        sess = getattr(self._local, "session", None)
+        if sess is None:
+            sess = requests.Session()
+            sess.mount("http://", self._adapter)
+            sess.mount("https://", self._adapter)
+            self._local.session = sess
+            with self._lock:
+                self._sessions.append(sess)
+        return sess
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._counters[key] += n
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """
+        计算第 attempt 次重试前的等待时间 (Full Jitter 策略)
+        如果服务器通过 Retry-After 指定了等待时间，则至少等待这么久。
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def deadline(self, timeout, limiter=None):
+        """一次 get() 在最坏情况下 (所有重试都超时、每次都等满令牌) 的总耗时上限"""
+        backoff = sum(min(self.backoff_max, self.backoff_base * (2 ** i)) for i in range(self.max_retries))
+        per_attempt = timeout + (limiter.max_wait if limiter is not None else 0)
+        return per_attempt * (self.max_retries + 1) + backoff
+
+    # -------------------------------
+    #  发送请求 (带重试)
+    # -------------------------------
+    def get(self, url, timeout=5, limiter=None, **kwargs):
+        """
+        发送 GET 请求。网络异常和 429/5xx 会按 max_retries 重试，
+        重试耗尽后：网络异常继续抛出，HTTP 错误则返回最后一次的响应。
+        等不到令牌时抛出 RateLimitError。
+        """
+        sess = self.session()
+        attempt = 0
+        while True:
+            if limiter is not None and not limiter.acquire():
+                self._count("throttled")
+                raise RateLimitError(f"等待令牌超过 {limiter.max_wait}s，放弃请求")
+
+            self._count("requests")
+            started = time.perf_counter()
+            try:
+                response = sess.get(url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.request_time.add(time.perf_counter() - started)
+                if attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                delay = self.backoff_delay(attempt)
+            else:
+                self.request_time.add(time.perf_counter() - started)
+                retry_after = parse_retry_after(response)
+                if response.status_code == 429 and limiter is not None:
+                    # 被服务器限流：让同一数据源的所有线程一起退让
+                    limiter.pause(self.backoff_delay(attempt, retry_after))
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    if response.status_code >= 400:
+                        self._count("failures")
+                    return response
+                if response.status_code == 429 and limiter is not None:
+                    delay = 0  # 令牌桶已经替我们等待了
+                else:
+                    delay = self.backoff_delay(attempt, retry_after)
+                response.close()  # 归还连接
+
+            attempt += 1
+            self._count("retries")
+            time.sleep(delay)
+
+    # -------------------------------
+    #  统计
+    # -------------------------------
+    def stats(self):
+        """
+        返回请求/重试计数，以及 urllib3 连接池的连接复用情况：
+        - connections: 实际新建的 TCP 连接数
+        - pooled_requests: 经连接池发出的请求数
+        - reused: 复用已有连接的请求数
+        """
+        connections = 0
+        pooled_requests = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue  # 并发时可能刚被淘汰
+            connections += pool.num_connections
+            pooled_requests += pool.num_requests
+
+        with self._lock:
+            result = dict(self._counters)
+        result["request_time"] = self.request_time.snapshot()
+        result["connections"] = connections
+        result["pooled_requests"] = pooled_requests
+        result["reused"] = max(0, pooled_requests - connections)
+        return result
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for sess in sessions:
+            sess.close()
+        self._adapter.close()
+
+
+def parse_retry_after(response):
+    """解析 Retry-After 头 (只支持秒数格式)"""
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+# 全局会话池 (首次使用时才创建，创建过程加锁)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SessionPool()
+    return _pool
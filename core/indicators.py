@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+"""
+core/indicators.py
+------------------
+向量化技术指标库。
+所有函数都沿最后一个维度 (时间轴) 计算：
+- 传入一维数组 -> 单个符号的指标序列；
+- 传入二维数组 (符号数, 时间) -> 所有符号一次算完 (批量模式，见 tick_buffer.MultiTickBuffer.matrix)。
+输出与输入形状相同，数据不足的位置填 NaN。
+
+【知识点】
+1. EMA 的闭式解: y_t = a*x_t + (1-a)*y_{t-1} 展开后是一个加权前缀和，
+   y_j = (1-a)^j * [(1-a)*c + a * Σ x_k * (1-a)^(-k)]，可以用 np.cumsum 一次算完。
+   (1-a)^(-k) 随 k 指数增长，所以按块计算 (每块内增长不超过 _EMA_BLOCK_GROWTH)，块与块之间只传递最后一个值。
+2. RSI: 涨幅和跌幅分别做 Wilder 平滑 (alpha = 1/period 的 EMA)，RSI = 100 - 100 / (1 + 平均涨幅/平均跌幅)。
+3. MACD: 快线 EMA - 慢线 EMA，信号线是 MACD 的 EMA，柱状图是两者之差。
+4. 布林带: 中轨为 N 日 SMA，上下轨为中轨 ± k 倍标准差 (sliding_window_view 一次取出所有窗口)。
+5. ATR: 真实波幅 TR = max(高-低, |高-昨收|, |低-昨收|) 的 Wilder 平滑。
+   只有逐笔价格时 high = low = close，TR 退化为相邻价格差的绝对值。
+"""
+
+# EMA 分块计算时，单块内权重 (1-a)^(-k) 允许增长到的上限 (控制浮点误差)
+_EMA_BLOCK_GROWTH = 1e12
+
+
+def _as_float(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def ema(values, span=None, alpha=None):
+    """
+    指数移动平均 (与 pandas ewm(adjust=False) 一致，第一个值作为初值)。
+    span 与 alpha 二选一: alpha = 2 / (span + 1)。
+    """
+    x = _as_float(values)
+    if alpha is None:
+        alpha = 2.0 / (span + 1)
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha 必须在 (0, 1] 之间")
+    if x.shape[-1] == 0 or alpha == 1:
+        return x.copy()
+
+    decay = 1.0 - alpha
+    block = max(1, int(math.log(_EMA_BLOCK_GROWTH) / -math.log(decay)))
+    out = np.empty_like(x)
+    carry = x[..., 0].copy()  # 初值: y_{-1} = x_0，于是 y_0 = x_0
+    for start in range(0, x.shape[-1], block):
+        chunk = x[..., start:start + block]
+        k = np.arange(chunk.shape[-1])
+        growth = decay ** -k
+        acc = np.cumsum(chunk * growth, axis=-1) * alpha + (decay * carry)[..., None]
+        out[..., start:start + block] = acc / growth
+        carry = out[..., start + chunk.shape[-1] - 1]
+    return out
+
+
+def sma(values, window):
+    """简单移动平均 (前 window-1 个位置为 NaN)"""
+    x = _as_float(values)
+    out = np.full_like(x, np.nan)
+    if x.shape[-1] >= window:
+        out[..., window - 1:] = sliding_window_view(x, window, axis=-1).mean(axis=-1)
+    return out
+
+
+def rsi(prices, period=14):
+    """相对强弱指数 (0-100)，第一个位置为 NaN"""
+    x = _as_float(prices)
+    out = np.full_like(x, np.nan)
+    if x.shape[-1] < 2:
+        return out
+    delta = np.diff(x, axis=-1)
+    avg_gain = ema(np.maximum(delta, 0.0), alpha=1.0 / period)
+    avg_loss = ema(np.maximum(-delta, 0.0), alpha=1.0 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    # 没有下跌: RSI = 100；完全没有波动: RSI = 50
+    value = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), value)
+    out[..., 1:] = value
+    return out
+
+
+def macd(prices, fast=12, slow=26, signal=9):
+    """返回 (macd 线, 信号线, 柱状图)"""
+    x = _as_float(prices)
+    line = ema(x, fast) - ema(x, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(prices, window=20, k=2.0):
+    """返回 (中轨, 上轨, 下轨)，使用总体标准差 (与大多数行情软件一致)"""
+    x = _as_float(prices)
+    middle = np.full_like(x, np.nan)
+    width = np.full_like(x, np.nan)
+    if x.shape[-1] >= window:
+        windows = sliding_window_view(x, window, axis=-1)
+        middle[..., window - 1:] = windows.mean(axis=-1)
+        width[..., window - 1:] = windows.std(axis=-1) * k
+    return middle, middle + width, middle - width
+
+
+def true_range(high, low, close):
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    prev_close = np.concatenate((close[..., :1], close[..., :-1]), axis=-1)
+    return np.maximum.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+
+
+def atr(high, low, close, period=14):
+    """平均真实波幅 (Wilder 平滑)"""
+    return ema(true_range(high, low, close), alpha=1.0 / period)
+
+
+def summarize(prices):
+    """
+    每个符号取各指标的最新值，返回 {列名: 数组}。
+    prices 为一维 (单个符号) 或二维 (符号数, 时间)。
+    """
+    x = np.atleast_2d(_as_float(prices))
+    line, signal_line, hist = macd(x)
+    middle, upper, lower = bollinger(x)
+    return {
+        "ema": ema(x, 12)[:, -1],
+        "rsi": rsi(x)[:, -1],
+        "macd": line[:, -1],
+        "macd_signal": signal_line[:, -1],
+        "boll_upper": upper[:, -1],
+        "boll_lower": lower[:, -1],
+        "atr": atr(x, x, x)[:, -1],
+    }
@@ -7,28 +7,47 @@ core/models.py
 使用面向对象 (OOP) 定义资产的结构。
 支持数据持久化 (JSON 序列化)。
 新增: 高性能滑动窗口价格记录与简单移动平均线 (SMA)。
+新增: 增量统计 (core.rolling.RollingWindow) —— SMA / EMA / 波动率 / 区间都是 O(1)。
+新增: __slots__ 紧凑对象 —— 去掉实例 __dict__，类型名等常量放在类上共享；
+      compact_window=True 时价格窗口改用 array 环形缓冲区 (core.rolling.CompactWindow)。
+新增: 可选的逐笔历史 (core.tick_buffer.TickBuffer)，供 core.indicators 计算 RSI / MACD 等指标。
+新增: 列式存储 AssetStore —— 海量资产用 NumPy 连续数组保存，支持向量化批量更新。
 """
 
-from collections import deque
-import statistics
+import sys
+import time
+import numpy as np
+from core.config import SYSTEM_SETTINGS
+from core.rolling import RollingWindow, CompactWindow
+from core.tick_buffer import TickBuffer
 
 
 # --- 1. 定义父类 (基类) ---
 class Asset:
+    # __slots__: 实例只保存这几个字段，没有 __dict__ (百万级资产时内存差距很大)
+    __slots__ = ("symbol", "__price", "price_history_window", "tick_history")
+
     category = "General Asset"
+    asset_type = sys.intern("普通资产")  # 类常量，所有实例共享一份
 
-    def __init__(self, symbol: str, initial_price: float = 0.0, window_size: int = 5) -> None:
+    def __init__(self, symbol: str, initial_price: float = 0.0, window_size: int = 5,
+                 compact_window: bool = False) -> None:
         """
         window_size: 移动平均线的窗口大小 (最近 N 次价格)
+        compact_window: 为 True 时用 array 环形缓冲区保存窗口，更省内存
         """
         self.symbol = symbol
         self.__price = initial_price
 
-        # --- 核心升级: 使用 deque 记录滑动窗口价格 ---
-        self.price_history_window = deque(maxlen=window_size)
+        # --- 核心升级: 滑动窗口 + 增量统计 (用法与 deque 相同) ---
+        window_cls = CompactWindow if compact_window else RollingWindow
+        self.price_history_window = window_cls(window_size)
         if initial_price > 0:
             self.price_history_window.append(initial_price)
 
+        # 逐笔历史默认关闭 (每个资产一个定长 NumPy 缓冲区，按需开启)
+        self.tick_history = None
+
     def update_price(self, new_price):
         if new_price < 0:
             print(f" !! [警告] 价格不能为负数: {new_price}")
@@ -36,15 +55,44 @@ class Asset:
 
         self.__price = new_price
         self.price_history_window.append(new_price)  # 自动维护滑动窗口
+        if self.tick_history is not None:
+            self.tick_history.append(time.time(), new_price)
+
+    def enable_tick_history(self, capacity=1024, seed_interval=None):
+        """
+        开启逐笔历史记录，用滑动窗口中已有的价格做初始数据。
+        之后每次 update_price 都会追加一个 tick (时间戳, 价格)。
+        窗口里只有价格没有时间: 初始 tick 按采样间隔 seed_interval 秒 (默认刷新间隔 refresh_interval)
+        往前倒推，最后一个是当前时间。这样时间戳严格递增，按时间算速率 / 重采样时不会出现零间隔。
+        """
+        if self.tick_history is None:
+            self.tick_history = TickBuffer(capacity)
+            prices = list(self.price_history_window)
+            if seed_interval is None:
+                seed_interval = SYSTEM_SETTINGS["refresh_interval"]
+            timestamps = time.time() - seed_interval * np.arange(len(prices) - 1, -1, -1)
+            self.tick_history.extend(timestamps, prices)
+        return self.tick_history
 
     def get_price(self):
         return self.__price
 
     def get_sma(self):
         """获取简单移动平均线 (Simple Moving Average)"""
-        if not self.price_history_window:
-            return 0.0
-        return statistics.mean(self.price_history_window)
+        return self.price_history_window.mean
+
+    def get_ema(self):
+        """获取指数移动平均线 (Exponential Moving Average)，跨度默认等于窗口大小"""
+        ema = self.price_history_window.ema
+        return ema if ema is not None else 0.0
+
+    def get_volatility(self):
+        """窗口内价格的样本标准差"""
+        return self.price_history_window.stdev
+
+    def get_range(self):
+        """窗口内的 (最低价, 最高价)"""
+        return self.price_history_window.min, self.price_history_window.max
 
     def analyze_risk(self):
         return "普通资产风险: 未知"
@@ -61,13 +109,44 @@ class Asset:
             "type": "Asset"
         }
 
+    # ===== Pickle 支持 (core/checkpoint.py) =====
+    def __getstate__(self):
+        state = {}
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                if name.startswith("__"):
+                    name = f"_{cls.__name__}{name}"  # 私有字段的真实名字 (名称改写)
+                state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state):
+        """
+        兼容旧版快照：旧对象带 __dict__，里面有 asset_type 字符串，窗口是普通 deque。
+        """
+        if isinstance(state, tuple):
+            merged = dict(state[0] or {})
+            merged.update(state[1] or {})
+            state = merged
+        self.tick_history = None  # 旧快照里没有这个字段
+        for name, value in state.items():
+            if name == "asset_type":
+                continue  # 现在是类常量
+            if name == "price_history_window" and not hasattr(value, "mean"):
+                window = RollingWindow(value.maxlen or max(1, len(value)))
+                for price in value:
+                    window.append(price)
+                value = window
+            setattr(self, name, value)
+
 
 # --- 2. Stock 子类 ---
 class Stock(Asset):
-    def __init__(self, symbol, price, exchange="NASDAQ", window_size=5):
-        super().__init__(symbol, price, window_size)
+    __slots__ = ("exchange",)
+    asset_type = sys.intern("股票")
+
+    def __init__(self, symbol, price, exchange="NASDAQ", window_size=5, compact_window=False):
+        super().__init__(symbol, price, window_size, compact_window)
         self.exchange = exchange
-        self.asset_type = "股票"
 
     def analyze_risk(self):
         return "风险等级: 中 (受市场波动和财报影响)"
@@ -82,10 +161,12 @@ class Stock(Asset):
 
 # --- 3. Crypto 子类 ---
 class Crypto(Asset):
-    def __init__(self, symbol, price, chain="Ethereum", window_size=5):
-        super().__init__(symbol, price, window_size)
+    __slots__ = ("chain",)
+    asset_type = sys.intern("加密货币")
+
+    def __init__(self, symbol, price, chain="Ethereum", window_size=5, compact_window=False):
+        super().__init__(symbol, price, window_size, compact_window)
         self.chain = chain
-        self.asset_type = "加密货币"
 
     def analyze_risk(self):
         return "风险等级: 极高 (24小时交易，波动剧烈)"
@@ -99,3 +180,341 @@ class Crypto(Asset):
         data["chain"] = self.chain
         data["type"] = "Crypto"
         return data
+
+
+# --- 4. 列式存储 (Columnar Store) ---
+# 类型编码：数组里只存一个小整数，而不是每个对象都带一份字符串
+ASSET_TYPES = ("Asset", "Stock", "Crypto")
+_TYPE_CODES = {name: code for code, name in enumerate(ASSET_TYPES)}
+_TYPE_CLASSES = {"Asset": Asset, "Stock": Stock, "Crypto": Crypto}
+
+
+class AssetStore:
+    """
+    列式资产存储。
+    一个 AssetStore 代替成千上万个 Asset 对象：symbol / 类型 / 价格 / SMA 各占一个连续数组，
+    滑动窗口是一个 (N, window_size) 的二维环形缓冲区。
+
+    【知识点】
+    1. 结构数组 vs 对象列表: 10 万个 Python 对象各自带 __dict__ 和 deque，
+       而列式存储每个资产只占几十字节。
+    2. 向量化: update_prices() 一次更新任意多行，没有 Python 循环。
+    3. 视图 (AssetView): 旧代码仍然可以拿到"像 Asset 一样"的对象，但数据存放在数组里。
+    """
+
+    SYMBOL_DTYPE = "U20"  # 与数据库 symbol VARCHAR(20) 对齐
+    VENUE_DTYPE = "U32"   # 交易所 (Stock) 或区块链 (Crypto)
+
+    def __init__(self, capacity=1024, window_size=5):
+        capacity = max(1, int(capacity))
+        self.window_size = max(1, int(window_size))
+        self._size = 0
+        self._index = {}  # symbol -> 行号
+
+        self.symbols = np.empty(capacity, dtype=self.SYMBOL_DTYPE)
+        self.types = np.zeros(capacity, dtype=np.int8)
+        self.venues = np.empty(capacity, dtype=self.VENUE_DTYPE)
+        self.prices = np.zeros(capacity, dtype=np.float64)
+        self.sma = np.zeros(capacity, dtype=np.float64)
+        self.ema = np.zeros(capacity, dtype=np.float64)
+        self.alpha = 2.0 / (self.window_size + 1)
+
+        # 滑动窗口：每行一个环形缓冲区，pos 为下一次写入位置，count 为已有价格数
+        self.windows = np.zeros((capacity, self.window_size), dtype=np.float64)
+        self.window_pos = np.zeros(capacity, dtype=np.int32)
+        self.window_count = np.zeros(capacity, dtype=np.int32)
+
+    # -------------------------------
+    #  容量管理
+    # -------------------------------
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return len(self.prices)
+
+    def _grow(self, min_capacity):
+        """容量不够时按 2 倍扩容 (均摊 O(1))"""
+        new_capacity = max(min_capacity, self.capacity * 2)
+        for name in ("symbols", "types", "venues", "prices", "sma", "ema", "window_pos", "window_count"):
+            old = getattr(self, name)
+            new = np.zeros(new_capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+        windows = np.zeros((new_capacity, self.window_size), dtype=np.float64)
+        windows[:self._size] = self.windows[:self._size]
+        self.windows = windows
+
+    # -------------------------------
+    #  添加资产
+    # -------------------------------
+    def add(self, symbol, price=0.0, asset_type="Asset", venue=""):
+        """添加一个资产，返回行号 (symbol 已存在或超过 SYMBOL_DTYPE 的长度时抛出 ValueError)"""
+        if symbol in self._index:
+            raise ValueError(f"资产已存在: {symbol}")
+        width = np.dtype(self.SYMBOL_DTYPE).itemsize // 4  # "U20": 每个字符占 4 字节
+        if len(symbol) > width:
+            # 数组里会被悄悄截断，而 _index 按完整的符号查找，两者对不上
+            raise ValueError(f"资产代码超过 {width} 个字符: {symbol}")
+        if self._size >= self.capacity:
+            self._grow(self._size + 1)
+
+        row = self._size
+        self._size += 1
+        self._index[symbol] = row
+        self.symbols[row] = symbol
+        self.types[row] = _TYPE_CODES[asset_type]
+        self.venues[row] = venue or ""
+        self.prices[row] = price
+        if price > 0:
+            self.windows[row, 0] = price
+            self.window_pos[row] = 1 % self.window_size
+            self.window_count[row] = 1
+            self.sma[row] = price
+            self.ema[row] = price
+        return row
+
+    @classmethod
+    def from_assets(cls, assets_list, window_size=None):
+        """从 Asset 对象列表构建 (保留每个资产的滑动窗口历史)"""
+        assets_list = list(assets_list)
+        if window_size is None:
+            sizes = [a.price_history_window.maxlen or 1 for a in assets_list]
+            window_size = max(sizes) if sizes else 5
+        store = cls(capacity=len(assets_list) or 1, window_size=window_size)
+
+        for asset in assets_list:
+            asset_type = asset.to_dict()["type"]
+            venue = getattr(asset, "exchange", None) or getattr(asset, "chain", None) or ""
+            row = store.add(asset.symbol, 0.0, asset_type, venue)
+            history = list(asset.price_history_window)[-store.window_size:]
+            n = len(history)
+            store.windows[row, :n] = history
+            store.window_pos[row] = n % store.window_size
+            store.window_count[row] = n
+            store.prices[row] = asset.get_price()
+            store.sma[row] = sum(history) / n if n else 0.0
+            store.ema[row] = asset.get_ema()
+        return store
+
+    # -------------------------------
+    #  查询
+    # -------------------------------
+    def row_of(self, symbol):
+        return self._index[symbol]
+
+    def rows_of(self, symbols):
+        """符号列表 -> 行号数组 (不存在的符号抛出 KeyError)"""
+        index = self._index
+        return np.fromiter((index[s] for s in symbols), dtype=np.int64, count=len(symbols))
+
+    def __contains__(self, symbol):
+        return symbol in self._index
+
+    def __getitem__(self, key):
+        """store['AAPL'] 或 store[0] 返回一个 AssetView"""
+        row = self._index[key] if isinstance(key, str) else int(key)
+        if not 0 <= row < self._size:
+            raise IndexError(row)
+        return AssetView(self, row)
+
+    def __iter__(self):
+        for row in range(self._size):
+            yield AssetView(self, row)
+
+    def window_of(self, row):
+        """按时间顺序返回某一行滑动窗口中的价格"""
+        count = int(self.window_count[row])
+        if count < self.window_size:
+            return self.windows[row, :count].tolist()
+        return np.roll(self.windows[row], -int(self.window_pos[row])).tolist()
+
+    # -------------------------------
+    #  向量化批量更新
+    # -------------------------------
+    def update_prices(self, rows, new_prices):
+        """
+        批量更新价格。rows 可以是行号数组或符号列表。
+        负数价格被忽略 (与 Asset.update_price 一致)；同一行出现多次时以最后一次为准。
+        返回实际更新的行数。
+        """
+        rows = np.asarray(rows)
+        if rows.dtype.kind in "UO":
+            rows = self.rows_of(rows.tolist())
+        rows = rows.astype(np.int64, copy=False)
+        new_prices = np.asarray(new_prices, dtype=np.float64)
+
+        valid = new_prices >= 0
+        rows, new_prices = rows[valid], new_prices[valid]
+        if len(rows) == 0:
+            return 0
+
+        # 去重：反转后 np.unique 取到的就是每行最后一次出现的位置
+        _, last = np.unique(rows[::-1], return_index=True)
+        keep = len(rows) - 1 - last
+        rows, new_prices = rows[keep], new_prices[keep]
+
+        # 1. 写入最新价格和环形窗口，更新 EMA (第一条价格直接作为初值)
+        self.prices[rows] = new_prices
+        pos = self.window_pos[rows]
+        self.windows[rows, pos] = new_prices
+        self.window_pos[rows] = (pos + 1) % self.window_size
+        old_count = self.window_count[rows]
+        ema = self.ema[rows]
+        self.ema[rows] = np.where(old_count == 0, new_prices, ema + self.alpha * (new_prices - ema))
+        count = np.minimum(old_count + 1, self.window_size)
+        self.window_count[rows] = count
+
+        # 2. 重新计算这些行的 SMA (窗口中未使用的格子为 0，不影响求和)
+        self.sma[rows] = self.windows[rows].sum(axis=1) / count
+        return len(rows)
+
+    def update_from_dict(self, prices):
+        """用 {symbol: price} (例如 network.fetch_prices 的结果) 更新已存在的资产"""
+        known = [s for s in prices if s in self._index]
+        return self.update_prices(self.rows_of(known), [prices[s] for s in known])
+
+    # -------------------------------
+    #  导出
+    # -------------------------------
+    def to_columns(self):
+        """
+        导出为列字典 (可以直接交给 pandas.DataFrame)，字段与 Asset.to_dict() 一致。
+        """
+        n = self._size
+        types = np.array(ASSET_TYPES)[self.types[:n]]
+        venues = self.venues[:n]
+        return {
+            "symbol": self.symbols[:n],
+            "price": self.prices[:n],
+            "sma": self.sma[:n],
+            "type": types,
+            "exchange": np.where(types == "Stock", venues, None),
+            "chain": np.where(types == "Crypto", venues, None),
+        }
+
+    def to_dicts(self):
+        """导出为字典列表，格式与逐个调用 Asset.to_dict() 相同"""
+        n = self._size
+        symbols = self.symbols[:n].tolist()
+        prices = self.prices[:n].tolist()
+        sma = self.sma[:n].tolist()
+        types = self.types[:n].tolist()
+        venues = self.venues[:n].tolist()
+
+        result = []
+        for symbol, price, avg, code, venue in zip(symbols, prices, sma, types, venues):
+            item = {"symbol": symbol, "price": price, "sma": avg, "type": ASSET_TYPES[code]}
+            if code == 1:
+                item["exchange"] = venue
+            elif code == 2:
+                item["chain"] = venue
+            result.append(item)
+        return result
+
+    def to_assets(self):
+        """还原为独立的 Stock / Crypto / Asset 对象列表"""
+        return [view.materialize() for view in self]
+
+    def memory_bytes(self):
+        """所有数组占用的字节数 (不含符号索引字典)"""
+        arrays = (self.symbols, self.types, self.venues, self.prices, self.sma, self.ema,
+                  self.windows, self.window_pos, self.window_count)
+        return sum(a.nbytes for a in arrays)
+
+
+class AssetView:
+    """
+    AssetStore 中某一行的轻量视图，提供与 Asset 相同的常用接口。
+    视图本身只保存 (store, row) 两个引用，读写都直接作用在数组上。
+    """
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def symbol(self):
+        return str(self._store.symbols[self._row])
+
+    @property
+    def type_code(self):
+        """类型编码 ("Asset" / "Stock" / "Crypto")，与 to_dict() 的 "type" 字段一致"""
+        return ASSET_TYPES[self._store.types[self._row]]
+
+    @property
+    def asset_type(self):
+        """与对应模型类相同的类常量 (例如 "股票")，视图可以直接替代对象"""
+        return _TYPE_CLASSES[self.type_code].asset_type
+
+    @property
+    def exchange(self):
+        if self.type_code != "Stock":
+            raise AttributeError("exchange")
+        return str(self._store.venues[self._row])
+
+    @property
+    def chain(self):
+        if self.type_code != "Crypto":
+            raise AttributeError("chain")
+        return str(self._store.venues[self._row])
+
+    @property
+    def price_history_window(self):
+        return self._store.window_of(self._row)
+
+    def get_price(self):
+        return float(self._store.prices[self._row])
+
+    def get_sma(self):
+        return float(self._store.sma[self._row])
+
+    def get_ema(self):
+        return float(self._store.ema[self._row])
+
+    def get_volatility(self):
+        window = self.price_history_window
+        return float(np.std(window, ddof=1)) if len(window) > 1 else 0.0
+
+    def get_range(self):
+        window = self.price_history_window
+        return (min(window), max(window)) if window else (0.0, 0.0)
+
+    def update_price(self, new_price):
+        if new_price < 0:
+            print(f" !! [警告] 价格不能为负数: {new_price}")
+            return
+        self._store.update_prices(np.array([self._row]), np.array([new_price]))
+
+    def analyze_risk(self):
+        return _TYPE_CLASSES[self.type_code].analyze_risk(self)
+
+    def to_dict(self):
+        data = {"symbol": self.symbol, "price": self.get_price(), "sma": self.get_sma(), "type": self.type_code}
+        if self.type_code == "Stock":
+            data["exchange"] = self.exchange
+        elif self.type_code == "Crypto":
+            data["chain"] = self.chain
+        return data
+
+    def materialize(self):
+        """复制出一个独立的 Asset/Stock/Crypto 对象 (包括滑动窗口历史)"""
+        store, row = self._store, self._row
+        type_code = self.type_code
+        venue = str(store.venues[row])
+        if type_code == "Stock":
+            obj = Stock(self.symbol, 0.0, exchange=venue, window_size=store.window_size)
+        elif type_code == "Crypto":
+            obj = Crypto(self.symbol, 0.0, chain=venue, window_size=store.window_size)
+        else:
+            obj = Asset(self.symbol, 0.0, window_size=store.window_size)
+        for price in self.price_history_window:
+            obj.update_price(price)
+        if not obj.price_history_window:
+            obj.update_price(self.get_price())
+        return obj
+
+    def __str__(self):
+        return f"[{self.symbol}] 现价: ${self.get_price():.2f} | SMA: {self.get_sma():.2f}"
@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import threading
 import requests  # 导入刚才安装的库
-import random
-from typing import Optional # 导入工具
+from typing import Dict, List, Optional # 导入工具
+from core.http_client import get_session_pool
+from core.price_cache import price_cache
+from core.rate_limiter import get_rate_limiter, set_rate_limit
 """
 core/network.py
 ---------------
@@ -12,8 +16,26 @@ core/network.py
 1. requests.get: 发送 HTTP GET 请求
 2. timeout: 设置超时，防止程序卡死
 3. response.json(): 自动解析 JSON 响应
+4. run_in_executor: 把阻塞的 requests 调用交给线程池，供 asyncio 协程 await
+5. 批量请求: simple/price 接口的 ids 参数支持逗号分隔，一次请求可以查询多个币种
+6. 连接复用: 所有请求走 core.http_client 的共享会话池 (keep-alive + 退避重试)
+7. 缓存: fetch_* 函数先查 core.price_cache，重叠的查询共享同一次请求
+8. 限流: 每次请求前先从该数据源的令牌桶 (core.rate_limiter) 拿令牌
+9. 数据源注册表: 不同类别的符号 (crypto / stock) 路由到各自注册的 PriceProvider
 """
 
+# API 根地址 (压测时可以替换为本地模拟服务器的地址)
+API_BASE_URL = "https://api.coingecko.com/api/v3"
+
+# 默认的单次请求超时 (秒)
+REQUEST_TIMEOUT = 5
+
+# 默认数据源名称 (对应 config.RATE_LIMITS 中的限流配置)
+PROVIDER_NAME = "coingecko"
+
+# 每个批量请求最多携带的币种数量 (控制 URL 长度)
+BATCH_SIZE = 100
+
 # 简单的 ID 映射字典：将我们的符号映射到 API 需要的 ID
 COIN_MAPPING = {
     "BTC": "bitcoin",
@@ -21,42 +43,319 @@ COIN_MAPPING = {
     "DOGE": "dogecoin"
 }
 
+# 符号类别
+CLASS_CRYPTO = "crypto"
+CLASS_STOCK = "stock"
+
+# 手动指定某些符号的类别 (优先于自动判断)，例如 {"BTC-USD": "crypto"}
+SYMBOL_CLASSES = {}
+
 
-def fetch_real_price(symbol: str) -> Optional[float]:
+def split_batches(items: List[str], batch_size: int = BATCH_SIZE) -> List[List[str]]:
     """
-    尝试从网络获取实时价格。
-    如果失败，为了不让程序崩溃，回退到随机模拟。
+    将列表切分成若干个长度不超过 batch_size 的小批次。
     """
-    # 1. 检查是否支持该币种
-    coin_id = COIN_MAPPING.get(symbol)
+    batch_size = max(1, int(batch_size))
+    return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
 
-    if not coin_id:
-        # 如果是股票 (AAPL) 或不支持的币，暂时返回 None，交给模拟器处理
+
+# ==========================================
+#  数据源 (Provider)
+# ==========================================
+class PriceProvider:
+    """
+    数据源基类。
+    子类需要实现 symbol_id()、build_url() 和 parse()，
+    并声明自己的批量大小；限流参数为 None 时沿用 config.RATE_LIMITS。
+    """
+    name = "base"
+
+    def __init__(self, batch_size=BATCH_SIZE, rate=None, burst=None):
+        self.batch_size = batch_size
+        self.rate = rate
+        self.burst = burst
+
+    @property
+    def limiter(self):
+        return get_rate_limiter(self.name)
+
+    def symbol_id(self, symbol) -> Optional[str]:
+        """符号 -> API 需要的 ID，不支持时返回 None"""
+        raise NotImplementedError
+
+    def build_url(self, ids: List[str]) -> str:
+        raise NotImplementedError
+
+    def parse(self, data, api_id) -> float:
+        """从响应 JSON 中取出某个 ID 的价格"""
+        raise NotImplementedError
+
+    def request_batch(self, symbols: List[str], timeout: float = REQUEST_TIMEOUT) -> Dict[str, float]:
+        """
+        用一次 HTTP 请求获取一批符号的价格 (不经过缓存)。
+        返回 {symbol: price}，获取失败或不支持的符号不会出现在结果中。
+        """
+        # 1. 符号 -> API ID (多个符号可能指向同一个 ID)
+        id_to_symbols = {}
+        for symbol in symbols:
+            api_id = self.symbol_id(symbol)
+            if api_id:
+                id_to_symbols.setdefault(api_id, []).append(symbol)
+
+        if not id_to_symbols:
+            return {}
+
+        ids = ",".join(id_to_symbols)
+        url = self.build_url(list(id_to_symbols))
+
+        print(f" [网络] 正在请求 {self.name}: {len(id_to_symbols)} 个符号 ({ids[:40]}{'...' if len(ids) > 40 else ''})")
+
+        try:
+            # --- 核心网络请求 ---
+            # timeout 表示如果 N 秒没反应就报错，避免无限等待
+            # 会话池会复用已有连接，并在网络异常/429/5xx 时按 MAX_RETRIES 退避重试
+            response = get_session_pool().get(url, timeout=timeout, limiter=self.limiter)
+
+            # 检查 HTTP 状态码 (200 是成功，404 是未找到，500 是服务器错误)
+            response.raise_for_status()
+
+            # 解析 JSON
+            data = response.json()
+        except requests.RequestException as e:
+            # 捕获所有与网络相关的异常 (断网、DNS错误、超时)
+            print(f" !! [网络错误] 无法从 {self.name} 获取 {len(symbols)} 个符号的价格: {e}")
+            return {}
+        except ValueError:
+            print(f" !! [解析错误] {self.name} 返回的不是合法的 JSON")
+            return {}
+
+        # 2. 把结果映射回我们的符号
+        prices = {}
+        for api_id, id_symbols in id_to_symbols.items():
+            try:
+                real_price = float(self.parse(data, api_id))
+            except (KeyError, TypeError, ValueError):
+                print(f" !! [解析错误] {self.name} 返回的数据中缺少 {api_id}")
+                continue
+            for symbol in id_symbols:
+                prices[symbol] = real_price
+
+        return prices
+
+
+class CoinGeckoProvider(PriceProvider):
+    """CoinGecko simple/price 接口 (加密货币)"""
+    name = "coingecko"
+
+    def __init__(self, base_url=None, batch_size=BATCH_SIZE, rate=None, burst=None):
+        super().__init__(batch_size, rate, burst)
+        self._base_url = base_url
+
+    @property
+    def base_url(self):
+        # 未指定时跟随模块级 API_BASE_URL (压测时可整体替换)
+        return self._base_url or API_BASE_URL
+
+    def symbol_id(self, symbol):
+        return COIN_MAPPING.get(symbol)
+
+    def build_url(self, ids):
+        return f"{self.base_url}/simple/price?ids={','.join(ids)}&vs_currencies=usd"
+
+    def parse(self, data, api_id):
+        # 数据格式通常是: {'bitcoin': {'usd': 65000.12}, 'ethereum': {'usd': 3000.5}}
+        return data[api_id]['usd']
+
+
+class StandinProvider(PriceProvider):
+    """
+    本地替身数据源 (core/fake_server.py 的 /quotes 接口)。
+    任何符号都能报价，用于离线压测整条抓取链路。
+    """
+    name = "standin"
+
+    def __init__(self, base_url, batch_size=BATCH_SIZE, rate=None, burst=None):
+        super().__init__(batch_size, rate, burst)
+        self.base_url = base_url
+
+    def symbol_id(self, symbol):
+        return symbol
+
+    def build_url(self, ids):
+        return f"{self.base_url}/quotes?symbols={','.join(ids)}"
+
+    def parse(self, data, api_id):
+        # 数据格式: {'AAPL': {'price': 150.2}, 'TSLA': {'price': 800.1}}
+        return data[api_id]['price']
+
+
+# ==========================================
+#  数据源注册表
+# ==========================================
+_providers = {}  # 符号类别 -> PriceProvider
+_providers_lock = threading.Lock()
+
+
+def register_provider(asset_class, provider):
+    """
+    为某个符号类别注册数据源 (会替换该类别原有的数据源)。
+    数据源声明了 rate/burst 时，同时为它创建令牌桶。
+    """
+    with _providers_lock:
+        _providers[asset_class] = provider
+    if provider.rate is not None:
+        set_rate_limit(provider.name, provider.rate, provider.burst or 1)
+    return provider
+
+
+def unregister_provider(asset_class):
+    with _providers_lock:
+        return _providers.pop(asset_class, None)
+
+
+def get_provider(asset_class):
+    return _providers.get(asset_class)
+
+
+def registered_providers():
+    """返回所有已注册的数据源 (去重)"""
+    with _providers_lock:
+        return list(dict.fromkeys(_providers.values()))
+
+
+def classify_symbol(symbol):
+    """判断符号类别：先查 SYMBOL_CLASSES，COIN_MAPPING 中的是加密货币，其余按股票处理"""
+    if symbol in SYMBOL_CLASSES:
+        return SYMBOL_CLASSES[symbol]
+    return CLASS_CRYPTO if symbol in COIN_MAPPING else CLASS_STOCK
+
+
+def provider_for(symbol):
+    """返回负责该符号的数据源，没有注册或数据源不支持时返回 None"""
+    provider = _providers.get(classify_symbol(symbol))
+    if provider is None or not provider.symbol_id(symbol):
         return None
+    return provider
 
-    url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd"
 
-    print(f" [网络] 正在请求 API: {symbol} ({coin_id})...")
+def is_supported(symbol):
+    return provider_for(symbol) is not None
+
+
+def route_symbols(symbols: List[str]):
+    """
+    按数据源分组 (去重、保持顺序)，返回 {provider: [symbols]}。
+    不支持的符号被丢弃。
+    """
+    routes = {}
+    for symbol in dict.fromkeys(symbols):
+        provider = provider_for(symbol)
+        if provider is not None:
+            routes.setdefault(provider, []).append(symbol)
+    return routes
+
+
+def enable_standin_provider(base_url, asset_classes=(CLASS_STOCK,), batch_size=BATCH_SIZE,
+                            rate=None, burst=None):
+    """
+    把本地替身数据源注册到指定的符号类别上 (默认只接管股票)。
+    """
+    provider = StandinProvider(base_url, batch_size=batch_size, rate=rate, burst=burst)
+    for asset_class in asset_classes:
+        register_provider(asset_class, provider)
+    return provider
 
-    try:
-        # --- 核心网络请求 ---
-        # timeout=5 表示如果 5 秒没反应就报错，避免无限等待
-        response = requests.get(url, timeout=5)
 
-        # 检查 HTTP 状态码 (200 是成功，404 是未找到，500 是服务器错误)
-        response.raise_for_status()
+# 默认只有 CoinGecko 负责加密货币；股票没有数据源，交给模拟器处理
+register_provider(CLASS_CRYPTO, CoinGeckoProvider())
 
-        # 解析 JSON
-        data = response.json()
-        # 数据格式通常是: {'bitcoin': {'usd': 65000.12}}
-        real_price = data[coin_id]['usd']
 
-        return float(real_price)
+# ==========================================
+#  抓取接口
+# ==========================================
+def request_price_batch(symbols: List[str], timeout: float = REQUEST_TIMEOUT) -> Dict[str, float]:
+    """
+    获取一批符号的价格 (不经过缓存)：每个数据源一次 HTTP 请求。
+    返回 {symbol: price}，获取失败或不支持的符号不会出现在结果中。
+    """
+    prices = {}
+    for provider, provider_symbols in route_symbols(symbols).items():
+        prices.update(provider.request_batch(provider_symbols, timeout))
+    return prices
+
+
+def fetch_price_batch(symbols: List[str], timeout: float = REQUEST_TIMEOUT) -> Dict[str, float]:
+    """
+    获取一批符号的价格：缓存命中的直接返回，其余每个数据源最多合并成一次请求。
+    """
+    supported = [s for s in symbols if is_supported(s)]
+    return price_cache.get_or_load_many(
+        supported, lambda missing: request_price_batch(missing, timeout)
+    )
 
-    except requests.RequestException as e:
-        # 捕获所有与网络相关的异常 (断网、DNS错误、超时)
-        print(f" !! [网络错误] 无法获取 {symbol} 价格: {e}")
+
+def fetch_prices(symbols: List[str], batch_size: Optional[int] = None,
+                 timeout: float = REQUEST_TIMEOUT) -> Dict[str, float]:
+    """
+    批量获取多个符号的价格。
+    自动去重，缓存未命中的符号按数据源分组、再按各自的批量大小分批，每批只发一次请求。
+    batch_size 可以进一步压低每批的上限。
+    """
+    # dict.fromkeys 可以在保持顺序的同时去重
+    unique = [s for s in dict.fromkeys(symbols) if is_supported(s)]
+
+    def load(missing):
+        prices = {}
+        for provider, provider_symbols in route_symbols(missing).items():
+            size = min(provider.batch_size, batch_size or provider.batch_size)
+            for batch in split_batches(provider_symbols, size):
+                prices.update(provider.request_batch(batch, timeout))
+        return prices
+
+    return price_cache.get_or_load_many(unique, load)
+
+
+def fetch_real_price(symbol: str, timeout: float = REQUEST_TIMEOUT) -> Optional[float]:
+    """
+    尝试从网络获取实时价格。
+    如果失败，为了不让程序崩溃，回退到随机模拟。
+    """
+    if not is_supported(symbol):
+        # 如果是股票 (AAPL) 或不支持的币，暂时返回 None，交给模拟器处理
         return None
-    except KeyError:
-        print(f" !! [解析错误] API 返回的数据格式不符合预期")
-        return None
\ No newline at end of file
+    return fetch_price_batch([symbol], timeout).get(symbol)
+
+
+def request_deadline(symbols: List[str], timeout: float = REQUEST_TIMEOUT) -> float:
+    """一批符号在最坏情况下的总耗时 (各数据源依次请求，含重试、退避与等待令牌)"""
+    pool = get_session_pool()
+    return sum(pool.deadline(timeout, provider.limiter) for provider in route_symbols(symbols)) or timeout
+
+
+async def fetch_real_price_async(symbol: str, timeout: float = REQUEST_TIMEOUT,
+                                 executor=None) -> Optional[float]:
+    """
+    fetch_real_price 的异步版本。
+    阻塞的 HTTP 请求在线程池 (executor) 中执行，协程只负责等待结果，
+    并用 asyncio.wait_for 给整个请求加一个硬性截止时间。
+    """
+    prices = await fetch_price_batch_async([symbol], timeout, executor)
+    return prices.get(symbol)
+
+
+async def fetch_price_batch_async(symbols: List[str], timeout: float = REQUEST_TIMEOUT,
+                                  executor=None) -> Dict[str, float]:
+    """
+    fetch_price_batch 的异步版本。
+    截止时间包含了会话池的全部重试、退避以及等待令牌的时间。
+    """
+    loop = asyncio.get_running_loop()
+    deadline = request_deadline(symbols, timeout)
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(executor, fetch_price_batch, symbols, timeout),
+            timeout=deadline
+        )
+    except asyncio.TimeoutError:
+        print(f" !! [网络错误] 批量请求超时 (>{deadline:.1f}s): {len(symbols)} 个符号")
+        return {}
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+import itertools
+from collections import OrderedDict, namedtuple
+import numpy as np
+from sortedcontainers import SortedDict
+
+"""
+core/order_book.py
+------------------
+L2 限价订单簿模拟器 (与 hft_sim 的逐笔价格模拟配合使用)。
+
+【知识点】
+1. SortedDict (sortedcontainers): 按价格排序的字典，插入 / 删除一个价位 O(log n)，
+   取最高买价 / 最低卖价 (两端) 是 O(1)。
+2. 价格用整数 tick 表示 (price / tick_size)，避免浮点数做字典键时 100.1 != 100.10000001 的问题。
+3. 价格-时间优先: 同一价位内用 OrderedDict 保存订单，先到先成交；按订单号撤单也是 O(1)。
+4. 撮合引擎: 新订单先与对手方最优价位逐档成交，限价单剩余部分挂入订单簿，市价单剩余部分作废。
+5. 观察者模式: 最优买卖价变化时通知订阅者，例如把中间价写入 Asset.update_price。
+"""
+
+BUY, SELL = "BUY", "SELL"
+
+# 成交记录：taker 为主动方订单号，maker 为被动方 (挂单) 订单号
+Trade = namedtuple("Trade", ["taker_id", "maker_id", "side", "price", "qty"])
+
+
+class _Order:
+    __slots__ = ("order_id", "side", "ticks", "qty")
+
+    def __init__(self, order_id, side, ticks, qty):
+        self.order_id = order_id
+        self.side = side
+        self.ticks = ticks
+        self.qty = qty
+
+
+class _Level:
+    """一个价位：按到达顺序保存订单，并维护该价位的总数量 (L2 深度)"""
+    __slots__ = ("orders", "volume")
+
+    def __init__(self):
+        self.orders = OrderedDict()  # order_id -> _Order
+        self.volume = 0
+
+
+class OrderBook:
+    """
+    限价订单簿 + 撮合引擎
+    """
+
+    def __init__(self, symbol="SIM", tick_size=0.01):
+        self.symbol = symbol
+        self.tick_size = tick_size
+        self.bids = SortedDict()  # ticks -> _Level (升序，最后一个是最高买价)
+        self.asks = SortedDict()  # ticks -> _Level (升序，第一个是最低卖价)
+        self._orders = {}         # order_id -> _Order
+        self._ids = itertools.count(1)
+        self._listeners = []
+        self._last_top = (None, None)
+        self.counters = {"limit": 0, "market": 0, "cancel": 0, "trades": 0, "volume": 0}
+
+    # -------------------------------
+    #  价格换算
+    # -------------------------------
+    def to_ticks(self, price):
+        return int(round(price / self.tick_size))
+
+    def to_price(self, ticks):
+        return round(ticks * self.tick_size, 10)
+
+    # -------------------------------
+    #  行情 (O(1))
+    # -------------------------------
+    def best_bid(self):
+        return self.to_price(self.bids.peekitem(-1)[0]) if self.bids else None
+
+    def best_ask(self):
+        return self.to_price(self.asks.peekitem(0)[0]) if self.asks else None
+
+    def mid_price(self):
+        if not self.bids or not self.asks:
+            return None
+        return self.to_price(self.bids.peekitem(-1)[0] + self.asks.peekitem(0)[0]) / 2
+
+    def spread(self):
+        if not self.bids or not self.asks:
+            return None
+        return self.to_price(self.asks.peekitem(0)[0] - self.bids.peekitem(-1)[0])
+
+    def depth(self, levels=5):
+        """L2 深度：返回 (买盘 [(价格, 数量)...], 卖盘 [(价格, 数量)...])，都从最优价开始"""
+        start = max(0, len(self.bids) - levels)
+        bids = [(self.to_price(t), self.bids[t].volume) for t in self.bids.islice(start=start, reverse=True)]
+        asks = [(self.to_price(t), self.asks[t].volume) for t in self.asks.islice(stop=levels)]
+        return bids, asks
+
+    def __len__(self):
+        """簿内挂单数量"""
+        return len(self._orders)
+
+    # -------------------------------
+    #  订阅中间价
+    # -------------------------------
+    def subscribe(self, callback):
+        """最优买卖价变化时调用 callback(book)"""
+        self._listeners.append(callback)
+
+    def publish_mid_to(self, asset):
+        """把中间价变化推送到 Asset.update_price"""
+        def on_top_change(book):
+            mid = book.mid_price()
+            if mid is not None:
+                asset.update_price(mid)
+        self.subscribe(on_top_change)
+
+    def _notify(self):
+        if not self._listeners:
+            return
+        top = (self.bids.peekitem(-1)[0] if self.bids else None,
+               self.asks.peekitem(0)[0] if self.asks else None)
+        if top != self._last_top:
+            self._last_top = top
+            for callback in self._listeners:
+                callback(self)
+
+    # -------------------------------
+    #  下单 / 撤单
+    # -------------------------------
+    def submit_limit(self, side, price, qty, order_id=None):
+        """
+        限价单：先按价格优先与对手盘成交，剩余部分挂单。
+        返回 (订单号, 成交列表)。
+        """
+        order_id = next(self._ids) if order_id is None else order_id
+        ticks = self.to_ticks(price)
+        self.counters["limit"] += 1
+        trades, remaining = self._match(order_id, side, qty, ticks)
+        if remaining > 0:
+            self._rest(_Order(order_id, side, ticks, remaining))
+        self._notify()
+        return order_id, trades
+
+    def submit_market(self, side, qty):
+        """市价单：吃掉对手盘直到数量满足或对手盘为空，剩余部分作废"""
+        order_id = next(self._ids)
+        self.counters["market"] += 1
+        trades, _ = self._match(order_id, side, qty, None)
+        self._notify()
+        return order_id, trades
+
+    def cancel(self, order_id):
+        """撤单，返回是否成功 (已成交或不存在时返回 False)"""
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return False
+        book = self.bids if order.side == BUY else self.asks
+        level = book[order.ticks]
+        del level.orders[order_id]
+        level.volume -= order.qty
+        if not level.orders:
+            del book[order.ticks]
+        self.counters["cancel"] += 1
+        self._notify()
+        return True
+
+    def _rest(self, order):
+        book = self.bids if order.side == BUY else self.asks
+        level = book.get(order.ticks)
+        if level is None:
+            level = book[order.ticks] = _Level()
+        level.orders[order.order_id] = order
+        level.volume += order.qty
+        self._orders[order.order_id] = order
+
+    def _match(self, taker_id, side, qty, limit_ticks):
+        """与对手盘撮合，返回 (成交列表, 剩余数量)。limit_ticks 为 None 表示市价单"""
+        trades = []
+        opposite = self.asks if side == BUY else self.bids
+        while qty > 0 and opposite:
+            best_ticks, level = opposite.peekitem(0) if side == BUY else opposite.peekitem(-1)
+            if limit_ticks is not None and (best_ticks > limit_ticks if side == BUY else best_ticks < limit_ticks):
+                break
+
+            price = self.to_price(best_ticks)
+            orders = level.orders
+            while qty > 0 and orders:
+                maker = next(iter(orders.values()))
+                fill = min(qty, maker.qty)
+                maker.qty -= fill
+                level.volume -= fill
+                qty -= fill
+                trades.append(Trade(taker_id, maker.order_id, side, price, fill))
+                if maker.qty == 0:
+                    orders.popitem(last=False)
+                    del self._orders[maker.order_id]
+            if not orders:
+                del opposite[best_ticks]
+
+        if trades:
+            self.counters["trades"] += len(trades)
+            self.counters["volume"] += sum(t.qty for t in trades)
+        return trades, qty
+
+
+class OrderFlowGenerator:
+    """
+    合成订单流：按比例随机产生限价单、市价单和撤单。
+    限价单价格围绕当前中间价，距离 (以 tick 计) 服从几何分布，越靠近盘口越密集。
+    随机数按块预先用 NumPy 生成。
+    """
+
+    def __init__(self, book, mid=100.0, limit_ratio=0.6, market_ratio=0.1, mean_offset=5,
+                 max_qty=100, seed=None, block=4096):
+        self.book = book
+        self.initial_mid = mid
+        self.limit_ratio = limit_ratio
+        self.market_ratio = market_ratio
+        self.mean_offset = mean_offset
+        self.max_qty = max_qty
+        self.block = block
+        self._rng = np.random.default_rng(seed)
+        self._live = []  # 可能仍在簿内的订单号 (撤单时随机挑一个)
+        self._buffer = iter(())
+
+    def _refill(self):
+        n = self.block
+        rng = self._rng
+        kinds = rng.random(n)
+        sides = rng.random(n) < 0.5
+        offsets = rng.geometric(1.0 / self.mean_offset, n) - 1
+        qtys = rng.integers(1, self.max_qty + 1, n)
+        picks = rng.random(n)
+        self._buffer = zip(kinds.tolist(), sides.tolist(), offsets.tolist(), qtys.tolist(), picks.tolist())
+
+    def step(self):
+        """产生并执行一个订单事件，返回成交列表"""
+        event = next(self._buffer, None)
+        if event is None:
+            self._refill()
+            event = next(self._buffer)
+        kind, is_buy, offset, qty, pick = event
+        book = self.book
+        side = BUY if is_buy else SELL
+
+        if kind < self.limit_ratio or not self._live:
+            mid = book.mid_price()
+            if mid is None:
+                mid = book.best_bid() or book.best_ask() or self.initial_mid
+            # 买单挂在中间价下方，卖单挂在上方 (offset 为 0 时可能直接成交)
+            ticks = book.to_ticks(mid) + (-offset if is_buy else offset)
+            order_id, trades = book.submit_limit(side, max(1, ticks) * book.tick_size, qty)
+            self._live.append(order_id)
+            return trades
+
+        if kind < self.limit_ratio + self.market_ratio:
+            return book.submit_market(side, qty)[1]
+
+        # 撤单：随机挑一个，O(1) 从列表中移除 (与末尾交换)
+        index = int(pick * len(self._live))
+        self._live[index], self._live[-1] = self._live[-1], self._live[index]
+        book.cancel(self._live.pop())
+        return []
+
+    def run(self, n):
+        """执行 n 个订单事件，返回成交笔数"""
+        count = 0
+        for _ in range(n):
+            count += len(self.step())
+        return count
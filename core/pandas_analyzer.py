@@ -2,6 +2,7 @@
 import pandas as pd
 import os
 from datetime import datetime
+from core.indicators import summarize
 
 """
 core/pandas_analyzer.py
@@ -10,15 +11,43 @@ core/pandas_analyzer.py
 使用 Pandas 进行结构化数据处理、清洗和 Excel 导出。
 """
 
-def export_financial_report(assets_list):
+def _indicator_frame(assets_list, ticks=None):
     """
-    接收资产对象列表，使用 Pandas 生成深度分析报告，并导出 Excel + CSV。
+    把逐笔历史上的技术指标 (RSI / MACD / 布林带 / ATR) 整理成 DataFrame，按 symbol 合并到报表。
+    优先使用多符号缓冲区 ticks (批量计算)，否则逐个读取资产自带的 tick_history。
+    """
+    symbols, columns = [], {}
+    if ticks is not None and len(ticks):
+        matrix = ticks.matrix("price")
+        if matrix.shape[1] > 1:
+            symbols = list(ticks.symbols)
+            columns = summarize(matrix)
+    else:
+        for asset in assets_list:
+            history = getattr(asset, "tick_history", None)
+            if history is not None and len(history) > 1:
+                symbols.append(asset.symbol)
+                for name, values in summarize(history.prices()).items():
+                    columns.setdefault(name, []).append(values[0])
+
+    if not symbols:
+        return None
+    return pd.DataFrame({"symbol": symbols, **columns})
+
+
+def export_financial_report(assets_list, ticks=None):
+    """
+    接收资产对象列表 (或列式存储 models.AssetStore)，使用 Pandas 生成深度分析报告，并导出 Excel + CSV。
+    ticks: 可选的 tick_buffer.MultiTickBuffer，有逐笔历史时报表会附带技术指标列。
     返回导出的 Excel 文件路径。
     """
     print("\n[Pandas] 正在初始化数据分析引擎...")
 
-    # --- 1. 数据准备：从对象转为字典列表 ---
-    data = [asset.to_dict() for asset in assets_list]
+    # --- 1. 数据准备：列式存储直接按列构建，对象列表则转为字典列表 ---
+    if hasattr(assets_list, "to_columns"):
+        data = assets_list.to_columns()
+    else:
+        data = [asset.to_dict() for asset in assets_list]
 
     # --- 2. 创建 DataFrame ---
     df = pd.DataFrame(data)
@@ -36,6 +65,11 @@ def export_financial_report(assets_list):
     df['market_value'] = df['price'] * df['holdings']
     df['tag'] = df['price'].apply(lambda x: '高价股' if x > 500 else '潜力股')
 
+    indicators = _indicator_frame(assets_list, ticks)
+    if indicators is not None:
+        df = df.merge(indicators, on='symbol', how='left')
+        print(f"[Pandas] 已附加技术指标: {', '.join(indicators.columns[1:])}")
+
     # --- 5. 数据聚合与排序 ---
     print("\n[Pandas] 按资产类型统计市值:")
     type_group = df.groupby('type')['market_value'].sum()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import re
+from datetime import datetime
+
+"""
+core/partitions.py
+------------------
+price_history 按月分区 (每个月一张表: price_history_202403)。
+
+【知识点】
+1. 分区 (Partitioning): 一张表无限增长时，索引越来越深，插入和扫描都会变慢；
+   按月拆表后，写入只碰当月的小表，过期数据整表 DROP，不需要逐行 DELETE。
+2. 分区裁剪 (Partition Pruning): 时间范围查询只访问与 [start, end] 有交集的月份表。
+3. 各分区时间范围互不重叠，所以按月份顺序依次读取就是全局的时间顺序。
+4. 正则表达式: 从表名中解析出月份，识别哪些表是分区。
+"""
+
+PREFIX = "price_history"
+_TABLE_PATTERN = re.compile(rf"^{PREFIX}_(\d{{4}})(\d{{2}})$")
+
+
+def month_start(moment):
+    """时间所在月份的第一天 0 点"""
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(month, n):
+    index = month.year * 12 + (month.month - 1) + n
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def table_name(month):
+    return f"{PREFIX}_{month:%Y%m}"
+
+
+def parse_table(name):
+    """表名 -> 月份 (不是分区表时返回 None)"""
+    match = _TABLE_PATTERN.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+def overlapping(months, start=None, end=None):
+    """与 [start, end] 有交集的月份 (保持原有顺序)"""
+    return [m for m in months
+            if (end is None or m <= end) and (start is None or add_months(m, 1) > start)]
+
+
+def create_table_sql(table, use_mysql=False):
+    if use_mysql:
+        return f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INT PRIMARY KEY AUTO_INCREMENT,
+            symbol VARCHAR(20),
+            price DOUBLE,
+            source VARCHAR(20),
+            recorded_at DATETIME(6),
+            INDEX idx_{table}_symbol_time (symbol, recorded_at)
+        )
+        """
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol VARCHAR(20),
+        price REAL,
+        source VARCHAR(20),
+        recorded_at DATETIME
+    )
+    """
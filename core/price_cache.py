@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import OrderedDict
+from core.config import SYSTEM_SETTINGS
+
+"""
+core/price_cache.py
+-------------------
+价格缓存层。
+GUI 扫描、main.run_omnidata_task 与调度器经常在几秒内重复查询同一批符号，
+缓存可以让这些重叠的请求只打一次外部 API。
+
+【知识点】
+1. TTL (Time To Live): 每条缓存记录都有过期时间，过期后必须重新请求。
+2. LRU (Least Recently Used): OrderedDict 记录访问顺序，容量满时淘汰最久未访问的记录。
+3. Single-Flight (请求合并): 同一符号已经有线程在请求时，其他线程不再重复请求，
+   而是等待那一次请求的结果 (threading.Event)。
+"""
+
+# 缓存有效期取刷新间隔的一半：周期性刷新总能拿到新价格，而重叠的扫描可以共享结果
+CACHE_TTL = SYSTEM_SETTINGS["refresh_interval"] / 2
+
+# 最多缓存的符号数量
+CACHE_MAXSIZE = 4096
+
+
+class _Flight:
+    """一次进行中的请求 (其他线程在 event 上等待结果)"""
+    __slots__ = ("event", "value")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+
+
+class PriceCache:
+    """
+    线程安全的 TTL + LRU 价格缓存，带请求合并
+    """
+
+    def __init__(self, ttl=CACHE_TTL, maxsize=CACHE_MAXSIZE, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = max(1, int(maxsize))
+        self._clock = clock
+        self._entries = OrderedDict()  # symbol -> (price, expires_at)
+        self._inflight = {}            # symbol -> _Flight
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    # -------------------------------
+    #  基础读写
+    # -------------------------------
+    def _lookup(self, symbol, now):
+        """在持有锁的情况下查找未过期的记录"""
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return None
+        price, expires_at = entry
+        if expires_at <= now:
+            del self._entries[symbol]
+            return None
+        self._entries.move_to_end(symbol)  # 标记为最近使用
+        return price
+
+    def _store(self, symbol, price, now):
+        """在持有锁的情况下写入记录，超出容量时淘汰最旧的"""
+        self._entries[symbol] = (price, now + self.ttl)
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def get(self, symbol):
+        """读取缓存，未命中或已过期返回 None"""
+        with self._lock:
+            price = self._lookup(symbol, self._clock())
+            self._counters["hits" if price is not None else "misses"] += 1
+            return price
+
+    def put(self, symbol, price):
+        with self._lock:
+            self._store(symbol, price, self._clock())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # -------------------------------
+    #  带请求合并的批量读取
+    # -------------------------------
+    def get_or_load_many(self, symbols, loader):
+        """
+        批量读取价格。
+        - 命中的符号直接返回；
+        - 其他线程正在请求的符号，等待那次请求的结果；
+        - 剩下的符号由当前线程调用 loader(symbols) -> {symbol: price} 一次性加载。
+        加载失败 (没有返回价格) 的符号不会被缓存，也不会出现在结果中。
+        """
+        result = {}
+        leading = {}    # 由本线程负责请求的符号
+        following = {}  # 等待其他线程结果的符号
+
+        with self._lock:
+            now = self._clock()
+            for symbol in dict.fromkeys(symbols):
+                price = self._lookup(symbol, now)
+                if price is not None:
+                    self._counters["hits"] += 1
+                    result[symbol] = price
+                elif symbol in self._inflight:
+                    self._counters["coalesced"] += 1
+                    following[symbol] = self._inflight[symbol]
+                else:
+                    self._counters["misses"] += 1
+                    leading[symbol] = self._inflight[symbol] = _Flight()
+
+        if leading:
+            loaded = {}
+            try:
+                loaded = loader(list(leading)) or {}
+            finally:
+                # 无论成功与否都要唤醒等待者，否则它们会永远阻塞
+                with self._lock:
+                    now = self._clock()
+                    for symbol, flight in leading.items():
+                        price = loaded.get(symbol)
+                        if price is not None:
+                            self._store(symbol, price, now)
+                        flight.value = price
+                        del self._inflight[symbol]
+                        flight.event.set()
+
+            for symbol in leading:
+                if loaded.get(symbol) is not None:
+                    result[symbol] = loaded[symbol]
+
+        for symbol, flight in following.items():
+            flight.event.wait()
+            if flight.value is not None:
+                result[symbol] = flight.value
+
+        return result
+
+    def get_or_load(self, symbol, loader):
+        """单个符号版本，loader(symbol) -> price 或 None"""
+        return self.get_or_load_many([symbol], lambda missing: {symbol: loader(symbol)}).get(symbol)
+
+    # -------------------------------
+    #  统计
+    # -------------------------------
+    def stats(self):
+        """返回命中/未命中/合并/淘汰次数以及当前大小，用于评估缓存容量"""
+        with self._lock:
+            result = dict(self._counters)
+            result["size"] = len(self._entries)
+            result["inflight"] = len(self._inflight)
+        lookups = result["hits"] + result["misses"] + result["coalesced"]
+        result["hit_rate"] = (result["hits"] + result["coalesced"]) / lookups if lookups else 0.0
+        return result
+
+
+# 全局价格缓存 (network 层的所有抓取都经过它)
+price_cache = PriceCache()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from core.config import RATE_LIMITS
+from utils.tools import TimingStat
+
+"""
+core/rate_limiter.py
+--------------------
+出站请求限流。
+每个外部数据源 (provider) 一个令牌桶，请求前先拿令牌，拿不到就等。
+
+【知识点 - 令牌桶 (Token Bucket)】
+1. 桶里最多存放 burst 个令牌，每秒补充 rate 个。
+2. 每发一次请求消耗 1 个令牌：桶满时允许短时间突发，长期速率不超过 rate。
+3. 预约式实现：令牌不够时先"赊账"(令牌数变为负数)，再按欠账计算需要睡多久。
+   这样多个线程会按先来后到依次醒来，不会同时惊醒后一起抢令牌。
+4. 收到 429 (Too Many Requests) 时调用 pause()，让所有线程一起退让。
+"""
+
+# 单次拿令牌最多愿意等待的时间 (秒)，超过就放弃本次请求
+DEFAULT_MAX_WAIT = 30.0
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶
+    """
+
+    def __init__(self, rate, burst, max_wait=DEFAULT_MAX_WAIT, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate 必须大于 0")
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.max_wait = max_wait
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.wait_time = TimingStat()
+        self.rejected = 0
+
+    def _refill(self, now):
+        """在持有锁的情况下按流逝的时间补充令牌"""
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def reserve(self, tokens=1, max_wait=None):
+        """
+        预约令牌，返回需要等待的秒数；等待时间超过 max_wait 时不预约，返回 None。
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        with self._lock:
+            self._refill(self._clock())
+            wait = max(0.0, (tokens - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                self.rejected += 1
+                return None
+            self._tokens -= tokens
+            return wait
+
+    def acquire(self, tokens=1, max_wait=None):
+        """
+        阻塞直到拿到令牌。返回 True 表示可以发请求，False 表示等待时间过长被拒绝。
+        """
+        wait = self.reserve(tokens, max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            self._sleep(wait)
+        self.wait_time.add(wait)
+        return True
+
+    def pause(self, seconds):
+        """
+        服务器要求退让 (429 + Retry-After) 时，清空令牌，让后续请求至少等待 seconds 秒。
+        """
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def stats(self):
+        with self._lock:
+            self._refill(self._clock())
+            tokens = self._tokens
+        result = {"rate": self.rate, "burst": self.burst, "tokens": tokens, "rejected": self.rejected}
+        result["wait"] = self.wait_time.snapshot()
+        return result
+
+
+# 每个 provider 一个令牌桶
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider):
+    """
+    获取某个数据源的令牌桶，首次使用时按 config.RATE_LIMITS 创建。
+    未配置的数据源返回 None (不限流)。
+    """
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(provider)
+            if limiter is None and provider in RATE_LIMITS:
+                limiter = _limiters[provider] = TokenBucket(**RATE_LIMITS[provider])
+    return limiter
+
+
+def set_rate_limit(provider, rate, burst, max_wait=DEFAULT_MAX_WAIT):
+    """运行时调整 (或新增) 某个数据源的限流参数"""
+    with _limiters_lock:
+        _limiters[provider] = TokenBucket(rate, burst, max_wait)
+        return _limiters[provider]
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import math
+from array import array
+from collections import deque
+
+"""
+core/rolling.py
+---------------
+增量滑动窗口统计。
+每次 append 只做常数次运算，就能随时读出窗口内的均值、方差、最小/最大值和 EMA，
+不再需要每次都遍历整个窗口 (statistics.mean 每次调用都是 O(N)，而且很慢)。
+
+【知识点】
+1. 滑动求和: 新价格进来、旧价格出去，sum += new - old。
+2. Welford 算法 (滑动版): 增量维护均值和离差平方和 M2，比 "平方和 - 和的平方" 数值更稳定。
+   长时间运行仍会累积浮点误差，所以每隔 RECALIBRATE_EVERY 次更新按窗口重新精确计算一次。
+3. 单调队列 (Monotonic Deque): 维护一个递减 (或递增) 的候选队列，队头永远是窗口最大 (最小) 值，
+   每个元素最多进出队列各一次，均摊 O(1)。队列在第一次读取 min/max 时才创建，不用的资产不占内存。
+4. EMA (指数移动平均): ema += alpha * (price - ema)，alpha = 2 / (span + 1)。
+5. 内存: 每个资产都带一个窗口对象，所以窗口用 __slots__ + 定长环形缓冲区实现，
+   不用 deque (一个 deque 无论多短都要预先分配约 600 字节的块)。
+6. CompactWindow: 用 array('d') 做环形缓冲区，价格以原始 8 字节 double 存放，
+   不再为每个价格创建 float 对象；代价是 min/max 需要扫描窗口 (窗口很小时可以忽略)。
+"""
+
+# 每隔多少次更新重新精确计算一次均值和方差，消除累积误差
+RECALIBRATE_EVERY = 1000
+
+
+class _RingWindow:
+    """
+    环形缓冲区 + 均值 / 方差 / EMA 的公共部分。
+    对外表现得像 deque(maxlen=N)：支持 append / len / 迭代 / 下标，旧代码可以直接使用。
+    子类通过 _new_buffer() 决定价格的存储方式，并负责计算 min/max。
+    """
+    __slots__ = ("maxlen", "alpha", "_buffer", "_pos", "_count", "_seq", "_mean", "_m2", "ema")
+
+    def __init__(self, maxlen, ema_span=None):
+        self.maxlen = max(1, int(maxlen))
+        self.alpha = 2.0 / ((ema_span or self.maxlen) + 1)
+        self._buffer = self._new_buffer(self.maxlen)
+        self._pos = 0     # 下一次写入的位置
+        self._count = 0   # 窗口中现有的价格数
+        self._seq = 0     # 已经 append 的总次数
+        self._mean = 0.0
+        self._m2 = 0.0    # 离差平方和
+        self.ema = None
+
+    @staticmethod
+    def _new_buffer(size):
+        return [0.0] * size
+
+    # -------------------------------
+    #  deque 兼容接口
+    # -------------------------------
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """按时间顺序 (从旧到新) 遍历"""
+        start = (self._pos - self._count) % self.maxlen
+        for i in range(self._count):
+            yield self._buffer[(start + i) % self.maxlen]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("window index out of range")
+        return self._buffer[(self._pos - self._count + index) % self.maxlen]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)}, maxlen={self.maxlen})"
+
+    def append(self, value):
+        n = self._count
+        pos = self._pos
+
+        # 1. 均值与方差 (Welford)
+        if n == self.maxlen:
+            old = self._buffer[pos]
+            old_mean = self._mean
+            self._mean += (value - old) / n
+            self._m2 += (value - old) * (value - self._mean + old - old_mean)
+        else:
+            self._count = n + 1
+            delta = value - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (value - self._mean)
+
+        # 2. 写入环形缓冲区
+        self._buffer[pos] = value
+        self._pos = pos + 1 if pos + 1 < self.maxlen else 0
+
+        # 3. EMA (覆盖全部历史，而不仅仅是窗口内)
+        ema = self.ema
+        self.ema = value if ema is None else ema + self.alpha * (value - ema)
+
+        self._seq += 1
+        if self._seq % RECALIBRATE_EVERY == 0:
+            self._recalibrate()
+
+    def _recalibrate(self):
+        """按窗口内容重新精确计算均值和 M2"""
+        values = list(self)
+        self._mean = math.fsum(values) / len(values)
+        self._m2 = math.fsum((v - self._mean) ** 2 for v in values)
+
+    # -------------------------------
+    #  统计量 (全部 O(1))
+    # -------------------------------
+    @property
+    def mean(self):
+        return self._mean if self._count else 0.0
+
+    @property
+    def variance(self):
+        """样本方差 (与 statistics.variance 一致)，不足 2 个数据时为 0"""
+        n = self._count
+        return max(0.0, self._m2 / (n - 1)) if n > 1 else 0.0
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+
+class RollingWindow(_RingWindow):
+    """
+    带增量统计的滑动窗口 (默认实现)，min/max 由单调队列维护。
+    """
+    __slots__ = ("_max_q", "_min_q")
+
+    def __init__(self, maxlen, ema_span=None):
+        super().__init__(maxlen, ema_span)
+        self._max_q = None  # (位置, 价格)，价格单调递减
+        self._min_q = None  # (位置, 价格)，价格单调递增
+
+    def append(self, value):
+        super().append(value)
+        if self._max_q is not None:
+            self._track_extremes(self._seq - 1, value)
+
+    # -------------------------------
+    #  单调队列
+    # -------------------------------
+    def _track_extremes(self, seq, value):
+        """先丢掉被新价格"压住"的候选，再丢掉已经滑出窗口的队头"""
+        max_q, min_q = self._max_q, self._min_q
+        while max_q and max_q[-1][1] <= value:
+            max_q.pop()
+        max_q.append((seq, value))
+        while min_q and min_q[-1][1] >= value:
+            min_q.pop()
+        min_q.append((seq, value))
+        oldest = seq - self.maxlen
+        if max_q[0][0] <= oldest:
+            max_q.popleft()
+        if min_q[0][0] <= oldest:
+            min_q.popleft()
+
+    def _ensure_extremes(self):
+        """第一次读取 min/max 时，用当前窗口建立单调队列"""
+        if self._max_q is None:
+            self._max_q, self._min_q = deque(), deque()
+            first = self._seq - self._count
+            for offset, value in enumerate(self):
+                self._track_extremes(first + offset, value)
+
+    @property
+    def min(self):
+        if not self._count:
+            return 0.0
+        self._ensure_extremes()
+        return self._min_q[0][1]
+
+    @property
+    def max(self):
+        if not self._count:
+            return 0.0
+        self._ensure_extremes()
+        return self._max_q[0][1]
+
+
+class CompactWindow(_RingWindow):
+    """
+    省内存的滑动窗口：价格存放在定长 array('d') 环形缓冲区中。
+    接口与 RollingWindow 相同。
+    """
+    __slots__ = ()
+
+    @staticmethod
+    def _new_buffer(size):
+        return array("d", bytes(8 * size))
+
+    @property
+    def min(self):
+        return min(self) if self._count else 0.0
+
+    @property
+    def max(self):
+        return max(self) if self._count else 0.0
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+"""
+core/rollups.py
+---------------
+价格历史的 OHLC 汇总 (1 分钟 / 1 小时 / 1 天)。
+DatabaseManager 每次批量写入 price_history 时，在同一个事务里增量更新这几张汇总表，
+图表和分析直接读汇总表，几个月的数据只需要读几千行而不是几百万行。
+
+【知识点】
+1. 分桶 (Bucketing): 时间向下取整到桶的起点，例如 10:37:25 -> 1 分钟桶 10:37:00，1 小时桶 10:00:00。
+2. OHLC 可合并: 两段数据的汇总可以再合并 (open 取更早的、close 取更晚的、high/low 取极值、count 相加)，
+   所以 1 小时桶可以由 1 分钟桶合并得到，新一批数据也可以直接合并进数据库里已有的桶 (UPSERT)。
+3. UPSERT: SQLite 用 INSERT ... ON CONFLICT DO UPDATE，MySQL 用 INSERT ... ON DUPLICATE KEY UPDATE。
+   注意 MySQL 的 SET 从左到右执行，后面的表达式看到的是已经更新过的列，所以 open/close 要写在 open_at/close_at 前面。
+4. 每个桶额外保存 open_at / close_at (第一笔和最后一笔的时间)，数据乱序到达时 open/close 仍然正确。
+"""
+
+# (名称, 桶长度秒数)，从细到粗
+ROLLUPS = (("1m", 60), ("1h", 3600), ("1d", 86400))
+
+# 分桶的时间原点 (本地时间，不带时区，与 recorded_at 一致)
+EPOCH = datetime(1970, 1, 1)
+
+# 汇总记录的字段顺序
+OPEN, HIGH, LOW, CLOSE, COUNT, OPEN_AT, CLOSE_AT = range(7)
+
+
+def table_name(name):
+    return f"price_rollup_{name}"
+
+
+def parse_resolution(resolution):
+    """'5m' / '4h' / '1d' / '30s' 或秒数 -> 秒数"""
+    if isinstance(resolution, (int, float)):
+        seconds = int(resolution)
+    else:
+        units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+        text = str(resolution).strip().lower()
+        if not text or text[-1] not in units:
+            raise ValueError(f"无法识别的时间粒度: {resolution!r}")
+        seconds = int(text[:-1] or 1) * units[text[-1]]
+    if seconds <= 0:
+        raise ValueError(f"时间粒度必须大于 0: {resolution!r}")
+    return seconds
+
+
+def pick_rollup(seconds):
+    """能满足粒度的最粗汇总表：桶长度不超过 seconds 且能整除它；没有时返回 None (需要读原始数据)"""
+    best = None
+    for name, size in ROLLUPS:
+        if size <= seconds and seconds % size == 0:
+            best = (name, size)
+    return best
+
+
+def as_datetime(value):
+    """recorded_at 可能是 datetime (写入时 / MySQL) 或字符串 (SQLite 读出时)"""
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def bucket_start(moment, seconds):
+    """时间向下取整到桶的起点"""
+    offset = (moment - EPOCH) // timedelta(seconds=seconds)
+    return EPOCH + timedelta(seconds=offset * seconds)
+
+
+def merge(buckets, key, record):
+    """把一条汇总记录合并进 buckets[key]"""
+    current = buckets.get(key)
+    if current is None:
+        buckets[key] = list(record)
+        return
+    if record[OPEN_AT] < current[OPEN_AT]:
+        current[OPEN], current[OPEN_AT] = record[OPEN], record[OPEN_AT]
+    if record[CLOSE_AT] >= current[CLOSE_AT]:
+        current[CLOSE], current[CLOSE_AT] = record[CLOSE], record[CLOSE_AT]
+    if record[HIGH] > current[HIGH]:
+        current[HIGH] = record[HIGH]
+    if record[LOW] < current[LOW]:
+        current[LOW] = record[LOW]
+    current[COUNT] += record[COUNT]
+
+
+def aggregate_rows(rows, seconds):
+    """
+    原始记录 [(symbol, price, source, recorded_at), ...] -> {(symbol, 桶起点): 汇总记录}
+    """
+    buckets = {}
+    for symbol, price, _, recorded_at in rows:
+        moment = as_datetime(recorded_at)
+        merge(buckets, (symbol, bucket_start(moment, seconds)),
+              (price, price, price, price, 1, moment, moment))
+    return buckets
+
+
+def coarsen(buckets, seconds):
+    """把细粒度的汇总合并成粗粒度 (例如 1m -> 1h)"""
+    coarse = {}
+    for (symbol, start), record in buckets.items():
+        merge(coarse, (symbol, bucket_start(start, seconds)), record)
+    return coarse
+
+
+def aggregate_all(rows):
+    """一批原始记录 -> {汇总名称: {(symbol, 桶起点): 汇总记录}}，粗粒度由细粒度逐级合并"""
+    result = {}
+    buckets = None
+    for name, size in ROLLUPS:
+        buckets = aggregate_rows(rows, size) if buckets is None else coarsen(buckets, size)
+        result[name] = buckets
+    return result
+
+
+def create_table_sql(name, use_mysql=False):
+    price_type = "DOUBLE" if use_mysql else "REAL"
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table_name(name)} (
+        symbol VARCHAR(20) NOT NULL,
+        bucket DATETIME NOT NULL,
+        open {price_type},
+        high {price_type},
+        low {price_type},
+        close {price_type},
+        count INTEGER,
+        open_at DATETIME(6),
+        close_at DATETIME(6),
+        PRIMARY KEY (symbol, bucket)
+    )
+    """
+
+
+def upsert_sql(name, use_mysql=False):
+    table = table_name(name)
+    columns = "symbol, bucket, open, high, low, close, count, open_at, close_at"
+    if use_mysql:
+        return (f"INSERT INTO {table} ({columns}) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE "
+                "open = IF(VALUES(open_at) < open_at, VALUES(open), open), "
+                "close = IF(VALUES(close_at) >= close_at, VALUES(close), close), "
+                "open_at = LEAST(open_at, VALUES(open_at)), "
+                "close_at = GREATEST(close_at, VALUES(close_at)), "
+                "high = GREATEST(high, VALUES(high)), "
+                "low = LEAST(low, VALUES(low)), "
+                "count = count + VALUES(count)")
+    return (f"INSERT INTO {table} ({columns}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(symbol, bucket) DO UPDATE SET "
+            "open = CASE WHEN excluded.open_at < open_at THEN excluded.open ELSE open END, "
+            "close = CASE WHEN excluded.close_at >= close_at THEN excluded.close ELSE close END, "
+            "open_at = MIN(open_at, excluded.open_at), "
+            "close_at = MAX(close_at, excluded.close_at), "
+            "high = MAX(high, excluded.high), "
+            "low = MIN(low, excluded.low), "
+            "count = count + excluded.count")
+
+
+def upsert_params(buckets):
+    return [(symbol, start, *record) for (symbol, start), record in buckets.items()]
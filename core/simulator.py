@@ -2,6 +2,7 @@
 import random
 import time
 from core.config import TARGET_ASSETS
+from core.backtest import DEFAULT_STRATEGY
 # 导入刚才写的装饰器
 from utils.tools import performance_timer
 
@@ -54,13 +55,8 @@ def stream_market_data():
         if asset == "ERROR_TEST":
             x = 1 / 0
 
-        # 简单的策略逻辑
-        if price < 120:
-            action = "BUY"
-        elif price > 180:
-            action = "SELL"
-        else:
-            action = "HOLD"
+        # 简单的策略逻辑 (与回测引擎 core.backtest 共用同一个阈值策略)
+        action = DEFAULT_STRATEGY.action(price)
 
         # yield 将数据“产出”给调用者
         yield {
@@ -1,79 +1,501 @@
 # -*- coding: utf-8 -*-
 import json
 import os
+import re
+import threading
+import zlib
 from core.models import Stock, Crypto
-from core.security import verify_file_integrity, save_file_signature
+from core.security import verify_file_integrity, AtomicSignedWriter
 
 """
 core/storage.py
 ---------------
 数据持久化层。
 负责将内存中的对象保存到硬盘文件 (JSON)。
+
+存储由两部分组成:
+    market_data.json     基础文件 (完整的资产列表，带签名 market_data.sig)
+    market_data.journal  追加日志 (每行一条变更: 某个资产的新内容，或删除某个资产)
+每次保存只把有变化的资产追加到日志末尾；日志变长后在后台线程里合并成新的基础文件 (压缩)。
+读取时先读基础文件，再按顺序重放日志。
+
+【知识点】
+1. 追加日志 (Append-only Journal): 改一个价格只写一行，保存的开销与变化的条数成正比，
+   而不是每次都重写 (并重新哈希) 整个文件。
+2. 滚动校验和 (Rolling Checksum): 每行开头是 CRC32，计算时以上一行的 CRC 作为初始值，
+   任何一行被修改、删除或调换顺序，后面所有行都会校验失败。
+   崩溃时最后一行可能只写了一半 (没有换行符)，读取时丢弃，下次写入前截掉。
+3. 后台压缩 (Compaction): 先把当前日志改名为 .compacting，新的变更写入新日志，
+   再在后台把内存中的快照写成新的基础文件。重放是幂等的 (每条记录都是 "某资产的最终内容")，
+   所以在压缩的任何阶段崩溃，重放 基础文件 + .compacting + 日志 都能得到正确结果。
+   基础文件和签名由 AtomicSignedWriter 一次写成 (边写边哈希，fsync 后原子替换)，
+   .compacting 只在两者都落盘之后才删除。
+4. 流式读取 (Streaming Parse): 基础文件按 1 MB 分块读入，用 JSONDecoder.raw_decode 逐个解析数组元素，
+   生成器每解析出一个资产就 yield，内存占用与文件大小无关，第一个资产几乎立即可用。
+   日志 (通常很小) 先读进内存，基础文件流过时就地套用；按类型 / 代码过滤也在这一步完成，
+   不需要的资产不会被保留，也不会被构造成对象。
 """
 
 DATA_DIR = os.path.join(os.getcwd(), "data")
 DATA_FILE = os.path.join(DATA_DIR, "market_data.json")
 SIG_FILE = os.path.join(DATA_DIR, "market_data.sig")  # 签名文件
+JOURNAL_FILE = os.path.join(DATA_DIR, "market_data.journal")  # 追加日志
+
+# 日志记录数超过 max(COMPACT_MIN_RECORDS, 资产数 * COMPACT_RATIO) 时触发后台压缩
+COMPACT_MIN_RECORDS = 1000
+COMPACT_RATIO = 1.0
+
+# 流式读取时每次读入的字符数
+READ_CHUNK = 1 << 20
+# 写基础文件时每批序列化的资产数
+DUMP_BATCH = 2000
+
+_SKIP = re.compile(r"[\s,]*")  # 数组元素之间的空白和逗号
+
+
+def asset_key(item):
+    """日志里用 (类型, 代码) 标识一个资产"""
+    return item.get("type"), item["symbol"]
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK):
+    """
+    从文本文件对象中逐个解析 JSON 数组的元素 (生成器)。
+    每次只在内存中保留一块数据；元素跨块时把剩余部分与下一块拼接后重新解析。
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size)
+    while buf.isspace():
+        more = f.read(chunk_size)
+        if not more:
+            break
+        buf += more
+    buf = buf.lstrip()
+    if buf[:1] != "[":
+        raise ValueError("数据文件不是 JSON 数组")
+    pos = 1
+    eof = False
+    slow_until = 0
+    while True:
+        pos = _SKIP.match(buf, pos).end()
+        if pos < len(buf):
+            if buf[pos] == "]":
+                return
+            # 快速路径: 把到最后一个 '}' 为止的部分当作一个数组整体交给 C 解析器。
+            # 能解析成功说明这个 '}' 正好是某个元素的结尾；失败 (例如 '}' 在字符串里) 时这一段逐个解析
+            cut = buf.rfind("}", pos) + 1
+            if cut > pos and pos >= slow_until:
+                try:
+                    items = json.loads("[" + buf[pos:cut] + "]")
+                except ValueError:
+                    slow_until = cut
+                else:
+                    yield from items
+                    pos = cut
+                    continue
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # 恰好在块末尾结束的元素 (例如数字) 可能还没读完，读入下一块再确认
+                if end < len(buf) or eof:
+                    yield item
+                    pos = end
+                    continue
+            except ValueError:
+                if eof:
+                    raise
+        if eof:
+            raise ValueError("数据文件不完整: 缺少 ']'")
+        more = f.read(chunk_size)
+        eof = not more
+        buf = buf[pos:] + more
+        slow_until = max(slow_until - pos, 0)
+        pos = 0
+
+
+def dump_json_array(items, f, batch=DUMP_BATCH):
+    """
+    输出与 json.dump(items, f, indent=4, ensure_ascii=False) 完全相同，但按批用 json.dumps 序列化:
+    带缩进时 json.dump 会把每个逗号、引号分别 write 一次，而 dumps 在内部拼接好，
+    每批只 write 一次，也不需要把整个文件放进内存。
+    """
+    if not items:
+        f.write("[]")
+        return
+    f.write("[")
+    for start in range(0, len(items), batch):
+        if start:
+            f.write(",")
+        # "[\n    {...},\n    {...}\n]" 去掉首尾的 "[" 和 "\n]"，拼起来就是完整数组的中间部分
+        f.write(json.dumps(items[start:start + batch], indent=4, ensure_ascii=False)[1:-2])
+    f.write("\n]")
+
+
+def _matcher(types, symbols):
+    """把类型 / 代码过滤条件转换成判断函数 (None 表示不过滤)"""
+    if isinstance(types, str):
+        types = [types]
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    types = None if types is None else set(types)
+    symbols = None if symbols is None else set(symbols)
+    if types is None and symbols is None:
+        return None
+    return lambda item: ((types is None or item.get("type") in types)
+                         and (symbols is None or item.get("symbol") in symbols))
+
+
+class JournalError(Exception):
+    """日志校验失败 (中间某行被篡改或损坏)"""
+
+
+class AssetJournal:
+    """
+    基础文件 + 追加日志
+    """
+
+    def __init__(self, data_file=DATA_FILE, sig_file=None, journal_file=None):
+        stem = os.path.splitext(data_file)[0]
+        self.data_file = data_file
+        self.sig_file = sig_file or stem + ".sig"
+        self.journal_file = journal_file or stem + ".journal"
+        self.compacting_file = self.journal_file + ".compacting"
+        self._lock = threading.RLock()  # 可重入: save() 持有锁时会直接调用 _rewrite
+        self._state = None      # 最近一次保存 / 读取的内容: {asset_key: dict}
+        self._items = []        # 最近一次保存时传入的列表 (顺序不变时直接逐个比较)
+        self._file = None       # 以追加模式打开的日志
+        self._crc = 0           # 日志最后一行的 CRC (下一行的初始值)
+        self._records = 0       # 当前日志的记录数
+        self._pending = False   # 有上次没合并完的 .compacting，下次保存时继续压缩
+        self._compactor = None  # 后台压缩线程
+
+    # -------------------------------
+    #  读取 / 重放
+    # -------------------------------
+    @staticmethod
+    def _read_journal(path):
+        """
+        读取一个日志文件，返回 (记录列表, 最后一行的 CRC, 完整记录的字节数)。
+        末尾不完整的行被忽略；中间某行校验失败抛 JournalError。
+        """
+        records, crc, good = [], 0, 0
+        if not os.path.exists(path):
+            return records, crc, good
+        with open(path, "rb") as f:
+            lines = f.readlines()
+        for number, line in enumerate(lines, 1):
+            last = number == len(lines)
+            if not line.endswith(b"\n"):
+                break  # 写到一半崩溃
+            head, _, payload = line.rstrip(b"\n").partition(b" ")
+            expected = zlib.crc32(payload, crc)
+            if head != b"%08x" % expected:
+                if last:
+                    break
+                raise JournalError(f"{os.path.basename(path)} 第 {number} 行校验失败")
+            records.append(json.loads(payload))
+            crc = expected
+            good += len(line)
+        return records, crc, good
+
+    def load_records(self, verify=True):
+        """
+        读取基础文件并重放日志，返回资产字典列表。
+        verify=True 时先校验基础文件签名，失败返回 None；日志损坏抛 JournalError。
+        """
+        if not os.path.exists(self.data_file):
+            return []
+        if verify and not verify_file_integrity(self.data_file, self.sig_file):
+            return None
+        return list(self.iter_records())
+
+    def iter_records(self, types=None, symbols=None):
+        """
+        流式读取 基础文件 + 日志 (生成器)，结果和顺序与 load_records 相同，不校验签名。
+        types / symbols: 只返回这些类型 / 代码的资产 (字符串或集合，None 表示全部)。
+        日志先全部读入 (损坏时立即抛 JournalError)，基础文件边解析边套用日志。
+        """
+        # 重放日志得到 "覆盖表": pending 是新内容 (按字典的插入顺序)，deleted 是日志里删除过的 key。
+        # 删除后又重新添加的资产和新资产一样排在最后，与 load_records 的字典语义一致
+        pending, deleted = {}, set()
+        # 上次压缩没有完成时 .compacting 还在，先重放它 (幂等，即使已合并进基础文件也不影响结果)
+        for path in (self.compacting_file, self.journal_file):
+            for record in self._read_journal(path)[0]:
+                if record["op"] == "put":
+                    pending[asset_key(record["asset"])] = record["asset"]
+                else:
+                    key = tuple(record["key"])
+                    pending.pop(key, None)
+                    deleted.add(key)
+        wanted = _matcher(types, symbols)
+        return self._stream(pending, deleted, wanted)
+
+    def _stream(self, pending, deleted, wanted):
+        if os.path.exists(self.data_file):
+            with open(self.data_file, "r", encoding="utf-8") as f:
+                for item in iter_json_array(f):
+                    key = asset_key(item)
+                    if key in deleted:
+                        continue
+                    item = pending.pop(key, item)
+                    if wanted is None or wanted(item):
+                        yield item
+        for item in pending.values():
+            if wanted is None or wanted(item):
+                yield item
+
+    # -------------------------------
+    #  保存
+    # -------------------------------
+    def _open_journal(self):
+        """打开日志准备追加 (截掉崩溃留下的半行)"""
+        records, self._crc, good = self._read_journal(self.journal_file)
+        self._records = len(records)
+        self._file = open(self.journal_file, "ab")
+        if self._file.tell() != good:
+            self._file.truncate(good)
+
+    def _close_journal(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def save(self, items):
+        """
+        保存资产字典列表：与上次的内容比较，只把新增 / 变化 / 删除的资产写进日志。
+        返回写入的日志记录数 (重写基础文件时返回 None)。
+        字典会被保存下来用于下次比较，保存后不要原地修改 (save_data 每次都重新调用 to_dict)。
+        """
+        with self._lock:
+            if self._state is None:
+                # 本进程第一次保存: 基础文件不存在或校验失败时直接重写，否则以磁盘上的内容为基准
+                state = None
+                if os.path.exists(self.data_file) and verify_file_integrity(self.data_file, self.sig_file):
+                    try:
+                        state = {asset_key(item): item for item in self.load_records(verify=False)}
+                    except (JournalError, ValueError) as e:
+                        print(f" !! [存储] 日志损坏，将重写数据文件: {e}")
+                if state is None:
+                    self._state = {asset_key(item): item for item in items}
+                    self._items = list(self._state.values())
+                    self._rewrite(self._items, discard_journals=True)
+                    return None
+                self._state = state
+                self._items = list(state.values())
+                self._pending = os.path.exists(self.compacting_file)
+                self._open_journal()
+
+            items = list(items)
+            changes = self._diff(items)
+            lines = []
+            crc = self._crc
+            for op, value in changes:
+                record = {"op": "put", "asset": value} if op == "put" else {"op": "del", "key": list(value)}
+                crc, line = self._encode(record, crc)
+                lines.append(line)
+            if lines:
+                if self._file is None:
+                    self._open_journal()  # 上次重写基础文件失败，日志还没有重新打开
+                self._file.write(b"".join(lines))  # 一次写入，崩溃时最多留下半行
+                self._file.flush()
+                self._crc = crc
+                self._records += len(lines)
+            self._items = items
+
+            if self._pending or self._records > max(COMPACT_MIN_RECORDS, COMPACT_RATIO * len(self._state)):
+                self._start_compaction()
+            return len(lines)
+
+    def _diff(self, items):
+        """
+        与上次保存的内容比较，更新 self._state，返回 [("put", 资产字典) / ("del", key), ...]。
+        资产列表的顺序和长度没变时逐个比较 (常见情况)，否则按 key 全量比较。
+        """
+        previous = self._items
+        if len(previous) == len(items) and len(items) == len(self._state):
+            changed = []
+            for old, new in zip(previous, items):
+                if old != new:
+                    if asset_key(old) != asset_key(new):
+                        break
+                    changed.append(new)
+            else:
+                for item in changed:
+                    self._state[asset_key(item)] = item
+                return [("put", item) for item in changed]
+
+        current = {}
+        changes = []
+        for item in items:
+            key = asset_key(item)
+            current[key] = item
+            if self._state.get(key) != item:
+                changes.append(("put", item))
+        changes += [("del", key) for key in self._state.keys() - current.keys()]
+        self._state = current
+        return changes
+
+    @staticmethod
+    def _encode(record, crc):
+        payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        crc = zlib.crc32(payload, crc)
+        return crc, b"%08x %s\n" % (crc, payload)
+
+    # -------------------------------
+    #  压缩
+    # -------------------------------
+    def _start_compaction(self):
+        """(持有锁时调用) 轮换日志并启动后台线程写新的基础文件"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._close_journal()
+        # 上次压缩失败留下的 .compacting 还没合并时不轮换，当前日志继续保留，本次快照同样包含它的内容
+        rotated = not os.path.exists(self.compacting_file)
+        if rotated and os.path.exists(self.journal_file):
+            os.replace(self.journal_file, self.compacting_file)
+        self._open_journal()
+        self._pending = False
+        snapshot = list(self._state.values())
+        self._compactor = threading.Thread(target=self._rewrite, args=(snapshot,), name="journal-compactor")
+        self._compactor.start()
+
+    def _rewrite(self, snapshot, discard_journals=False):
+        """
+        把快照写成新的基础文件和签名 (边写边哈希，临时文件 + fsync + 原子替换)，然后删除已合并的日志。
+        discard_journals=True 时旧日志与新快照无关，必须在替换基础文件之前删除，
+        否则在两步之间崩溃会把过时的记录重放到新快照上。
+        """
+        try:
+            os.makedirs(os.path.dirname(self.data_file) or ".", exist_ok=True)
+            if discard_journals:
+                for path in (self.compacting_file, self.journal_file):
+                    if os.path.exists(path):
+                        os.remove(path)
+            with AtomicSignedWriter(self.data_file, self.sig_file) as f:
+                dump_json_array(snapshot, f)
+            # 新的基础文件和签名都已落盘，.compacting 里的记录已包含在快照中
+            if os.path.exists(self.compacting_file):
+                os.remove(self.compacting_file)
+            if discard_journals:
+                self._open_journal()
+            print(f" [存储] 数据文件已重写 ({len(snapshot)} 条)")
+        except (IOError, OSError) as e:
+            # 后台线程与 save() 共用这个标志，必须持有同一把锁
+            with self._lock:
+                self._pending = True  # 下次保存时重试
+            print(f" !! [错误] 无法写入文件: {e}")
+
+    def compact(self, wait=True):
+        """立即把日志合并进基础文件 (wait=True 时等待完成)"""
+        with self._lock:
+            if self._state is None:
+                return
+            self._start_compaction()
+            compactor = self._compactor
+        if wait:
+            compactor.join()
+
+    def wait(self):
+        """等待后台压缩结束"""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def close(self):
+        self.wait()
+        with self._lock:
+            self._close_journal()
+
+
+_journal = None
+
+
+def get_journal():
+    """与当前 DATA_FILE / SIG_FILE / JOURNAL_FILE 对应的全局日志对象"""
+    global _journal
+    paths = (DATA_FILE, SIG_FILE, JOURNAL_FILE)
+    if _journal is None or (_journal.data_file, _journal.sig_file, _journal.journal_file) != paths:
+        _journal = AssetJournal(*paths)
+    return _journal
 
 
 def save_data(assets_list):
     """
-    将资产对象列表保存到 JSON 文件，并生成签名。
+    保存资产对象列表：只把变化的资产追加到日志 (首次保存时写入完整的 JSON 文件并生成签名)。
     """
     # 自动创建 data 文件夹
     os.makedirs(DATA_DIR, exist_ok=True)
 
-    print(f" [存储] 正在保存数据到 {DATA_FILE} ...")
-
-    # 序列化
-    data_to_save = [asset.to_dict() for asset in assets_list]
+    # 序列化 (列式存储 AssetStore 可以一次性导出)
+    if hasattr(assets_list, "to_dicts"):
+        data_to_save = assets_list.to_dicts()
+    else:
+        data_to_save = [asset.to_dict() for asset in assets_list]
 
     try:
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data_to_save, f, indent=4, ensure_ascii=False)
-            print(" [存储] 保存成功！")
-
-        # 生成并保存文件签名 (哈希值)
-        save_file_signature(DATA_FILE, SIG_FILE)
-
+        changed = get_journal().save(data_to_save)
+        if changed is None:
+            print(f" [存储] 已保存到 {DATA_FILE}")
+        else:
+            print(f" [存储] 保存成功！({changed} 条变更写入日志)")
     except IOError as e:
         print(f" !! [错误] 无法写入文件: {e}")
 
 
-def load_data():
+def load_records(verify=True):
+    """读取资产字典列表 (基础文件 + 日志重放)。校验失败返回 None"""
+    return get_journal().load_records(verify)
+
+
+def iter_records(types=None, symbols=None):
+    """流式读取资产字典 (生成器，不校验签名)，可按类型 / 代码过滤"""
+    return get_journal().iter_records(types, symbols)
+
+
+def make_asset(item):
+    """把资产字典恢复为对象 (未知类型返回 None)"""
+    if item['type'] == 'Stock':
+        return Stock(item['symbol'], item['price'], item.get('exchange'))
+    if item['type'] == 'Crypto':
+        return Crypto(item['symbol'], item['price'], item.get('chain'))
+    return None
+
+
+def iter_assets(types=None, symbols=None):
+    """
+    流式读取并逐个构造资产对象 (生成器，不校验签名)。
+    过滤在解析阶段完成，不需要的资产不会被构造成对象。
+    """
+    for item in iter_records(types, symbols):
+        obj = make_asset(item)
+        if obj is not None:
+            yield obj
+
+
+def load_data(types=None, symbols=None):
     """
-    从 JSON 文件读取并恢复为对象列表，并进行文件完整性校验。
+    从 JSON 文件和日志读取并恢复为对象列表，并进行文件完整性校验。
+    types / symbols: 只恢复这些类型 / 代码的资产 (None 表示全部)。
     """
     if not os.path.exists(DATA_FILE):
         print(f" [存储] 未找到数据文件 ({DATA_FILE})，将创建新数据。")
         return []
 
-    # 校验文件完整性
-    if not verify_file_integrity(DATA_FILE, SIG_FILE):
-        # 如果校验失败，直接返回空列表或抛出异常
-        print(" [系统] 出于安全考虑，建议检查数据来源。")
-        return []
-
     print(f" [存储] 正在读取 {DATA_FILE} ...")
 
-    restored_assets = []
-
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            raw_data_list = json.load(f)
-
-            for item in raw_data_list:
-                if item['type'] == 'Stock':
-                    obj = Stock(item['symbol'], item['price'], item.get('exchange'))
-                elif item['type'] == 'Crypto':
-                    obj = Crypto(item['symbol'], item['price'], item.get('chain'))
-                else:
-                    continue
-                restored_assets.append(obj)
+        if not verify_file_integrity(DATA_FILE, SIG_FILE):
+            # 如果校验失败，直接返回空列表
+            print(" [系统] 出于安全考虑，建议检查数据来源。")
+            return []
 
+        restored_assets = list(iter_assets(types, symbols))
         print(f" [存储] 成功恢复 {len(restored_assets)} 条记录。")
         return restored_assets
 
+    except JournalError as e:
+        print(f" [安全] ❌ 严重警告！日志已损坏或被篡改: {e}")
+        print(" [系统] 出于安全考虑，建议检查数据来源。")
+        return []
     except Exception as e:
         print(f" !! [错误] 读取文件失败: {e}")
         return []
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from datetime import datetime
+from urllib.parse import quote, unquote
+import numpy as np
+from core.gorilla import GorillaReader, write_series
+
+"""
+core/tick_archive.py
+--------------------
+内存映射的二进制逐笔归档 (冷数据层)。
+每个符号一个目录，目录下是按顺序写入的定长记录段文件:
+    ticks/AAPL/000000.bin, 000001.bin, ...
+目录名是百分号编码后的符号 (例如 BTC/USDT -> BTC%2FUSDT)。
+每条记录 16 字节: int64 时间戳 (自 1970-01-01 起的微秒数，本地时间，与 recorded_at 一致) + float64 价格。
+
+【知识点】
+1. 结构化数组 (Structured dtype): np.dtype([("ts", "<i8"), ("price", "<f8")])，
+   一条记录就是一个 C 结构体，写文件就是 tobytes()，没有字符串、没有 datetime 对象。
+2. numpy.memmap: 把文件映射进内存，按需由操作系统分页读入；切片是零拷贝的视图，
+   不需要先把整个文件读进来。
+3. 二分查找: 时间戳单调不减，np.searchsorted 在 O(log n) 内定位范围的起止位置。
+4. 只追加 (Append-only) + 分段: 写满 SEGMENT_RECORDS 条就换一个新段文件，旧段不再改动，
+   映射可以一直缓存；崩溃时最后一段末尾可能有半条记录，打开时截掉即可。
+5. 压缩: 写满的段不再变化，可以用 compress() 转成 Gorilla 压缩格式 (.grl，见 core/gorilla.py)，
+   十进制报价约为原来的 1/5，代价是读取时要解码 (不再是零拷贝视图)。
+"""
+
+TICK_DTYPE = np.dtype([("ts", "<i8"), ("price", "<f8")])
+
+# 每个段文件最多多少条记录 (1M 条 = 16 MB)
+SEGMENT_RECORDS = 1 << 20
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_micros(moment):
+    """datetime / ISO 字符串 -> int64 微秒时间戳"""
+    if isinstance(moment, (int, np.integer)):
+        return int(moment)
+    if not isinstance(moment, datetime):
+        moment = datetime.fromisoformat(str(moment))
+    delta = moment - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def to_micros_array(values):
+    """int64 数组 / datetime64 数组 / datetime 或字符串序列 -> int64 微秒数组"""
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == "M":
+            return values.astype("datetime64[us]").astype(np.int64)
+        if values.dtype.kind in "iu":
+            return values.astype(np.int64, copy=False)
+    return np.fromiter((to_micros(v) for v in values), dtype=np.int64, count=len(values))
+
+
+def from_micros(values):
+    """int64 微秒时间戳数组 -> datetime64[us] 数组"""
+    return np.asarray(values, dtype=np.int64).astype("datetime64[us]")
+
+
+class _Segment:
+    __slots__ = ("path", "count", "first_ts", "last_ts", "_map")
+    compressed = False
+
+    def __init__(self, path):
+        self.path = path
+        self._map = None
+        self.refresh()
+
+    def refresh(self):
+        """根据文件大小更新记录数，并截掉崩溃留下的半条记录"""
+        self.close()  # Windows 不允许截断仍被映射的文件
+        size = os.path.getsize(self.path)
+        if size % TICK_DTYPE.itemsize:
+            size -= size % TICK_DTYPE.itemsize
+            with open(self.path, "r+b") as f:
+                f.truncate(size)
+        self.count = size // TICK_DTYPE.itemsize
+        if self.count:
+            records = self.records()
+            self.first_ts, self.last_ts = int(records["ts"][0]), int(records["ts"][-1])
+        else:
+            self.first_ts = self.last_ts = None
+
+    def records(self):
+        """整段的 memmap 视图 (缓存；空段返回空数组)"""
+        if self.count == 0:
+            return np.empty(0, dtype=TICK_DTYPE)
+        if self._map is None or len(self._map) != self.count:
+            self._map = np.memmap(self.path, dtype=TICK_DTYPE, mode="r", shape=(self.count,))
+        return self._map
+
+    def close(self):
+        """释放缓存的 memmap (之后 records() 会重新映射)"""
+        self._map = None
+
+    @property
+    def nbytes(self):
+        return self.count * TICK_DTYPE.itemsize
+
+    def slices(self, lo, hi):
+        """[lo, hi] 范围内的零拷贝切片 (二分查找)"""
+        records = self.records()
+        ts = records["ts"]
+        i = 0 if lo is None else int(np.searchsorted(ts, lo, side="left"))
+        j = len(records) if hi is None else int(np.searchsorted(ts, hi, side="right"))
+        if i < j:
+            yield records[i:j]
+
+
+class _CompressedSegment:
+    """Gorilla 压缩后的只读段 (.grl)，按块解码"""
+    __slots__ = ("path", "reader", "count", "first_ts", "last_ts")
+    compressed = True
+
+    def __init__(self, path):
+        self.path = path
+        self.reader = GorillaReader(path)
+        self.count = len(self.reader)
+        self.first_ts, self.last_ts = self.reader.first_ts, self.reader.last_ts
+
+    @property
+    def nbytes(self):
+        return self.reader.size
+
+    def records(self):
+        """整段解码 (会复制)"""
+        parts = list(self.slices(None, None))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=TICK_DTYPE)
+
+    def slices(self, lo, hi):
+        """流式解码 [lo, hi] 范围内的块，每块转换成结构化数组"""
+        for ts, prices in self.reader.iter_blocks(lo, hi):
+            records = np.empty(len(ts), dtype=TICK_DTYPE)
+            records["ts"], records["price"] = ts, prices
+            yield records
+
+
+class TickArchive:
+    """
+    按符号分目录的逐笔归档
+    """
+
+    def __init__(self, root, segment_records=SEGMENT_RECORDS, fsync=False):
+        self.root = root
+        self.segment_records = segment_records
+        self.fsync = fsync
+        self._segments = {}  # symbol -> [_Segment, ...]
+        self._lock = threading.Lock()
+
+    # -------------------------------
+    #  段文件管理
+    # -------------------------------
+    def _dir(self, symbol):
+        """
+        符号对应的目录。符号先做百分号编码再作为目录名: "BTC/USDT" -> "BTC%2FUSDT"，
+        路径分隔符和 Windows 不允许的字符都会被编码，"." / ".." 也编码成 "%2E"，不会跳出 root。
+        普通的字母数字符号编码前后相同，已有的目录不受影响。
+        """
+        if not symbol:
+            raise ValueError("符号不能为空")
+        name = quote(symbol, safe="")
+        if name in (".", ".."):
+            name = name.replace(".", "%2E")
+        return os.path.join(self.root, name)
+
+    def _load(self, symbol):
+        segments = self._segments.get(symbol)
+        if segments is None:
+            folder = self._dir(symbol)
+            names = os.listdir(folder) if os.path.isdir(folder) else []
+            segments = []
+            for stem in sorted({n[:-4] for n in names if n.endswith((".bin", ".grl"))}):
+                path = os.path.join(folder, stem)
+                if stem + ".grl" in names:
+                    if stem + ".bin" in names:
+                        os.remove(path + ".bin")  # 压缩完成后、删除原文件前崩溃留下的
+                    segments.append(_CompressedSegment(path + ".grl"))
+                else:
+                    segments.append(_Segment(path + ".bin"))
+            self._segments[symbol] = segments
+        return segments
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(unquote(n) for n in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, n)))
+
+    def count(self, symbol):
+        with self._lock:
+            return sum(seg.count for seg in self._load(symbol))
+
+    def last_timestamp(self, symbol):
+        """最后一条记录的微秒时间戳 (没有数据时返回 None)"""
+        with self._lock:
+            segments = self._load(symbol)
+            return segments[-1].last_ts if segments and segments[-1].count else None
+
+    def count_at(self, symbol, ts):
+        """时间戳恰好等于 ts (微秒) 的记录数 (同一微秒内可以有多条)"""
+        return sum(len(part) for part in self.iter_slices(symbol, ts, ts))
+
+    def first_timestamp(self, symbol):
+        with self._lock:
+            segments = self._load(symbol)
+            return segments[0].first_ts if segments and segments[0].count else None
+
+    # -------------------------------
+    #  写入 (只追加)
+    # -------------------------------
+    def append(self, symbol, timestamps, prices):
+        """
+        追加一批记录。timestamps 为 int64 微秒 (或 datetime 列表)，必须单调不减，
+        且不早于已有的最后一条；违反时抛 ValueError。返回写入条数。
+        """
+        ts = to_micros_array(timestamps)
+        records = np.empty(len(ts), dtype=TICK_DTYPE)
+        records["ts"] = ts
+        records["price"] = prices
+        if len(records) == 0:
+            return 0
+        if np.any(np.diff(ts) < 0):
+            raise ValueError("归档数据的时间戳必须单调不减")
+
+        with self._lock:
+            segments = self._load(symbol)
+            if segments and segments[-1].count and ts[0] < segments[-1].last_ts:
+                raise ValueError(f"{symbol}: 只能追加比已有数据更新的记录")
+            os.makedirs(self._dir(symbol), exist_ok=True)
+
+            written = 0
+            while written < len(records):
+                if not segments or segments[-1].compressed or segments[-1].count >= self.segment_records:
+                    path = os.path.join(self._dir(symbol), f"{len(segments):06d}.bin")
+                    open(path, "wb").close()
+                    segments.append(_Segment(path))
+                segment = segments[-1]
+                n = min(self.segment_records - segment.count, len(records) - written)
+                with open(segment.path, "ab") as f:
+                    f.write(records[written:written + n].tobytes())
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                segment.refresh()
+                written += n
+        return written
+
+    # -------------------------------
+    #  读取 (memmap + 二分查找)
+    # -------------------------------
+    def iter_slices(self, symbol, start=None, end=None):
+        """
+        按时间顺序 yield [start, end] 范围内的结构化数组切片。
+        未压缩的段是零拷贝的 memmap 视图，压缩的段按块解码。
+        start / end 可以是 datetime、ISO 字符串或微秒整数。
+        """
+        lo = to_micros(start) if start is not None else None
+        hi = to_micros(end) if end is not None else None
+        with self._lock:
+            segments = list(self._load(symbol))
+        for segment in segments:
+            if segment.count == 0:
+                continue
+            if (lo is not None and segment.last_ts < lo) or (hi is not None and segment.first_ts > hi):
+                continue
+            yield from segment.slices(lo, hi)
+
+    def read(self, symbol, start=None, end=None):
+        """
+        读取 [start, end] 范围，返回 (int64 微秒时间戳, float64 价格)。
+        范围只落在一个未压缩的段内时两个数组都是 memmap 上的零拷贝视图。
+        """
+        slices = list(self.iter_slices(symbol, start, end))
+        if not slices:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        records = slices[0] if len(slices) == 1 else np.concatenate(slices)
+        return records["ts"], records["price"]
+
+    def disk_bytes(self, symbol=None):
+        symbols = [symbol] if symbol is not None else self.symbols()
+        with self._lock:
+            return sum(seg.nbytes for s in symbols for seg in self._load(s))
+
+    # -------------------------------
+    #  压缩 (Gorilla)
+    # -------------------------------
+    def compress(self, symbol=None, include_active=False):
+        """
+        把写满的段压缩成 .grl (先写临时文件再原子替换，最后删除原 .bin)。
+        include_active=True 时最后一个未写满的段也压缩，之后的追加会写入新段。
+        返回 (压缩前字节数, 压缩后字节数)。
+        """
+        before = after = 0
+        for name in [symbol] if symbol is not None else self.symbols():
+            with self._lock:
+                segments = self._load(name)
+                for i, segment in enumerate(segments):
+                    if segment.compressed or segment.count == 0:
+                        continue
+                    if segment.count < self.segment_records and not (include_active and i == len(segments) - 1):
+                        continue
+                    records = segment.records()
+                    path = segment.path[:-4] + ".grl"
+                    write_series(path, records["ts"], records["price"])
+                    before += segment.nbytes
+                    segments[i] = _CompressedSegment(path)
+                    after += segments[i].nbytes
+                    # Windows 不能删除仍被映射的文件: 先释放本对象持有的 memmap
+                    del records
+                    segment.close()
+                    try:
+                        os.remove(segment.path)
+                    except OSError as e:
+                        # 其他读取方还持有零拷贝视图时删除会失败；.grl 已生效，下次 _load 时清理 .bin
+                        print(f" !! [归档] 暂时无法删除 {segment.path}: {e}")
+        return before, after
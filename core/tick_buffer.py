@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+"""
+core/tick_buffer.py
+-------------------
+逐笔行情 (tick) 的环形缓冲区。
+每个 tick 记录 (时间戳, 价格, 成交量)，容量固定，写满后覆盖最旧的数据。
+
+【知识点】
+1. 环形缓冲区 (Ring Buffer): 预先分配好定长的 NumPy 数组，写指针绕圈移动，
+   追加数据不会触发内存分配，也不会无限增长。
+2. 按时间顺序读取: 没有绕圈时直接返回切片 (零拷贝视图)，绕圈后拼接两段。
+3. MultiTickBuffer: 多个符号共用一组二维数组 (每行一个符号)，
+   可以一次性取出 "所有符号最近 N 个价格" 的矩阵，交给 core.indicators 做批量计算。
+"""
+
+FIELDS = ("timestamp", "price", "volume")
+
+
+class TickBuffer:
+    """
+    单个符号的定长 tick 缓冲区
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = max(1, int(capacity))
+        self._data = {name: np.zeros(self.capacity, dtype=np.float64) for name in FIELDS}
+        self._pos = 0    # 下一次写入的位置
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, price, volume=0.0):
+        pos = self._pos
+        self._data["timestamp"][pos] = timestamp
+        self._data["price"][pos] = price
+        self._data["volume"][pos] = volume
+        self._pos = (pos + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def extend(self, timestamps, prices, volumes=None):
+        """批量追加 (向量化)，超过容量时只保留最后 capacity 个"""
+        prices = np.asarray(prices, dtype=np.float64)
+        n = len(prices)
+        if n == 0:
+            return
+        columns = {
+            "timestamp": np.broadcast_to(np.asarray(timestamps, dtype=np.float64), (n,)),
+            "price": prices,
+            "volume": np.broadcast_to(np.asarray(0.0 if volumes is None else volumes, dtype=np.float64), (n,)),
+        }
+        if n > self.capacity:
+            columns = {name: values[-self.capacity:] for name, values in columns.items()}
+            n = self.capacity
+
+        index = (self._pos + np.arange(n)) % self.capacity
+        for name, values in columns.items():
+            self._data[name][index] = values
+        self._pos = (self._pos + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+
+    def field(self, name, last=None):
+        """按时间顺序返回某一列 (最近 last 个，默认全部)；没有绕圈时返回的是视图，不要原地修改"""
+        n = self._count if last is None else min(int(last), self._count)
+        end = self._pos
+        start = end - n
+        data = self._data[name]
+        if start >= 0:
+            return data[start:end]
+        return np.concatenate((data[start:], data[:end]))
+
+    def timestamps(self, last=None):
+        return self.field("timestamp", last)
+
+    def prices(self, last=None):
+        return self.field("price", last)
+
+    def volumes(self, last=None):
+        return self.field("volume", last)
+
+    def clear(self):
+        self._pos = 0
+        self._count = 0
+
+
+class MultiTickBuffer:
+    """
+    多个符号的 tick 缓冲区：每个符号一行，共享同一组 (符号数, 容量) 的二维数组
+    """
+
+    def __init__(self, capacity=1024, symbols=()):
+        self.capacity = max(1, int(capacity))
+        self.symbols = []
+        self._index = {}  # symbol -> 行号
+        self._data = {name: np.zeros((0, self.capacity), dtype=np.float64) for name in FIELDS}
+        self._pos = np.zeros(0, dtype=np.int64)
+        self._count = np.zeros(0, dtype=np.int64)
+        self.add_symbols(symbols)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._index
+
+    def add_symbols(self, symbols):
+        new = [s for s in dict.fromkeys(symbols) if s not in self._index]
+        if not new:
+            return
+        for symbol in new:
+            self._index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        extra = np.zeros((len(new), self.capacity), dtype=np.float64)
+        for name in FIELDS:
+            self._data[name] = np.vstack((self._data[name], extra))
+        self._pos = np.concatenate((self._pos, np.zeros(len(new), dtype=np.int64)))
+        self._count = np.concatenate((self._count, np.zeros(len(new), dtype=np.int64)))
+
+    def count(self, symbol):
+        return int(self._count[self._index[symbol]])
+
+    def append(self, symbol, timestamp, price, volume=0.0):
+        self.append_many([symbol], timestamp, [price], [volume])
+
+    def append_many(self, symbols, timestamp, prices, volumes=None):
+        """
+        每个符号追加一个 tick (向量化)。timestamp 可以是标量 (同一时刻的快照) 或数组。
+        未出现过的符号会自动加入；同一批中同一符号只能出现一次。
+        """
+        symbols = list(symbols)
+        if len(set(symbols)) != len(symbols):
+            raise ValueError("同一批 tick 中符号不能重复")
+        self.add_symbols(symbols)
+        rows = np.fromiter((self._index[s] for s in symbols), dtype=np.int64, count=len(symbols))
+        n = len(rows)
+        pos = self._pos[rows]
+
+        self._data["timestamp"][rows, pos] = np.broadcast_to(np.asarray(timestamp, dtype=np.float64), (n,))
+        self._data["price"][rows, pos] = np.asarray(prices, dtype=np.float64)
+        self._data["volume"][rows, pos] = np.broadcast_to(
+            np.asarray(0.0 if volumes is None else volumes, dtype=np.float64), (n,))
+        self._pos[rows] = (pos + 1) % self.capacity
+        self._count[rows] = np.minimum(self._count[rows] + 1, self.capacity)
+
+    def field(self, symbol, name, last=None):
+        """按时间顺序返回某个符号的一列"""
+        row = self._index[symbol]
+        n = int(self._count[row]) if last is None else min(int(last), int(self._count[row]))
+        index = (self._pos[row] - n + np.arange(n)) % self.capacity
+        return self._data[name][row, index]
+
+    def matrix(self, name="price", length=None, symbols=None):
+        """
+        返回 (符号数, length) 的矩阵，每行是该符号最近 length 个值 (按时间顺序)。
+        length 默认取所选符号中最短的历史长度；任何符号不足 length 个 tick 时抛出 ValueError。
+        """
+        symbols = self.symbols if symbols is None else list(symbols)
+        rows = np.fromiter((self._index[s] for s in symbols), dtype=np.int64, count=len(symbols))
+        counts = self._count[rows]
+        if length is None:
+            length = int(counts.min()) if len(rows) else 0
+        if len(rows) and counts.min() < length:
+            raise ValueError(f"部分符号的 tick 数量不足 {length} 个")
+
+        index = (self._pos[rows, None] - length + np.arange(length)) % self.capacity
+        return self._data[name][rows[:, None], index]
@@ -13,7 +13,8 @@ core/visualizer.py
 def generate_report_chart(assets_list, output_file=None):
     """
     接收资产对象列表，生成价格对比柱状图。
-    :param assets_list: 资产对象列表，每个对象需有 .symbol 和 .get_price()
+    :param assets_list: 资产对象列表，每个对象需有 .symbol 和 .get_price()；
+                        也可以是列式存储 models.AssetStore (直接读取数组，不逐个调用方法)
     :param output_file: 可选，图表保存路径。如果为空则保存到 reports/portfolio_analysis.png
     """
     if not assets_list:
@@ -23,11 +24,15 @@ def generate_report_chart(assets_list, output_file=None):
     print(" [绘图] 正在生成可视化报表...")
 
     # --- 1. 数据准备 ---
-    labels = [asset.symbol for asset in assets_list]
-    raw_prices = [asset.get_price() for asset in assets_list]
+    if hasattr(assets_list, "to_columns"):
+        columns = assets_list.to_columns()
+        labels = columns["symbol"].tolist()
+        prices_array = columns["price"]
+    else:
+        labels = [asset.symbol for asset in assets_list]
+        prices_array = np.array([asset.get_price() for asset in assets_list])
 
     # --- 2. NumPy 数组 ---
-    prices_array = np.array(raw_prices)
     avg_price = np.mean(prices_array)
     print(f" [统计] 资产平均价格 (NumPy计算): ${avg_price:,.2f}")
 
@@ -156,8 +156,7 @@ class OmniWindow(QMainWindow):
             save_data(self.assets)
             self.log("JSON 数据已保存。")
             self.log("写入数据库历史记录...")
-            for asset in self.assets:
-                db_engine.log_price(asset)
+            db_engine.log_prices(self.assets)
             total = db_engine.get_total_records()
             self.log(f"数据库写入完成，总记录数: {total}")
 
@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+from core.backtest import (
+    ThresholdStrategy, evaluate_grid, parameter_grid, run_backtest, sweep, synthetic_prices
+)
+from core.config import INITIAL_CAPITAL, TAX_RATE
+
+
+def naive_backtest(prices, buy_below, sell_above, fee=TAX_RATE, capital=INITIAL_CAPITAL):
+    """逐个价格循环的参考实现"""
+    cash, units, trades, fees = capital, 0.0, 0, 0.0
+    for price in prices:
+        if price < buy_below and units == 0:
+            fees += cash * fee
+            units, cash = cash * (1 - fee) / price, 0.0
+            trades += 1
+        elif price > sell_above and units > 0:
+            value = units * price
+            fees += value * fee
+            units, cash = 0.0, value * (1 - fee)
+            trades += 1
+    return cash + units * prices[-1] - capital, trades, fees
+
+
+class TestBacktest(unittest.TestCase):
+
+    def setUp(self):
+        self.prices = synthetic_prices(5000, sigma=3.0, seed=11)
+
+    def test_matches_naive_loop(self):
+        buy_below, sell_above = parameter_grid(np.arange(100, 160, 10.0), np.arange(130, 200, 10.0))
+        result = evaluate_grid(self.prices, buy_below, sell_above)
+        self.assertGreater(result["trades"].max(), 2)
+        for i in range(len(buy_below)):
+            pnl, trades, fees = naive_backtest(self.prices, buy_below[i], sell_above[i])
+            self.assertAlmostEqual(result["pnl"][i], pnl, places=6)
+            self.assertEqual(result["trades"][i], trades)
+            self.assertAlmostEqual(result["fees"][i], fees, places=6)
+
+    def test_detailed_run_and_sweep(self):
+        strategy = ThresholdStrategy(130, 170)
+        detail = run_backtest(self.prices, strategy)
+        self.assertAlmostEqual(detail["equity"][-1] - INITIAL_CAPITAL, detail["summary"]["pnl"], places=6)
+        self.assertTrue(0 <= detail["summary"]["max_drawdown"] < 1)
+
+        result = sweep(self.prices, [120, 130, 140], [150, 170], processes=1, top_n=2)
+        self.assertEqual(len(result["pnl"]), 6)
+        self.assertTrue(np.all(np.diff(result["pnl"]) <= 0))
+        self.assertEqual(int(np.isnan(result["max_drawdown"]).sum()), 4)
+
+    def test_strategy_signals(self):
+        strategy = ThresholdStrategy()
+        self.assertEqual([strategy.action(p) for p in (100, 150, 200)], ["BUY", "HOLD", "SELL"])
+        self.assertEqual(strategy.signals([100, 150, 200]).tolist(), [1, 0, -1])
+        with self.assertRaises(ValueError):
+            ThresholdStrategy(180, 120)
+
+
+if __name__ == '__main__':
+    unittest.main()
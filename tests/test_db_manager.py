@@ -0,0 +1,422 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+import unittest.mock
+from datetime import datetime, timedelta
+import numpy as np
+from core.db_manager import DatabaseManager, WriteBuffer, BufferFullError
+from core.db_pool import SQLiteConnectionPool, MySQLConnectionPool, PoolTimeoutError
+from core import rollups, partitions
+from core import db_manager
+from core.models import Stock, Crypto
+
+
+class TestWriteBuffer(unittest.TestCase):
+
+    def test_batches_by_size_and_flush(self):
+        batches = []
+        buf = WriteBuffer(batches.append, batch_size=10, flush_interval=60)
+        for i in range(25):
+            buf.add(i)
+        buf.close()
+        self.assertEqual(sum(batches, []), list(range(25)))
+        self.assertEqual(buf.stats["rows"], 25)
+
+    def test_time_threshold(self):
+        flushed = threading.Event()
+        buf = WriteBuffer(lambda rows: flushed.set(), batch_size=1000, flush_interval=0.05)
+        buf.add(1)
+        self.assertTrue(flushed.wait(2))
+        buf.close()
+
+    def test_backpressure_and_retry(self):
+        failing = [True]
+
+        def flush_fn(rows):
+            if failing[0]:
+                raise IOError("db down")
+
+        buf = WriteBuffer(flush_fn, batch_size=2, flush_interval=60, max_pending=4, block=False)
+        buf.add_many([1, 2, 3, 4])
+        self.assertFalse(buf.flush())
+        self.assertEqual(len(buf), 4)  # 写入失败的数据放回队列
+        with self.assertRaises(BufferFullError):
+            buf.add(5)
+        failing[0] = False
+        self.assertTrue(buf.close())
+        self.assertEqual(buf.stats["rows"], 4)
+
+
+class TestDatabaseManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.tmp, "test.db"), flush_interval=60)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_buffered_writes_visible_to_reads(self):
+        self.db.log_price(Stock("AAPL", 150.0))
+        self.db.log_prices([Crypto("BTC", 60000.0), Stock("MSFT", 300.0)])
+        self.db.log_rows(("SIM", float(i), "Simulated", datetime.now()) for i in range(100))
+        self.assertEqual(self.db.get_total_records(), 103)
+
+    def test_close_flushes(self):
+        path = self.db.db_file
+        self.db.log_price(Stock("AAPL", 150.0))
+        self.db.close()
+        other = DatabaseManager(path)
+        self.assertEqual(other.get_total_records(), 1)
+        other.close()
+
+
+class TestHistoryQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.tmp, "test.db"))
+        self.t0 = datetime(2024, 1, 1)
+        # 同一秒内有多条记录，检验分块边界不会丢行或重复
+        self.db.log_rows((("AAPL", "BTC")[i % 2], float(i), "Simulated", self.t0 + timedelta(seconds=i // 4))
+                         for i in range(200))
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_chunked_iteration_is_complete_and_ordered(self):
+        chunks = list(self.db.iter_history("AAPL", chunk_size=7))
+        prices = [row[1] for chunk in chunks for row in chunk]
+        self.assertEqual(prices, [float(i) for i in range(0, 200, 2)])
+        self.assertTrue(all(len(chunk) <= 7 for chunk in chunks))
+
+    def test_time_range_and_limit(self):
+        rows = self.db.get_history("BTC", self.t0 + timedelta(seconds=3), self.t0 + timedelta(seconds=5))
+        self.assertEqual([row[1] for row in rows], [13.0, 15.0, 17.0, 19.0, 21.0, 23.0])
+        self.assertEqual(len(self.db.get_history("BTC", limit=5)), 5)
+
+    def test_latest_and_symbols(self):
+        self.db.log_price(Stock("MSFT", 300.0))
+        self.assertEqual(self.db.get_symbols(), ["AAPL", "BTC", "MSFT"])
+        latest = self.db.get_latest(["AAPL", "BTC", "NOPE"])
+        self.assertEqual({s: row[1] for s, row in latest.items()}, {"AAPL": 198.0, "BTC": 199.0})
+        self.assertEqual(self.db.get_latest()["MSFT"][1], 300.0)
+
+
+class TestRollups(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.tmp, "test.db"), flush_interval=60)
+        t0 = datetime(2024, 3, 1, 9, 59, 30)
+        self.rows = [("AAPL", 100.0 + (i * 37) % 11, "Simulated", t0 + timedelta(seconds=7 * i)) for i in range(2000)]
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def naive_ohlc(self, seconds):
+        buckets = {}
+        for _, price, _, at in sorted(self.rows, key=lambda r: r[3]):
+            start = rollups.bucket_start(at, seconds)
+            bar = buckets.setdefault(start, [price, price, price, price, 0])
+            bar[1], bar[2], bar[3], bar[4] = max(bar[1], price), min(bar[2], price), price, bar[4] + 1
+        return [(start, *bar) for start, bar in sorted(buckets.items())]
+
+    def test_incremental_rollups_out_of_order(self):
+        # 分几批乱序写入，汇总结果应与一次性计算一致
+        shuffled = self.rows[1000:] + self.rows[:1000]
+        for i in range(0, len(shuffled), 300):
+            self.db.log_rows(shuffled[i:i + 300])
+            self.db.flush()
+        for resolution, seconds in (("1m", 60), ("5m", 300), ("1h", 3600), ("1d", 86400), ("30s", 30)):
+            self.assertEqual(self.db.get_ohlc("AAPL", resolution=resolution), self.naive_ohlc(seconds))
+        self.assertEqual(rollups.pick_rollup(4 * 3600), ("1h", 3600))
+        self.assertIsNone(rollups.pick_rollup(90))
+
+    def test_backfill_rebuilds(self):
+        self.db.log_rows(self.rows)
+        expected = self.db.get_ohlc("AAPL", resolution="1h")
+        with self.db.connection() as conn:
+            for name, _ in rollups.ROLLUPS:
+                conn.execute(f"DELETE FROM {rollups.table_name(name)}")
+            conn.commit()
+        self.assertEqual(self.db.get_ohlc("AAPL", resolution="1h"), [])
+        self.assertEqual(self.db.backfill_rollups(), len(self.rows))
+        self.assertEqual(self.db.get_ohlc("AAPL", resolution="1h"), expected)
+
+
+class TestPartitions(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "test.db")
+        self.db = DatabaseManager(self.path, flush_interval=60)
+        # 跨 3 个月，每 6 小时一条
+        t0 = datetime(2024, 1, 20)
+        self.rows = [("AAPL", 100.0 + i, "Simulated", t0 + timedelta(hours=6 * i)) for i in range(300)]
+        self.db.log_rows(self.rows)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_rows_routed_and_queries_span_partitions(self):
+        self.assertEqual(self.db.get_total_records(), 300)
+        self.assertEqual(self.db._tables(), ["price_history_202401", "price_history_202402",
+                                             "price_history_202403", "price_history_202404"])
+        prices = [row[1] for chunk in self.db.iter_history("AAPL", chunk_size=17) for row in chunk]
+        self.assertEqual(prices, [row[1] for row in self.rows])
+        rows = self.db.get_history("AAPL", datetime(2024, 1, 31, 12), datetime(2024, 2, 1, 6))
+        self.assertEqual([row[1] for row in rows], [146.0, 147.0, 148.0, 149.0])
+        self.assertEqual(self.db._tables(datetime(2024, 2, 10), datetime(2024, 3, 1)),
+                         ["price_history_202402", "price_history_202403"])
+        self.assertEqual(self.db.get_latest()["AAPL"][1], 399.0)
+
+    def test_stats_maintained_with_writes_and_retention(self):
+        stats = self.db.get_stats()
+        self.assertEqual(stats["total"]["count"], 300)
+        aapl = stats["symbols"]["AAPL"]
+        self.assertEqual((aapl["count"], aapl["last_price"]), (300, 399.0))
+        self.assertEqual(rollups.as_datetime(aapl["first_at"]), datetime(2024, 1, 20))
+
+        self.db.log_rows([("MSFT", 1.0, "Real", datetime(2024, 4, 20)), ("MSFT", 2.0, "Real", datetime(2024, 3, 1))])
+        stats = self.db.get_stats(["MSFT"])
+        self.assertEqual(list(stats["symbols"]), ["MSFT"])
+        self.assertEqual(stats["symbols"]["MSFT"]["last_price"], 1.0)  # 乱序写入时按时间取最新价
+        self.assertEqual(self.db.get_total_records(), 302)
+
+        self.db.apply_retention({"raw_months": 1, "archive": False}, now=datetime(2024, 4, 15))
+        stats = self.db.get_stats()
+        self.assertEqual(self.db.get_total_records(), 302 - 48 - 116)
+        self.assertEqual(rollups.as_datetime(stats["symbols"]["AAPL"]["first_at"]), datetime(2024, 3, 1))
+        self.assertEqual(rollups.as_datetime(stats["total"]["first_at"]), datetime(2024, 3, 1))
+        before = self.db.get_stats()
+        self.db.rebuild_stats()
+        self.assertEqual(self.db.get_stats(), before)
+
+    def test_retention_drop_and_stats_roll_back_together(self):
+        before = self.db.get_stats()
+        with unittest.mock.patch.object(self.db, "_subtract_stats", side_effect=RuntimeError("模拟失败")):
+            with self.assertRaises(RuntimeError):
+                self.db.apply_retention({"raw_months": 1, "archive": False}, now=datetime(2024, 4, 15))
+        # DROP 随统计表更新一起回滚: 分区仍在、仍可查询，统计不变
+        tables = [row[0] for row in self.db._query("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        self.assertIn("price_history_202401", tables)
+        self.assertIn("price_history_202401", self.db._tables())
+        self.assertEqual(self.db.get_stats(), before)
+        self.assertEqual(len(self.db.get_history("AAPL")), 300)
+
+        report = self.db.apply_retention({"raw_months": 1, "archive": False}, now=datetime(2024, 4, 15))
+        self.assertEqual(report["dropped"], ["price_history_202401", "price_history_202402"])
+        self.assertEqual(self.db.get_total_records(), 300 - 48 - 116)
+
+    def test_retention_archives_and_keeps_rollups(self):
+        original = db_manager.ARCHIVE_DIR
+        db_manager.ARCHIVE_DIR = os.path.join(self.tmp, "archive")
+        try:
+            daily = self.db.get_ohlc("AAPL", resolution="1d")
+            report = self.db.apply_retention({"raw_months": 1, "archive": "sqlite"}, now=datetime(2024, 4, 15))
+        finally:
+            db_manager.ARCHIVE_DIR = original
+        self.assertEqual(report["dropped"], ["price_history_202401", "price_history_202402"])
+        self.assertEqual(self.db.get_total_records(), 300 - 4 * 12 - 4 * 29)
+        self.assertEqual(self.db.get_ohlc("AAPL", resolution="1d"), daily)  # 汇总仍在
+        with sqlite3.connect(report["archived"][0]) as archive:
+            self.assertEqual(archive.execute("SELECT COUNT(*) FROM price_history_202401").fetchone()[0], 48)
+        before, after = self.db.compact()
+        self.assertLessEqual(after, before)
+
+    def test_retention_to_cold_tier_keeps_history_queryable(self):
+        report = self.db.apply_retention({"raw_months": 1, "archive": "ticks"}, now=datetime(2024, 4, 15))
+        self.assertEqual(report["dropped"], ["price_history_202401", "price_history_202402"])
+        self.assertLess(report["compressed"][1], report["compressed"][0])  # 默认压缩成 Gorilla 格式
+        self.assertEqual(self.db.cold.count("AAPL"), 48 + 116)
+        self.assertEqual([row[1] for chunk in self.db.iter_history("AAPL", chunk_size=50) for row in chunk],
+                         [row[1] for row in self.rows])
+        rows = self.db.get_history("AAPL", datetime(2024, 2, 29, 12), datetime(2024, 3, 1, 6))
+        self.assertEqual([(row[1], row[2]) for row in rows],
+                         [(262.0, "Archive"), (263.0, "Archive"), (264.0, "Simulated"), (265.0, "Simulated")])
+        self.assertEqual(rollups.as_datetime(rows[0][0]), datetime(2024, 2, 29, 12))
+        ts, prices = self.db.get_history_arrays("AAPL")
+        self.assertEqual(ts[0], np.datetime64("2024-01-20T00:00:00"))
+        self.assertEqual(prices.tolist(), [row[1] for row in self.rows])
+        self.assertEqual(self.db.get_total_records(), 300)  # 冷数据层中的记录仍然计入统计
+        before = self.db.get_stats()
+        self.db.rebuild_stats()
+        self.assertEqual(self.db.get_stats(), before)
+
+        # 重复执行不会重复写入；分区删空后最新价来自冷数据层
+        self.db.apply_retention({"raw_months": 0, "archive": "ticks"}, now=datetime(2024, 6, 1))
+        self.assertEqual(self.db.cold.count("AAPL"), 300)
+        self.assertEqual(self.db._tables(), [])
+        self.assertEqual(self.db.get_symbols(), ["AAPL"])
+        self.assertEqual(self.db.get_latest()["AAPL"][1:], (399.0, "Archive"))
+
+    def test_cold_tier_rerun_keeps_same_microsecond_ticks(self):
+        # 2024-01-25 00:00 已有一条 (120.0)，再写入 3 条相同时间戳的记录
+        moment = datetime(2024, 1, 25)
+        self.db.log_rows([("AAPL", price, "Real", moment) for price in (1.0, 2.0, 3.0)])
+        january = [row[1] for row in self.rows if row[3] < datetime(2024, 2, 1)]
+        expected = january[:21] + [1.0, 2.0, 3.0] + january[21:]
+        # 模拟上次转存在同一微秒的记录中间失败: 已写入 120.0 和 1.0
+        self.db.cold.append("AAPL", [row[3] for row in self.rows[:21]] + [moment], january[:21] + [1.0])
+
+        self.db.apply_retention({"raw_months": 1, "archive": "ticks", "compress": False},
+                                now=datetime(2024, 3, 15))
+        self.assertEqual(self.db.cold.count_at("AAPL", int(np.datetime64(moment, "us").astype(np.int64))), 4)
+        self.assertEqual(self.db.cold.read("AAPL")[1].tolist(), expected)
+
+    def test_legacy_table_merged_then_migrated(self):
+        with self.db.connection() as conn:
+            conn.execute(partitions.create_table_sql(partitions.PREFIX))
+            conn.execute("INSERT INTO price_history (symbol, price, source, recorded_at) VALUES (?, ?, ?, ?)",
+                         ("AAPL", -1.0, "Legacy", datetime(2024, 2, 1, 1)))
+            conn.commit()
+        self.db._load_partitions()
+        self.db.rebuild_stats()  # 绕过 DatabaseManager 直接写入的数据需要重建统计
+        prices = [row[1] for row in self.db.get_history("AAPL", datetime(2024, 2, 1), datetime(2024, 2, 1, 7))]
+        self.assertEqual(prices, [148.0, -1.0, 149.0])
+        self.assertEqual(self.db.get_total_records(), 301)
+        self.assertEqual(self.db.migrate_legacy(), 1)
+        self.assertNotIn(partitions.PREFIX, self.db._list_tables())
+        prices = [row[1] for row in self.db.get_history("AAPL", datetime(2024, 2, 1), datetime(2024, 2, 1, 7))]
+        self.assertEqual(prices, [148.0, -1.0, 149.0])
+
+
+class TestLegacyUpgrade(unittest.TestCase):
+
+    def test_baseline_database_gets_symbol_time_index(self):
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "history.db")
+        try:
+            # 旧版本的单表结构，没有任何索引
+            with sqlite3.connect(path) as conn:
+                conn.execute("CREATE TABLE price_history (id INTEGER PRIMARY KEY AUTOINCREMENT, symbol VARCHAR(20), "
+                             "price REAL, source VARCHAR(20), recorded_at DATETIME)")
+                conn.executemany("INSERT INTO price_history (symbol, price, source, recorded_at) VALUES (?, ?, ?, ?)",
+                                 [(s, 1.0, "Legacy", datetime(2024, 1, 1) + timedelta(hours=i))
+                                  for i in range(50) for s in ("AAPL", "MSFT")])
+            conn.close()
+
+            db = DatabaseManager(path, flush_interval=60)
+            try:
+                plans = [
+                    "SELECT recorded_at, price, source, id FROM price_history WHERE symbol = ? "
+                    "AND (recorded_at, id) > (?, ?) ORDER BY recorded_at, id LIMIT 10",
+                    "SELECT price FROM price_history WHERE symbol = ? ORDER BY recorded_at DESC LIMIT 1",
+                    "SELECT MIN(symbol) FROM price_history WHERE symbol > ?",
+                ]
+                for sql in plans:
+                    rows = db._query("EXPLAIN QUERY PLAN " + sql, ("A",) * sql.count("?"))
+                    plan = " ".join(str(row[-1]) for row in rows)
+                    self.assertIn("idx_price_history_symbol_time", plan, sql)
+                self.assertEqual(db.get_symbols(), ["AAPL", "MSFT"])
+            finally:
+                db.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.pings = 0
+        self.closed = False
+        self.alive = True
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.alive:
+            raise IOError("gone away")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPools(unittest.TestCase):
+
+    def test_sqlite_connection_per_thread(self):
+        tmp = tempfile.mkdtemp()
+        pool = SQLiteConnectionPool(os.path.join(tmp, "pool.db"))
+        seen = []
+
+        def worker():
+            with pool.connection() as a, pool.connection() as b:
+                seen.append((id(a), a is b))
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertTrue(all(same for _, same in seen))
+        self.assertEqual(pool.size(), 3)
+        pool.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    def test_mysql_pool_bounded_with_health_check(self):
+        created = []
+
+        def connect():
+            created.append(FakeConnection())
+            return created[-1]
+
+        pool = MySQLConnectionPool(max_size=1, acquire_timeout=0.05, ping_interval=0, connect=connect)
+        with pool.connection() as conn:
+            with pool.connection() as nested:
+                self.assertIs(nested, conn)  # 同一线程可重入
+
+            errors = []
+
+            def borrow():
+                try:
+                    with pool.connection():
+                        pass
+                except PoolTimeoutError as e:
+                    errors.append(e)
+
+            t = threading.Thread(target=borrow)
+            t.start()
+            t.join()
+            self.assertEqual(len(errors), 1)  # 池满时其他线程等待超时
+
+        conn.alive = False  # 连接断开：借出前 ping 失败，丢弃并重建
+        with pool.connection() as fresh:
+            self.assertIsNot(fresh, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.size(), 1)
+        pool.close()
+
+    def test_concurrent_writers_and_readers(self):
+        tmp = tempfile.mkdtemp()
+        db = DatabaseManager(os.path.join(tmp, "test.db"), batch_size=50)
+
+        def worker(n):
+            asset = Stock(f"T{n}", 100.0)
+            for i in range(200):
+                asset.update_price(100.0 + i)
+                db.log_price(asset)
+                if i % 50 == 0:
+                    db.get_latest([asset.symbol])
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(db.get_total_records(), 800)
+        self.assertEqual(db.get_latest()["T3"][1], 299.0)
+        db.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from core.gorilla import encode_block, decode_block, write_series, GorillaReader
+
+
+class TestGorilla(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        rng = np.random.default_rng(7)
+        n = 20_000
+        gaps = rng.choice([1_000_000, 1_000_000, 250_000, 3_000_000], n)
+        gaps[::4000] = 3 * 86400 * 1_000_000  # 周末停牌
+        self.ts = np.cumsum(gaps).astype(np.int64) + 1_700_000_000_000_000
+        prices = np.round(100 * np.exp(np.cumsum(rng.normal(0, 1e-4, n))), 2)
+        # 约 40% 的记录价格不变 (XOR 为 0)
+        keep = np.where(rng.random(n) < 0.4, 0, np.arange(n))
+        self.prices = prices[np.maximum.accumulate(keep)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def assertSameBits(self, a, b):
+        self.assertEqual(a.view(np.uint64).tolist(), np.asarray(b, dtype=np.float64).view(np.uint64).tolist())
+
+    def test_block_round_trip_is_lossless(self):
+        ts, prices = decode_block(encode_block(self.ts[:5000], self.prices[:5000]))
+        self.assertEqual(ts.tolist(), self.ts[:5000].tolist())
+        self.assertSameBits(prices, self.prices[:5000])
+
+        # 特殊值、单条记录、相同时间戳、极大的时间跳跃
+        special = np.array([0.0, -0.0, np.inf, -np.inf, np.nan, 1e-310, 1.7e308, -1.0000000001, 3.0, 3.0])
+        stamps = np.cumsum([0, 1, 0, 2 ** 40, 3, 0, 2 ** 61, 1, 1, 5]).astype(np.int64) - 2 ** 50
+        ts, prices = decode_block(encode_block(stamps, special))
+        self.assertEqual(ts.tolist(), stamps.tolist())
+        self.assertSameBits(prices, special)
+        ts, prices = decode_block(encode_block([42], [1.5]))
+        self.assertEqual((ts.tolist(), prices.tolist()), ([42], [1.5]))
+
+    def test_file_block_random_access_and_streaming(self):
+        path = os.path.join(self.tmp, "series.grl")
+        size = write_series(path, self.ts, self.prices, block_records=4096)
+        self.assertLess(size, len(self.ts) * 16 / 2)
+        reader = GorillaReader(path)
+        self.assertEqual((len(reader), len(reader.index)), (20_000, 5))
+        self.assertEqual((reader.first_ts, reader.last_ts), (int(self.ts[0]), int(self.ts[-1])))
+
+        ts, prices = reader.block(3)
+        self.assertEqual(ts.tolist(), self.ts[3 * 4096:4 * 4096].tolist())
+        blocks = list(reader.iter_blocks(int(self.ts[4000]), int(self.ts[8200])))
+        self.assertEqual([len(b[0]) for b in blocks], [96, 4096, 9])  # 首尾两块裁剪到范围内
+        ts, prices = reader.read(int(self.ts[4000]), int(self.ts[8200]))
+        self.assertSameBits(prices, self.prices[4000:8201])
+        self.assertEqual(len(reader.read(int(self.ts[-1]) + 1)[0]), 0)
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            write_series(os.path.join(self.tmp, "bad.grl"), self.ts[::-1], self.prices)
+        path = os.path.join(self.tmp, "junk.grl")
+        with open(path, "wb") as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            GorillaReader(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+from core.hft_sim import GBMTickGenerator, run_pipeline, apply_to_assets, apply_to_store
+from core.models import Stock, AssetStore
+
+
+class TestTickGenerator(unittest.TestCase):
+
+    def test_blocks_are_continuous(self):
+        """分块生成：最后一块按剩余步数截断，价格为正，时间戳单调不减"""
+        blocks = list(GBMTickGenerator(["A", "B"], [100.0, 50.0], seed=3).stream(300, block_steps=64))
+        self.assertEqual([b.prices.shape for b in blocks][-1], (300 - 4 * 64, 2))
+        streamed = np.vstack([b.prices for b in blocks])
+        self.assertEqual(streamed.shape, (300, 2))
+        self.assertTrue(np.all(streamed > 0))
+        self.assertTrue(np.all(np.diff(np.concatenate([b.timestamps for b in blocks])) >= 0))
+
+    def test_pipeline_drives_assets_and_store(self):
+        symbols = ["A", "B", "C"]
+        assets = [Stock(s, 100.0) for s in symbols]
+        store = AssetStore.from_assets(assets)
+        gen_a = GBMTickGenerator(symbols, seed=5)
+        gen_b = GBMTickGenerator(symbols, seed=5)
+        result = run_pipeline(gen_a, 50, [("apply", apply_to_assets(assets))], block_steps=8)
+        run_pipeline(gen_b, 50, [("apply", apply_to_store(store))], block_steps=8)
+
+        self.assertEqual(result["ticks"], 150)
+        self.assertEqual(result["stages"]["apply"]["count"], 7)
+        self.assertLessEqual(result["latency"]["p50"], result["latency"]["max"])
+        for asset in assets:
+            self.assertAlmostEqual(store[asset.symbol].get_price(), asset.get_price())
+            self.assertAlmostEqual(store[asset.symbol].get_sma(), asset.get_sma())
+
+
+if __name__ == '__main__':
+    unittest.main()
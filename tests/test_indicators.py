@@ -0,0 +1,89 @@
+import unittest
+import numpy as np
+from core import indicators
+from core.models import Stock
+from core.tick_buffer import TickBuffer, MultiTickBuffer
+
+
+def naive_ema(values, alpha):
+    out = [values[0]]
+    for x in values[1:]:
+        out.append(out[-1] + alpha * (x - out[-1]))
+    return np.array(out)
+
+
+class TestTickBuffer(unittest.TestCase):
+
+    def test_wraparound(self):
+        buf = TickBuffer(capacity=4)
+        buf.extend(np.arange(3), [1.0, 2.0, 3.0])
+        for i in range(3, 7):
+            buf.append(i, float(i + 1), volume=10.0)
+        self.assertEqual(len(buf), 4)
+        self.assertEqual(buf.prices().tolist(), [4.0, 5.0, 6.0, 7.0])
+        self.assertEqual(buf.timestamps(last=2).tolist(), [5.0, 6.0])
+
+        buf.extend(np.arange(10), np.arange(10.0))  # 超过容量只保留最后 4 个
+        self.assertEqual(buf.prices().tolist(), [6.0, 7.0, 8.0, 9.0])
+
+    def test_multi_symbol_matrix(self):
+        buf = MultiTickBuffer(capacity=3)
+        for t in range(5):
+            buf.append_many(["AAPL", "BTC"], t, [100.0 + t, 50.0 - t])
+        buf.append("AAPL", 5, 200.0)
+        self.assertEqual(buf.matrix().tolist(), [[103.0, 104.0, 200.0], [48.0, 47.0, 46.0]])
+        self.assertEqual(buf.matrix(length=2, symbols=["BTC"]).tolist(), [[47.0, 46.0]])
+        with self.assertRaises(ValueError):
+            buf.append_many(["AAPL", "AAPL"], 6, [1.0, 2.0])
+
+    def test_asset_tick_history(self):
+        apple = Stock("AAPL", 100.0)
+        history = apple.enable_tick_history(capacity=8)
+        apple.update_price(101.0)
+        self.assertEqual(history.prices().tolist(), [100.0, 101.0])
+
+    def test_tick_history_seed_timestamps_are_spaced(self):
+        tesla = Stock("TSLA", 100.0)
+        for price in (101.0, 102.0, 103.0):
+            tesla.update_price(price)
+        history = tesla.enable_tick_history(capacity=8, seed_interval=5)
+        self.assertEqual(history.prices().tolist(), [100.0, 101.0, 102.0, 103.0])
+        self.assertEqual(np.diff(history.timestamps()).tolist(), [5.0, 5.0, 5.0])
+        tesla.update_price(104.0)  # 第一个实时 tick 仍在最后一个初始 tick 之后
+        self.assertGreaterEqual(history.timestamps()[-1], history.timestamps()[-2])
+
+
+class TestIndicators(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.prices = 100 + np.cumsum(rng.normal(0, 1, (3, 2000)), axis=1)
+
+    def test_ema_matches_recursion(self):
+        for span in (1, 5, 26, 400):
+            alpha = 2.0 / (span + 1)
+            np.testing.assert_allclose(indicators.ema(self.prices[0], span), naive_ema(self.prices[0], alpha),
+                                       rtol=1e-10)
+
+    def test_batch_matches_single(self):
+        batch = indicators.summarize(self.prices)
+        for row in range(len(self.prices)):
+            single = indicators.summarize(self.prices[row])
+            for name, values in batch.items():
+                self.assertAlmostEqual(values[row], single[name][0], places=9)
+
+    def test_shapes_and_bounds(self):
+        x = self.prices[0]
+        rsi = indicators.rsi(x)
+        self.assertTrue(np.isnan(rsi[0]))
+        self.assertTrue(np.all((rsi[1:] >= 0) & (rsi[1:] <= 100)))
+        middle, upper, lower = indicators.bollinger(x, window=20)
+        self.assertTrue(np.isnan(middle[18]) and not np.isnan(middle[19]))
+        self.assertTrue(np.all(upper[19:] >= lower[19:]))
+        line, signal, hist = indicators.macd(x)
+        np.testing.assert_allclose(hist, line - signal)
+        self.assertEqual(indicators.rsi([1.0, 2.0, 3.0])[-1], 100.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import copyreg
+import pickle
+import random
+import statistics
+import unittest
+from collections import deque
+import numpy as np
+from core.models import Stock, Crypto, AssetStore
+from core.rolling import RollingWindow
+
+
+class TestAssetStore(unittest.TestCase):
+
+    def setUp(self):
+        self.assets = [Stock("AAPL", 100.0), Crypto("BTC", 40000.0, chain="Bitcoin")]
+        self.store = AssetStore.from_assets(self.assets)
+
+    def test_matches_object_model(self):
+        """批量更新后的价格和 SMA 与逐个对象更新的结果一致"""
+        for price in (110.0, 120.0, 130.0, 140.0, 150.0, 160.0):
+            self.assets[0].update_price(price)
+            self.store.update_prices(["AAPL"], [price])
+
+        view = self.store["AAPL"]
+        self.assertEqual(view.get_price(), self.assets[0].get_price())
+        self.assertAlmostEqual(view.get_sma(), self.assets[0].get_sma())
+        self.assertEqual(view.price_history_window, list(self.assets[0].price_history_window))
+        self.assertEqual(self.store.to_dicts(), [a.to_dict() for a in self.assets])
+
+    def test_bulk_update_rules(self):
+        """负数价格被忽略，同一行重复出现时以最后一次为准"""
+        updated = self.store.update_prices(np.array([0, 1, 0]), np.array([105.0, -1.0, 115.0]))
+        self.assertEqual(updated, 1)
+        self.assertEqual(self.store.prices[0], 115.0)
+        self.assertEqual(self.store.prices[1], 40000.0)
+        self.assertAlmostEqual(self.store.sma[0], 107.5)
+
+    def test_views_and_growth(self):
+        store = AssetStore(capacity=1)
+        for i in range(10):
+            store.add(f"S{i}", float(i + 1), "Stock", "NYSE")
+        self.assertEqual(len(store), 10)
+        self.assertEqual(store.update_from_dict({"S3": 40.0, "UNKNOWN": 1.0}), 1)
+
+        view = store["S3"]
+        self.assertEqual(view.asset_type, Stock.asset_type)  # 与模型类一致，可以直接替代对象
+        self.assertEqual(view.type_code, "Stock")
+        self.assertEqual(view.exchange, "NYSE")
+        self.assertFalse(hasattr(view, "chain"))
+        self.assertAlmostEqual(view.get_sma(), 22.0)
+
+        with self.assertRaises(ValueError):
+            store.add("X" * 21, 1.0, "Stock")  # 超过 U20 会被截断
+        self.assertEqual(len(store), 10)
+
+        restored = store.to_assets()[3]
+        self.assertIsInstance(restored, Stock)
+        self.assertEqual(restored.to_dict(), view.to_dict())
+
+
+class TestRollingWindow(unittest.TestCase):
+
+    def test_matches_full_recompute(self):
+        """增量统计与逐次完整计算的结果一致 (含重新校准之后)"""
+        rng = random.Random(7)
+        for size in (1, 3, 10):
+            window = RollingWindow(size)
+            for _ in range(2500):
+                window.append(rng.uniform(50, 150))
+                values = list(window)
+                self.assertAlmostEqual(window.mean, statistics.mean(values), places=9)
+                self.assertEqual(window.min, min(values))
+                self.assertEqual(window.max, max(values))
+                if len(values) > 1:
+                    self.assertAlmostEqual(window.stdev, statistics.stdev(values), places=6)
+
+    def test_asset_accessors(self):
+        btc = Crypto("BTC", 100.0, window_size=3)
+        for price in (110.0, 90.0, 130.0):
+            btc.update_price(price)
+        self.assertEqual(btc.get_range(), (90.0, 130.0))
+        self.assertAlmostEqual(btc.get_sma(), 110.0)
+        self.assertAlmostEqual(btc.get_volatility(), 20.0)
+        # alpha = 0.5: 100 -> 105 -> 97.5 -> 113.75
+        self.assertAlmostEqual(btc.get_ema(), 113.75)
+
+
+class TestSlottedModels(unittest.TestCase):
+
+    def test_no_instance_dict(self):
+        for asset in (Stock("AAPL", 1.0), Crypto("BTC", 1.0, compact_window=True)):
+            self.assertFalse(hasattr(asset, "__dict__"))
+        self.assertEqual(Stock("AAPL", 1.0).asset_type, "股票")
+
+    def test_pickle_round_trip(self):
+        for compact in (False, True):
+            btc = Crypto("BTC", 100.0, chain="Bitcoin", compact_window=compact)
+            btc.update_price(120.0)
+            restored = pickle.loads(pickle.dumps(btc))
+            restored.update_price(80.0)
+            self.assertEqual(list(restored.price_history_window), [100.0, 120.0, 80.0])
+            self.assertEqual(restored.get_range(), (80.0, 120.0))
+            self.assertEqual(restored.to_dict()["chain"], "Bitcoin")
+
+    def test_load_legacy_pickle(self):
+        """旧版快照 (带 __dict__ 和 deque 窗口) 仍然可以恢复"""
+        class Legacy:
+            def __reduce_ex__(self, protocol):
+                state = {"symbol": "AAPL", "_Asset__price": 120.0, "exchange": "NYSE", "asset_type": "股票",
+                         "price_history_window": deque([100.0, 120.0], maxlen=5)}
+                return copyreg._reconstructor, (Stock, object, None), state
+
+        apple = pickle.loads(pickle.dumps(Legacy()))
+        self.assertIsInstance(apple, Stock)
+        self.assertEqual(apple.to_dict(), {"symbol": "AAPL", "price": 120.0, "sma": 110.0,
+                                           "type": "Stock", "exchange": "NYSE"})
+        apple.update_price(140.0)
+        self.assertAlmostEqual(apple.get_sma(), 120.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
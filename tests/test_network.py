@@ -0,0 +1,248 @@
+import contextlib
+import io
+import socket
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from core import network
+from core.http_client import SessionPool
+from core.price_cache import PriceCache
+from core.rate_limiter import TokenBucket, get_rate_limiter, set_rate_limit
+from core.async_worker import FetchWorkerPool, PRIORITY_HELD, PRIORITY_WATCHLIST, start_concurrent_update
+from core.fake_server import start_fake_server, stop_fake_server
+from core.models import Crypto, Stock
+
+
+class TestFetchEngine(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # 本地服务器不需要限流
+        cls.old_limiter = get_rate_limiter(network.PROVIDER_NAME)
+        set_rate_limit(network.PROVIDER_NAME, rate=10000, burst=10000)
+        cls.server, base_url = start_fake_server(latency=0.01)
+        cls.server_url = base_url
+        cls.old_base_url = network.API_BASE_URL
+        network.API_BASE_URL = base_url
+        for i in range(20):
+            network.COIN_MAPPING[f"T{i:02d}"] = f"test-coin-{i:02d}"
+
+    @classmethod
+    def tearDownClass(cls):
+        network.API_BASE_URL = cls.old_base_url
+        set_rate_limit(network.PROVIDER_NAME, cls.old_limiter.rate, cls.old_limiter.burst)
+        for i in range(20):
+            network.COIN_MAPPING.pop(f"T{i:02d}", None)
+        stop_fake_server(cls.server)
+
+    def setUp(self):
+        network.price_cache.clear()
+
+    def test_concurrent_update(self):
+        """asyncio 引擎应更新所有已映射的资产，未映射的保持原价"""
+        assets = [Crypto(f"T{i:02d}", 100.0) for i in range(20)]
+        unknown = Crypto("NOPE", 1.0)
+        with FetchWorkerPool(max_workers=4) as pool, contextlib.redirect_stdout(io.StringIO()):
+            updated = start_concurrent_update(assets + [unknown], pool=pool)
+        self.assertEqual(updated, 20)
+        self.assertEqual(unknown.get_price(), 1.0)
+        self.assertTrue(all(a.get_price() != 100.0 for a in assets))
+
+    def test_concurrent_update_per_call_knobs(self):
+        """指定 max_concurrency / timeout 时为这次调用单独建池，不使用也不创建全局工作池"""
+        assets = [Crypto(f"T{i:02d}", 100.0) for i in range(5)]
+        before = threading.active_count()
+        with mock.patch("core.async_worker.get_worker_pool", side_effect=AssertionError("不应使用全局池")), \
+                contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(start_concurrent_update(assets, 2, timeout=5), 5)
+        self.assertEqual(threading.active_count(), before)  # 单独建的池用完即关闭
+
+    def test_cancelled_scan_does_not_kill_worker(self):
+        """调用方取消扫描后，唯一的工人仍然继续处理后面的扫描"""
+        with FetchWorkerPool(max_workers=1, batch_size=2) as pool, contextlib.redirect_stdout(io.StringIO()):
+            cancelled = pool.submit([Crypto(f"T{i:02d}", 100.0) for i in range(6)])
+            cancelled.future.cancel()
+            for _ in range(2):
+                results = pool.submit([Crypto("T10", 100.0), Crypto("T11", 100.0)]).result(timeout=10)
+                self.assertTrue(all(r.error is None for r in results))
+            self.assertTrue(cancelled.future.cancelled())
+
+    def test_worker_pool_isolated_scans(self):
+        """同一个工作池上的并发扫描各自拿到自己的结果，关闭后不残留线程"""
+        with FetchWorkerPool(max_workers=3, batch_size=4) as pool:
+            scan_a = [Crypto(f"T{i:02d}", 100.0) for i in range(10)]
+            scan_b = [Crypto(f"T{i:02d}", 100.0) for i in range(10, 20)] + [Crypto("NOPE", 1.0)]
+            with contextlib.redirect_stdout(io.StringIO()):
+                handles = [pool.submit(scan_a), pool.submit(scan_b)]
+                results_a, results_b = [h.result(timeout=10) for h in handles]
+
+            self.assertEqual([r.symbol for r in results_a], [a.symbol for a in scan_a])
+            self.assertTrue(all(r.error is None and r.new_price for r in results_a))
+            self.assertEqual(len(results_b), 11)
+            self.assertIsNotNone(results_b[-1].error)
+        self.assertFalse([t for t in threading.enumerate() if t.name.startswith("omni-fetch")])
+        with self.assertRaises(RuntimeError):
+            pool.submit(scan_a)
+
+    def test_priority_order(self):
+        """队列积压时，持仓资产的批次先于关注列表处理"""
+        self.server.latency = 0.05
+        done = []
+        try:
+            with FetchWorkerPool(max_workers=1, batch_size=1) as pool, \
+                    contextlib.redirect_stdout(io.StringIO()):
+                blocker = pool.submit([Crypto("T00", 1.0)])
+                watch = pool.submit([Crypto("T01", 1.0), Crypto("T02", 1.0)], PRIORITY_WATCHLIST)
+                held = pool.submit([Crypto("T03", 1.0)], PRIORITY_HELD)
+                for name, handle in [("watch", watch), ("held", held)]:
+                    handle.future.add_done_callback(lambda _, n=name: done.append(n))
+                for handle in (blocker, watch, held):
+                    handle.result(timeout=10)
+                metrics = pool.metrics()
+        finally:
+            self.server.latency = 0.01
+        self.assertEqual(done, ["held", "watch"])
+        self.assertEqual(metrics["queue_wait"][PRIORITY_WATCHLIST]["count"], 2)
+        self.assertGreater(metrics["batch_time"]["count"], 0)
+
+    def test_standin_provider_for_stocks(self):
+        """注册替身数据源后，股票按自己的批量大小路由到 /quotes 接口"""
+        self.assertIsNone(network.fetch_real_price("AAPL"))
+        network.enable_standin_provider(self.server_url, batch_size=2)
+        try:
+            symbols = ["AAPL", "TSLA", "MSFT", "T00"]
+            routes = network.route_symbols(symbols)
+            self.assertEqual(sorted(p.name for p in routes), ["coingecko", "standin"])
+
+            before = self.server.request_count
+            with contextlib.redirect_stdout(io.StringIO()):
+                prices = network.fetch_prices(symbols)
+            self.assertEqual(set(prices), set(symbols))
+            self.assertEqual(self.server.request_count - before, 3)  # 股票 2 批 + 加密货币 1 批
+
+            stock = Stock("AAPL", 150.0)
+            network.price_cache.clear()
+            with FetchWorkerPool(max_workers=2) as pool, contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(start_concurrent_update([stock], pool=pool), 1)
+        finally:
+            network.unregister_provider(network.CLASS_STOCK)
+        self.assertFalse(network.is_supported("AAPL"))
+
+    def test_fetch_prices_batches(self):
+        """fetch_prices 应按 batch_size 分批，每批只发一次请求"""
+        symbols = [f"T{i:02d}" for i in range(20)] + ["T00", "AAPL"]
+        before = self.server.request_count
+        with contextlib.redirect_stdout(io.StringIO()):
+            prices = network.fetch_prices(symbols, batch_size=8)
+        self.assertEqual(self.server.request_count - before, 3)
+        self.assertEqual(len(prices), 20)
+        self.assertNotIn("AAPL", prices)
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        """桶满时允许突发，之后按 rate 排队等待"""
+        now = [0.0]
+        slept = []
+
+        def fake_sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, burst=3, max_wait=1.0, clock=lambda: now[0], sleep=fake_sleep)
+        for _ in range(3):
+            self.assertTrue(bucket.acquire())
+        self.assertEqual(slept, [])
+        self.assertTrue(bucket.acquire())   # 欠 1 个令牌，等 0.5 秒
+        self.assertEqual(slept, [0.5])
+
+        bucket.pause(5)                     # 服务器要求退让 5 秒
+        self.assertFalse(bucket.acquire())  # 超过 max_wait，被拒绝
+        self.assertEqual(bucket.stats()["rejected"], 1)
+
+
+class TestSessionPool(unittest.TestCase):
+
+    def test_connection_reuse(self):
+        """同一线程的连续请求应复用 keep-alive 连接"""
+        server, base_url = start_fake_server()
+        pool = SessionPool(pool_size=2, max_retries=0)
+        try:
+            for _ in range(5):
+                pool.get(f"{base_url}/simple/price?ids=bitcoin&vs_currencies=usd").raise_for_status()
+            stats = pool.stats()
+            self.assertEqual(stats["connections"], 1)
+            self.assertEqual(stats["reused"], 4)
+        finally:
+            pool.close()
+            stop_fake_server(server)
+
+    def test_retry_until_exhausted(self):
+        """连接失败时应重试 max_retries 次后再抛出异常"""
+        # 找一个没有服务监听的端口
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+
+        pool = SessionPool(pool_size=1, max_retries=2, backoff_base=0.001)
+        with self.assertRaises(requests.ConnectionError):
+            pool.get(f"http://127.0.0.1:{port}/", timeout=1)
+        stats = pool.stats()
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["failures"], 1)
+        pool.close()
+
+
+class TestPriceCache(unittest.TestCase):
+
+    def test_ttl_and_lru(self):
+        """过期记录失效，超出容量时淘汰最久未使用的记录"""
+        now = [0.0]
+        cache = PriceCache(ttl=10, maxsize=2, clock=lambda: now[0])
+        cache.put("BTC", 1.0)
+        cache.put("ETH", 2.0)
+        self.assertEqual(cache.get("BTC"), 1.0)  # BTC 变为最近使用
+        cache.put("DOGE", 3.0)                   # 淘汰 ETH
+        self.assertIsNone(cache.get("ETH"))
+        now[0] = 11.0
+        self.assertIsNone(cache.get("BTC"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 2, 1))
+
+    def test_single_flight(self):
+        """并发请求同一符号时只调用一次 loader"""
+        cache = PriceCache(ttl=60)
+        calls = []
+        release = threading.Event()
+
+        def loader(symbols):
+            calls.append(symbols)
+            release.wait(5)
+            return {s: 42.0 for s in symbols}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load_many(["BTC"], loader)))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        # 等其余 7 个线程都挂到进行中的请求上，再放行 loader
+        deadline = time.time() + 5
+        while cache.stats()["coalesced"] < 7 and time.time() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"BTC": 42.0}] * 8)
+        self.assertEqual(cache.stats()["coalesced"], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
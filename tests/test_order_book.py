@@ -0,0 +1,63 @@
+import unittest
+from core.models import Stock
+from core.order_book import OrderBook, OrderFlowGenerator, BUY, SELL
+
+
+class TestOrderBook(unittest.TestCase):
+
+    def setUp(self):
+        self.book = OrderBook("AAPL", tick_size=0.01)
+        self.book.submit_limit(SELL, 100.02, 10, order_id="a1")
+        self.book.submit_limit(SELL, 100.02, 5, order_id="a2")
+        self.book.submit_limit(SELL, 100.05, 20, order_id="a3")
+        self.book.submit_limit(BUY, 99.98, 7, order_id="b1")
+
+    def test_quotes_and_depth(self):
+        self.assertEqual(self.book.best_bid(), 99.98)
+        self.assertEqual(self.book.best_ask(), 100.02)
+        self.assertAlmostEqual(self.book.mid_price(), 100.0)
+        self.assertAlmostEqual(self.book.spread(), 0.04)
+        bids, asks = self.book.depth(levels=5)
+        self.assertEqual(bids, [(99.98, 7)])
+        self.assertEqual(asks, [(100.02, 15), (100.05, 20)])
+
+    def test_price_time_priority_and_partial_fill(self):
+        _, trades = self.book.submit_limit(BUY, 100.02, 12)
+        self.assertEqual([(t.maker_id, t.qty) for t in trades], [("a1", 10), ("a2", 2)])
+        self.assertEqual(self.book.depth()[1][0], (100.02, 3))
+
+    def test_market_order_sweeps_levels(self):
+        _, trades = self.book.submit_market(BUY, 30)
+        self.assertEqual([(t.price, t.qty) for t in trades], [(100.02, 10), (100.02, 5), (100.05, 15)])
+        self.assertEqual(self.book.depth()[1], [(100.05, 5)])
+
+    def test_limit_remainder_rests(self):
+        order_id, trades = self.book.submit_limit(SELL, 99.97, 10)
+        self.assertEqual(sum(t.qty for t in trades), 7)
+        self.assertEqual(self.book.best_ask(), 99.97)
+        self.assertIsNone(self.book.best_bid())
+        self.assertTrue(self.book.cancel(order_id))
+        self.assertFalse(self.book.cancel(order_id))
+        self.assertEqual(self.book.best_ask(), 100.02)
+
+    def test_mid_published_to_asset(self):
+        apple = Stock("AAPL", 0.0)
+        self.book.publish_mid_to(apple)
+        self.book.submit_limit(BUY, 100.00, 1)
+        self.assertAlmostEqual(apple.get_price(), 100.01)
+        self.book.cancel("a3")  # 不影响最优价，不推送
+        self.assertAlmostEqual(apple.get_price(), 100.01)
+
+    def test_generator_keeps_book_consistent(self):
+        book = OrderBook()
+        OrderFlowGenerator(book, seed=3, block=256).run(5000)
+        bid, ask = book.best_bid(), book.best_ask()
+        if bid is not None and ask is not None:
+            self.assertLess(bid, ask)
+        for side in (book.bids, book.asks):
+            for level in side.values():
+                self.assertEqual(level.volume, sum(o.qty for o in level.orders.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
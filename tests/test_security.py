@@ -0,0 +1,88 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from core.security import AtomicSignedWriter, calculate_file_hash, verify_file_integrity
+
+
+class TestAtomicSignedWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "market_data.json")
+        self.sig = os.path.join(self.tmp, "market_data.sig")
+        self.data = [{"symbol": f"S{i}", "price": i * 0.5, "exchange": "上交所"} for i in range(5000)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def write(self, data):
+        with AtomicSignedWriter(self.path, self.sig) as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        return f.hexdigest
+
+    def test_hash_computed_while_writing(self):
+        digest = self.write(self.data)
+        self.assertEqual(digest, calculate_file_hash(self.path))
+        with open(self.sig) as f:
+            self.assertEqual(f.read(), digest)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), self.data)
+        self.assertEqual(sorted(os.listdir(self.tmp)), ["market_data.json", "market_data.sig"])
+        self.assertTrue(verify_file_integrity(self.path, self.sig))
+
+    def test_failed_write_keeps_old_files(self):
+        self.write(self.data)
+        with self.assertRaises(TypeError):
+            self.write(self.data + [object()])  # 写到一半序列化失败
+        self.assertEqual(sorted(os.listdir(self.tmp)), ["market_data.json", "market_data.sig"])
+        self.assertTrue(verify_file_integrity(self.path, self.sig))
+
+    def test_failed_commit_removes_temp_files(self):
+        self.write(self.data)
+        real_replace = os.replace
+
+        def fail_on_data(src, dst):
+            if dst == self.path:
+                raise OSError("模拟磁盘错误")
+            real_replace(src, dst)
+
+        for target, side_effect in (("core.security.os.fsync", OSError("模拟磁盘错误")),
+                                    ("core.security.os.replace", fail_on_data)):
+            with mock.patch(target, side_effect=side_effect):
+                with self.assertRaises(OSError):
+                    self.write(self.data[:10])
+            self.assertEqual(sorted(os.listdir(self.tmp)), ["market_data.json", "market_data.sig"])
+            self.assertTrue(verify_file_integrity(self.path, self.sig))
+            with open(self.path, encoding="utf-8") as f:
+                self.assertEqual(len(json.load(f)), len(self.data))
+
+    def test_crash_between_renames_rolls_forward(self):
+        self.write(self.data)
+        real_replace = os.replace
+
+        def crash_on_signature(src, dst):
+            if dst == self.sig:
+                raise OSError("模拟崩溃")
+            real_replace(src, dst)
+
+        with mock.patch("core.security.os.replace", crash_on_signature):
+            with self.assertRaises(OSError):
+                self.write(self.data[:10])
+        self.assertTrue(os.path.exists(self.sig + ".tmp"))
+        self.assertTrue(verify_file_integrity(self.path, self.sig))  # 新数据 + .sig.tmp: 补换签名
+        self.assertFalse(os.path.exists(self.sig + ".tmp"))
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 10)
+
+        with open(self.sig + ".tmp", "w") as f:
+            f.write("0" * 64)  # 与数据不符的 .sig.tmp 不能让篡改过的文件通过校验
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(" ")
+        self.assertFalse(verify_file_integrity(self.path, self.sig))
+
+
+if __name__ == "__main__":
+    unittest.main()
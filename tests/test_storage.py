@@ -0,0 +1,192 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from core import storage
+from core.storage import AssetJournal
+from core.models import Stock, Crypto
+from core.security import calculate_file_hash
+
+
+class TestAssetJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "market_data.json")
+        self.journal = AssetJournal(self.path)
+        self.items = [{"symbol": f"S{i}", "price": 100.0 + i, "sma": 100.0 + i, "type": "Stock", "exchange": "NYSE"}
+                      for i in range(50)]
+        self.assertIsNone(self.journal.save(self.items))  # 首次保存写入完整的基础文件
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def reload(self):
+        return AssetJournal(self.path).load_records()
+
+    def test_saves_append_only_changes(self):
+        base_hash = calculate_file_hash(self.path)
+        self.items[3] = dict(self.items[3], price=1.5)
+        self.items.append({"symbol": "BTC", "price": 9.0, "sma": 9.0, "type": "Crypto", "chain": "Bitcoin"})
+        self.assertEqual(self.journal.save(self.items), 2)
+        self.assertEqual(self.journal.save(self.items), 0)  # 没有变化时不写
+        del self.items[0]
+        self.assertEqual(self.journal.save(self.items), 1)
+
+        self.assertEqual(calculate_file_hash(self.path), base_hash)  # 基础文件没有被重写
+        with open(self.journal.journal_file, "rb") as f:
+            self.assertEqual(len(f.readlines()), 3)
+        records = self.reload()
+        self.assertEqual(len(records), 50)
+        self.assertNotIn("S0", [r["symbol"] for r in records])
+        self.assertEqual({r["symbol"]: r["price"] for r in records}["S3"], 1.5)
+
+    def test_background_compaction_folds_journal(self):
+        original = storage.COMPACT_MIN_RECORDS
+        storage.COMPACT_MIN_RECORDS = 10
+        try:
+            for round_ in range(3):
+                self.items[:30] = [dict(item, price=item["price"] + 1) for item in self.items[:30]]
+                self.journal.save(self.items)
+                self.journal.wait()
+        finally:
+            storage.COMPACT_MIN_RECORDS = original
+        self.assertFalse(os.path.exists(self.journal.compacting_file))
+        self.assertEqual(self.journal._records, 30)  # 第 2 轮超过阈值 (50) 后已合并，只剩第 3 轮的记录
+        self.assertEqual(self.reload(), self.items)
+        self.journal.compact()
+        self.assertEqual(os.path.getsize(self.journal.journal_file), 0)
+        self.assertEqual(self.reload(), self.items)
+
+    def test_failed_compaction_retried_on_next_save(self):
+        self.items[0] = dict(self.items[0], price=7.0)
+        self.journal.save(self.items)
+        with mock.patch.object(storage, "AtomicSignedWriter", side_effect=OSError("磁盘已满")):
+            self.journal.compact()
+        self.assertTrue(self.journal._pending)
+        self.assertTrue(os.path.exists(self.journal.compacting_file))
+
+        self.items[1] = dict(self.items[1], price=8.0)
+        self.journal.save(self.items)
+        self.journal.wait()
+        self.assertFalse(self.journal._pending)
+        self.assertFalse(os.path.exists(self.journal.compacting_file))
+        self.assertEqual(self.reload(), self.items)
+
+    def test_interrupted_compaction_replays_idempotently(self):
+        self.items[0] = dict(self.items[0], price=7.0)
+        self.journal.save(self.items)
+        self.journal.close()
+        os.replace(self.journal.journal_file, self.journal.compacting_file)  # 模拟压缩中途崩溃
+        self.assertEqual(self.reload(), self.items)
+
+        journal = AssetJournal(self.path)
+        self.items[1] = dict(self.items[1], price=8.0)
+        journal.save(self.items)  # 发现遗留的 .compacting，继续压缩
+        journal.close()
+        self.assertFalse(os.path.exists(journal.compacting_file))
+        self.assertEqual(self.reload(), self.items)
+
+    def test_torn_tail_ignored_and_tampering_detected(self):
+        self.items[0] = dict(self.items[0], price=7.0)
+        self.journal.save(self.items)
+        self.journal.close()
+        with open(self.journal.journal_file, "ab") as f:
+            f.write(b'1234abcd {"op":"put","ass')  # 写到一半崩溃
+        self.assertEqual(self.reload(), self.items)
+
+        journal = AssetJournal(self.path)
+        self.items[1] = dict(self.items[1], price=8.0)
+        self.assertEqual(journal.save(self.items), 1)  # 截掉半行后继续追加
+        journal.close()
+        self.assertEqual(self.reload(), self.items)
+
+        with open(journal.journal_file, "rb") as f:
+            lines = f.readlines()
+        lines[0] = lines[0].replace(b"7.0", b"9.0")
+        with open(journal.journal_file, "wb") as f:
+            f.writelines(lines)
+        with self.assertRaises(storage.JournalError):
+            self.reload()
+
+
+    def test_streaming_matches_replay_and_filters(self):
+        self.items[5] = dict(self.items[5], price=1.0)
+        self.journal.save(self.items)
+        removed = self.items.pop(7)
+        self.items.append({"symbol": "ETH", "price": 9.0, "sma": 9.0, "type": "Crypto", "chain": "Ethereum"})
+        self.journal.save(self.items)
+        self.items.append(dict(removed, price=2.0))  # 删除后重新添加，排到最后
+        self.journal.save(self.items)
+
+        journal = AssetJournal(self.path)
+        self.assertEqual(list(journal.iter_records()), self.reload())
+        self.assertEqual(list(journal.iter_records()), self.items)
+        self.assertEqual([r["symbol"] for r in journal.iter_records(types="Crypto")], ["ETH"])
+        picked = list(journal.iter_records(types=["Stock"], symbols={"S5", "S7", "ETH"}))
+        self.assertEqual([(r["symbol"], r["price"]) for r in picked], [("S5", 1.0), ("S7", 2.0)])
+
+
+class TestIterJsonArray(unittest.TestCase):
+
+    def test_elements_split_across_chunks(self):
+        # 字符串里的 '}' 和嵌套对象会让按 '}' 整段解析的快速路径失败，退回逐个解析
+        items = [{"symbol": f"S{i}", "price": i * 1.25, "note": "中文, ]} {" if i % 7 else "", "extra": {"n": [i]}}
+                 for i in range(200)] + [7, 1234567, "x"]
+        for indent in (None, 4):
+            text = json.dumps(items, indent=indent, ensure_ascii=False)
+            for chunk in (1, 3, 64, 1 << 20):
+                self.assertEqual(list(storage.iter_json_array(io.StringIO(text), chunk)), items)
+        self.assertEqual(list(storage.iter_json_array(io.StringIO(" [ ] "), 1)), [])
+
+    def test_batched_dump_matches_json_dump(self):
+        items = [{"symbol": f"S{i}", "price": i * 1.25, "note": "中文"} for i in range(7)]
+        for count in (0, 1, 3, 6, 7):
+            for batch in (1, 3, 100):
+                out = io.StringIO()
+                storage.dump_json_array(items[:count], out, batch)
+                self.assertEqual(out.getvalue(), json.dumps(items[:count], indent=4, ensure_ascii=False))
+
+    def test_rejects_malformed_input(self):
+        for text in ('{"a": 1}', '[{"a": 1}, {"a": 2', '[1, 2'):
+            with self.assertRaises(ValueError):
+                list(storage.iter_json_array(io.StringIO(text), 4))
+
+
+class TestStorageFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.original = (storage.DATA_DIR, storage.DATA_FILE, storage.SIG_FILE, storage.JOURNAL_FILE)
+        storage.DATA_DIR = self.tmp
+        storage.DATA_FILE = os.path.join(self.tmp, "market_data.json")
+        storage.SIG_FILE = os.path.join(self.tmp, "market_data.sig")
+        storage.JOURNAL_FILE = os.path.join(self.tmp, "market_data.journal")
+
+    def tearDown(self):
+        storage.get_journal().close()
+        storage.DATA_DIR, storage.DATA_FILE, storage.SIG_FILE, storage.JOURNAL_FILE = self.original
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_save_and_load_round_trip(self):
+        assets = [Stock("AAPL", 150.0, "NASDAQ"), Crypto("ETH", 3000.0, "Ethereum")]
+        storage.save_data(assets)
+        assets[0].update_price(155.0)
+        storage.save_data(assets)
+        restored = storage.load_data()
+        self.assertEqual([(a.symbol, a.get_price()) for a in restored], [("AAPL", 155.0), ("ETH", 3000.0)])
+        self.assertEqual(restored[1].chain, "Ethereum")
+        self.assertEqual([a.symbol for a in storage.iter_assets(types="Crypto")], ["ETH"])
+        self.assertEqual([a.symbol for a in storage.load_data(symbols=["AAPL"])], ["AAPL"])
+
+        with open(storage.DATA_FILE, "a", encoding="utf-8") as f:
+            f.write(" ")  # 篡改基础文件
+        self.assertEqual(storage.load_data(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
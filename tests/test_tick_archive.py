@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+import numpy as np
+from core.tick_archive import TickArchive, TICK_DTYPE, to_micros, from_micros
+
+
+class TestTickArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.archive = TickArchive(self.tmp, segment_records=100)
+        self.ts = np.arange(250, dtype=np.int64) * 1_000_000 + to_micros(datetime(2024, 1, 1))
+        self.prices = np.arange(250, dtype=np.float64)
+        self.archive.append("AAPL", self.ts[:120], self.prices[:120])
+        self.archive.append("AAPL", self.ts[120:], self.prices[120:])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_append_rolls_over_segments(self):
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp, "AAPL"))), ["000000.bin", "000001.bin", "000002.bin"])
+        self.assertEqual(self.archive.count("AAPL"), 250)
+        self.assertEqual(self.archive.disk_bytes(), 250 * TICK_DTYPE.itemsize)
+        self.assertEqual(self.archive.symbols(), ["AAPL"])
+        with self.assertRaises(ValueError):
+            self.archive.append("AAPL", self.ts[:1], self.prices[:1])  # 不能写入更旧的数据
+        with self.assertRaises(ValueError):
+            self.archive.append("MSFT", self.ts[::-1], self.prices)  # 必须有序
+
+    def test_symbols_are_encoded_as_single_directory(self):
+        root = os.path.join(self.tmp, "ticks")
+        archive = TickArchive(root)
+        for symbol in ("BTC/USDT", "..", "../x", "A:B"):
+            archive.append(symbol, self.ts[:3], self.prices[:3])
+        self.assertEqual(sorted(os.listdir(self.tmp)), ["AAPL", "ticks"])  # 没有跳出 root
+        self.assertEqual(archive.symbols(), sorted(["BTC/USDT", "..", "../x", "A:B"]))
+        self.assertEqual(TickArchive(root).read("BTC/USDT")[1].tolist(), [0.0, 1.0, 2.0])
+        with self.assertRaises(ValueError):
+            archive.append("", self.ts[:1], self.prices[:1])
+
+    def test_range_read_is_zero_copy_slice(self):
+        ts, prices = self.archive.read("AAPL", int(self.ts[110]), datetime(2024, 1, 1, 0, 2, 0))
+        self.assertEqual(prices.tolist(), list(range(110, 121)))
+        self.assertEqual(from_micros(ts[:1])[0], np.datetime64("2024-01-01T00:01:50"))
+        ts, prices = self.archive.read("AAPL", int(self.ts[130]), int(self.ts[140]))
+        self.assertIsInstance(prices.base, np.memmap)  # 单段内的范围直接是 memmap 视图
+        self.assertEqual(prices.tolist(), list(range(130, 141)))
+        self.assertEqual(len(self.archive.read("AAPL", int(self.ts[-1]) + 1)[0]), 0)
+        self.assertEqual(len(self.archive.read("MSFT")[0]), 0)
+
+    def test_torn_trailing_record_is_truncated(self):
+        path = os.path.join(self.tmp, "AAPL", "000002.bin")
+        with open(path, "ab") as f:
+            f.write(b"\x01" * 7)  # 模拟写到一半崩溃
+        reopened = TickArchive(self.tmp, segment_records=100)
+        self.assertEqual(reopened.count("AAPL"), 250)
+        self.assertEqual(os.path.getsize(path), 50 * TICK_DTYPE.itemsize)
+        reopened.append("AAPL", [int(self.ts[-1]) + 1], [999.0])
+        self.assertEqual(reopened.read("AAPL", int(self.ts[-1]))[1].tolist(), [249.0, 999.0])
+
+    def test_compressed_segments_stay_readable(self):
+        before, after = self.archive.compress()  # 只压缩写满的两段
+        self.assertEqual(before, 200 * TICK_DTYPE.itemsize)
+        self.assertLess(after, before)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp, "AAPL"))), ["000000.grl", "000001.grl", "000002.bin"])
+        ts, prices = self.archive.read("AAPL", int(self.ts[90]), int(self.ts[210]))
+        self.assertEqual(prices.tolist(), list(range(90, 211)))
+        self.assertEqual(ts.tolist(), self.ts[90:211].tolist())
+
+        self.archive.compress(include_active=True)
+        self.archive.append("AAPL", [int(self.ts[-1]) + 1], [999.0])  # 压缩后的段只读，追加写入新段
+        reopened = TickArchive(self.tmp, segment_records=100)
+        self.assertEqual(reopened.count("AAPL"), 251)
+        self.assertEqual(reopened.read("AAPL")[1].tolist(), list(range(250)) + [999.0])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp, "AAPL")))[-1], "000003.bin")
+
+
+    def test_compress_releases_map_before_delete(self):
+        self.archive.read("AAPL")  # 让 .bin 段建立 memmap
+        segments = {s.path: s for s in self.archive._segments["AAPL"][:2]}
+        removed = []
+
+        def locked(path):
+            # 模拟 Windows: 文件仍被映射时删除失败
+            removed.append(segments[path]._map is None)
+            raise PermissionError(path)
+
+        with mock.patch("core.tick_archive.os.remove", side_effect=locked):
+            self.archive.compress()
+        self.assertEqual(removed, [True, True])
+        self.assertEqual(self.archive.read("AAPL")[1].tolist(), list(range(250)))
+        reopened = TickArchive(self.tmp, segment_records=100)
+        self.assertEqual(reopened.read("AAPL")[1].tolist(), list(range(250)))  # 加载时清理残留的 .bin
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp, "AAPL"))), ["000000.grl", "000001.grl", "000002.bin"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import threading
 import time
 from functools import wraps
 
@@ -50,4 +51,30 @@ def sort_data(data_list, key_func):
     """
     对列表进行排序
     """
-    return sorted(data_list, key=key_func, reverse=True)
\ No newline at end of file
+    return sorted(data_list, key=key_func, reverse=True)
+
+
+# --- 4. 耗时统计 ---
+class TimingStat:
+    """
+    线程安全的耗时累加器：记录次数、总耗时和最大耗时。
+    用于区分"排队等待"和"真正干活"各花了多少时间。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self):
+        with self._lock:
+            avg = self.total / self.count if self.count else 0.0
+            return {"count": self.count, "total": self.total, "avg": avg, "max": self.max}
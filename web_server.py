@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
-from flask import Flask, render_template, jsonify
-import json
+from flask import Flask, render_template, jsonify, request
 import os
+from core.storage import AssetJournal
 
 # 初始化 Flask 应用
 app = Flask(__name__, template_folder='templates')
@@ -9,13 +9,17 @@ app = Flask(__name__, template_folder='templates')
 # 指向 data 文件夹下的 market_data.json
 DATA_FILE = os.path.join(os.path.dirname(__file__), "data", "market_data.json")
 
-def get_data():
-    """辅助函数：读取最新的 JSON 数据"""
+def get_data(types=None, symbols=None):
+    """辅助函数：读取最新的数据 (流式解析 JSON 基础文件 + 重放追加日志，可按类型 / 代码过滤)"""
     if not os.path.exists(DATA_FILE):
         print(f"[WARN] 数据文件不存在: {DATA_FILE}")
         return []
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return list(AssetJournal(DATA_FILE).iter_records(types, symbols))
+
+def split_arg(name):
+    """把 ?type=Stock,Crypto 这样的查询参数拆成列表 (没有该参数时返回 None)"""
+    value = request.args.get(name)
+    return [part for part in value.split(",") if part] if value else None
 
 # --- 路由 1: 首页仪表盘 ---
 @app.route('/')
@@ -26,7 +30,8 @@ def dashboard():
 # --- 路由 2: 数据 API (JSON) ---
 @app.route('/api/data')
 def api_data():
-    assets = get_data()
+    # 可选过滤: /api/data?type=Stock&symbol=AAPL,MSFT
+    assets = get_data(split_arg('type'), split_arg('symbol'))
     return jsonify(assets)
 
 if __name__ == '__main__':